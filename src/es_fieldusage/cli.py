@@ -8,7 +8,18 @@ from es_client.defaults import OPTION_DEFAULTS
 from es_client.helpers import config as escl
 from es_client.helpers.logging import configure_logging
 from es_fieldusage.defaults import EPILOG
-from es_fieldusage.commands import file, show_indices, stdout
+from es_fieldusage.commands import (
+    advise,
+    capture,
+    clusters,
+    diff,
+    export,
+    file,
+    index,
+    show_indices,
+    stdout,
+    watch,
+)
 from es_fieldusage.version import __version__
 
 
@@ -68,6 +79,12 @@ run.add_command(show_all_options)  # type: ignore
 
 # Add the local subcommands
 run.add_command(show_indices)
+run.add_command(advise)
+run.add_command(capture)
+run.add_command(clusters)
+run.add_command(diff)
+run.add_command(export)
 run.add_command(file)
-# run.add_command(index)  # Not ready yet
+run.add_command(index)
 run.add_command(stdout)
+run.add_command(watch)
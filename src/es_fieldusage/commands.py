@@ -2,17 +2,55 @@
 
 # pylint: disable=R0913,R0914,R0917
 import typing as t
+import json
 import os
+import time
 from datetime import datetime, timezone
-import json
 import logging
 from pathlib import Path
 import click
 from es_client.helpers import config as escl
 from es_client.helpers.utils import option_wrapper
-from es_fieldusage.defaults import OPTS, FILEPATH_OVERRIDE, EPILOG
-from es_fieldusage.exceptions import FatalException
-from es_fieldusage.helpers.utils import output_report
+from es_fieldusage.defaults import (
+    ACCESS_TYPES,
+    OPTS,
+    FILEPATH_OVERRIDE,
+    EPILOG,
+    MAX_INDEX_CHARS,
+)
+from es_fieldusage.exceptions import ConfigurationException, FatalException
+from es_fieldusage.helpers.advisor import advise as advise_mappings
+from es_fieldusage.helpers.breakdown import breakdown_lines
+from es_fieldusage.helpers.bulk import bulk_index, field_documents
+from es_fieldusage.helpers.clusters import collect as collect_clusters
+from es_fieldusage.helpers.clusters import load_configs, merge_reports, report_to_dict
+from es_fieldusage.helpers.columnar import (
+    check_dataset,
+    dataset_filename,
+    write_dataset,
+)
+from es_fieldusage.helpers.exporter import Exporter
+from es_fieldusage.helpers.cache import DiskCache
+from es_fieldusage.helpers.metrics import Metrics
+from es_fieldusage.helpers.offline import OfflineClient, save_dump
+from es_fieldusage.helpers.select import SelectView, select_sections
+from es_fieldusage.helpers.store import CountersView, counters_to_dict
+from es_fieldusage.helpers.snapshot import (
+    SnapshotStore,
+    diff_snapshots,
+    make_snapshot,
+)
+from es_fieldusage.helpers.utils import (
+    chunk_indices,
+    concurrent_map,
+    output_advice,
+    output_delta_report,
+    output_report,
+    output_timings,
+    sort_by_value,
+    sum_dict_values,
+)
+from es_fieldusage.helpers.writer import json_chunks, open_output
 from es_fieldusage.main import FieldUsage
 
 SHW = {'on': 'show-', 'off': 'hide-'}
@@ -20,6 +58,58 @@ TRU = {'default': True}
 WRP = option_wrapper()
 
 
+def get_cache(
+    cache: bool,
+    cache_dir: str,
+    usage_ttl: float,
+    mapping_ttl: float,
+    offline_client: t.Optional[OfflineClient] = None,
+) -> t.Optional[DiskCache]:
+    """
+    Return the on-disk API response cache, if ``cache`` is enabled. Responses
+    read from saved files by ``offline_client`` are never cached.
+    """
+    if not cache or offline_client is not None:
+        return None
+    return DiskCache(cache_dir, {'usage': usage_ttl, 'mapping': mapping_ttl})
+
+
+def get_offline_client(
+    usage_file: t.Optional[str], mappings_file: t.Optional[str]
+) -> t.Optional[OfflineClient]:
+    """
+    Return a client which reads from saved API responses, if files were given
+    """
+    if usage_file is None and mappings_file is None:
+        return None
+    if usage_file is None or mappings_file is None:
+        raise click.UsageError('--usage-file and --mappings-file must be used together')
+    return OfflineClient(usage_file, mappings_file)
+
+
+def get_metrics(
+    show_timings: bool, timings_file: t.Optional[str]
+) -> t.Optional[Metrics]:
+    """Return a new Metrics collector, if timings are to be shown or saved"""
+    if show_timings or timings_file:
+        return Metrics()
+    return None
+
+
+def report_timings(
+    metrics: t.Optional[Metrics], show_timings: bool, timings_file: t.Optional[str]
+) -> None:
+    """Show the timings collected in ``metrics`` and/or save them as JSON"""
+    if metrics is None:
+        return
+    timings = metrics.summary()
+    if show_timings:
+        output_timings(timings)
+    if timings_file:
+        with open_output(timings_file) as fdesc:
+            json.dump(timings, fdesc, indent=2)
+
+
 def get_per_index(field_usage: FieldUsage, per_index: bool) -> t.Dict[str, t.Any]:
     """Return the per_index data set for reporting"""
     logger = logging.getLogger(__name__)
@@ -36,9 +126,51 @@ def get_per_index(field_usage: FieldUsage, per_index: bool) -> t.Dict[str, t.Any
                 'unaccessed': field_usage.report['unaccessed'],
             }
         }
+        if 'access' in field_usage.report:
+            all_data['all_indices']['access'] = field_usage.report['access']
     return all_data
 
 
+def access_header(raw_delimiter: str) -> str:
+    """
+    Return the line naming the columns written by :py:func:`output_generator`
+    when access type counters are shown
+    """
+    delimiter = format_delimiter(raw_delimiter)
+    return f'{delimiter.join(("field",) + ACCESS_TYPES)}\n'
+
+
+def get_sections(show_accessed: bool, show_unaccessed: bool) -> t.List[str]:
+    """Return the names of the sections of the per_index data set to output"""
+    return [
+        key
+        for key, boolval in {
+            'accessed': show_accessed,
+            'unaccessed': show_unaccessed,
+        }.items()
+        if boolval
+    ]
+
+
+def get_selection(
+    top: t.Optional[int],
+    bottom: t.Optional[int],
+    min_count: t.Optional[int],
+    max_count: t.Optional[int],
+) -> t.Dict[str, t.Optional[int]]:
+    """Return the keyword arguments for :py:func:`select_sections`"""
+    if top is not None and bottom is not None:
+        raise click.UsageError('--top and --bottom cannot be used together')
+    if min_count is not None and max_count is not None and min_count > max_count:
+        raise click.UsageError('--min-count cannot be greater than --max-count')
+    return {
+        'top': top,
+        'bottom': bottom,
+        'min_count': min_count,
+        'max_count': max_count,
+    }
+
+
 def format_delimiter(value: str) -> str:
     """Return a formatted delimiter"""
     delimiter = ''
@@ -71,21 +203,37 @@ def is_docker() -> bool:
     )
 
 
-def printout(data: t.Dict[str, t.Any], show_counts: bool, raw_delimiter: str) -> None:
+def printout(
+    data: t.Dict[str, t.Any],
+    show_counts: bool,
+    raw_delimiter: str,
+    access: t.Optional[CountersView] = None,
+) -> None:
     """Print output to stdout based on the provided values"""
-    for line in output_generator(data, show_counts, raw_delimiter):
+    for line in output_generator(data, show_counts, raw_delimiter, access):
         # Since the generator is adding newlines, we set nl=False here
         click.secho(line, nl=False)
 
 
 def output_generator(
-    data: t.Dict[str, t.Any], show_counts: bool, raw_delimiter: str
+    data: t.Dict[str, t.Any],
+    show_counts: bool,
+    raw_delimiter: str,
+    access: t.Optional[CountersView] = None,
 ) -> t.Generator[str, None, None]:
-    """Generate output iterator based on the provided values"""
+    """
+    Generate output iterator based on the provided values
+
+    If ``access`` is given with ``show_counts``, the count is followed by the
+    counter for every other access type in ``ACCESS_TYPES``, in that order.
+    """
     delimiter = format_delimiter(raw_delimiter)
     for key, value in data.items():
         line = ''
-        if show_counts:
+        if show_counts and access is not None:
+            counters = access.counters_for(key)[1:]
+            line = delimiter.join([key, str(value)] + [str(num) for num in counters])
+        elif show_counts:
             line = f'{key}{delimiter}{value}'
         else:
             line = f'{key}'
@@ -94,6 +242,111 @@ def output_generator(
         yield f'{line}\n'
 
 
+def write_file(
+    filename: str,
+    data: t.Dict[str, t.Any],
+    sections: t.Sequence[str],
+    show_counts: bool,
+    raw_delimiter: str,
+    as_json: bool,
+    atomic: bool = False,
+) -> None:
+    """
+    Write the named ``sections`` (e.g. accessed, unaccessed) of ``data`` to
+    ``filename``, which is opened only once. JSON output is streamed as a single
+    object. Otherwise each field is written as a line from
+    :py:func:`output_generator`.
+
+    If ``data`` has ``access`` counters, JSON output maps each field to all of
+    its counters, and line output with counts starts with a header line naming
+    the columns.
+    """
+    access = data.get('access')
+    with open_output(filename, atomic=atomic) as fdesc:
+        if as_json and access is not None:
+            fdesc.writelines(
+                json_chunks(
+                    {
+                        name: counters_to_dict(access.counters_for(name), ACCESS_TYPES)
+                        for name in data[key]
+                    }
+                    for key in sections
+                )
+            )
+        elif as_json:
+            fdesc.writelines(json_chunks(data[key] for key in sections))
+        else:
+            if show_counts and access is not None:
+                fdesc.write(access_header(raw_delimiter))
+            for key in sections:
+                fdesc.writelines(
+                    output_generator(data[key], show_counts, raw_delimiter, access)
+                )
+
+
+def opts_with(key: str, **changes: t.Any) -> t.Dict[str, t.Dict[str, t.Any]]:
+    """
+    Return settings for option ``key`` from ``OPTS`` with ``changes`` applied,
+    for one command only. Overrides passed to ``cli_opts`` change the shared
+    settings in place, and so every command defined after them.
+    """
+    return {key: {**OPTS[key], **changes}}
+
+
+def write_files(
+    all_data: t.Mapping[str, t.Dict[str, t.Any]],
+    names: t.Sequence[str],
+    sections: t.Sequence[str],
+    show_counts: bool,
+    filepath: str,
+    prefix: str,
+    suffix: str,
+    raw_delimiter: str,
+    atomic: bool = False,
+    workers: int = 1,
+) -> t.List[str]:
+    """
+    Write the ``sections`` of each of ``names`` in ``all_data`` with
+    :py:func:`write_file` to {prefix}-{name}.{suffix} in ``filepath``, and return
+    the filenames. With more than one of ``workers``, files are formatted and
+    written concurrently.
+    """
+
+    def write_index(idx: str) -> str:
+        fname = f'{prefix}-{idx}.{suffix}'
+        write_file(
+            os.path.join(filepath, fname),
+            all_data[idx],
+            sections,
+            show_counts,
+            raw_delimiter,
+            suffix == 'json',
+            atomic=atomic,
+        )
+        return fname
+
+    return concurrent_map(write_index, list(names), workers)
+
+
+def write_breakdown(
+    filename: str,
+    data: t.Dict[str, t.Any],
+    raw_delimiter: str,
+    as_json: bool,
+    atomic: bool = False,
+) -> None:
+    """
+    Write the per-node and per-shard-copy field reads in ``data`` to
+    ``filename``, as JSON or as delimited lines with a header
+    """
+    with open_output(filename, atomic=atomic) as fdesc:
+        if as_json:
+            json.dump(data, fdesc, indent=2)
+            fdesc.write('\n')
+        else:
+            fdesc.writelines(breakdown_lines(data, format_delimiter(raw_delimiter)))
+
+
 def override_filepath() -> t.Dict[str, str]:
     """Override the default filepath if we're running Docker"""
     if is_docker():
@@ -108,6 +361,23 @@ def override_filepath() -> t.Dict[str, str]:
 @WRP(*escl.cli_opts('unaccessed', settings=OPTS, onoff=SHW))
 @WRP(*escl.cli_opts('counts', settings=OPTS, onoff=SHW))
 @WRP(*escl.cli_opts('delimiter', settings=OPTS))
+@WRP(*escl.cli_opts('top', settings=OPTS))
+@WRP(*escl.cli_opts('bottom', settings=OPTS))
+@WRP(*escl.cli_opts('min-count', settings=OPTS))
+@WRP(*escl.cli_opts('max-count', settings=OPTS))
+@WRP(*escl.cli_opts('workers', settings=OPTS))
+@WRP(*escl.cli_opts('batch-size', settings=OPTS))
+@WRP(*escl.cli_opts('lru-size', settings=OPTS))
+@WRP(*escl.cli_opts('cache', settings=OPTS, onoff={'on': '', 'off': 'no-'}))
+@WRP(*escl.cli_opts('cache-dir', settings=OPTS))
+@WRP(*escl.cli_opts('usage-ttl', settings=OPTS))
+@WRP(*escl.cli_opts('mapping-ttl', settings=OPTS))
+@WRP(*escl.cli_opts('usage-file', settings=OPTS))
+@WRP(*escl.cli_opts('mappings-file', settings=OPTS))
+@WRP(*escl.cli_opts('access-types', settings=OPTS, onoff={'on': '', 'off': 'no-'}))
+@WRP(*escl.cli_opts('breakdown', settings=OPTS, onoff={'on': '', 'off': 'no-'}))
+@WRP(*escl.cli_opts('timings', settings=OPTS, onoff=SHW))
+@WRP(*escl.cli_opts('timings-file', settings=OPTS))
 @click.argument('search_pattern', type=str, nargs=1)
 @click.pass_context
 def stdout(
@@ -118,6 +388,23 @@ def stdout(
     show_unaccessed: bool,
     show_counts: bool,
     delimiter: str,
+    top: t.Optional[int],
+    bottom: t.Optional[int],
+    min_count: t.Optional[int],
+    max_count: t.Optional[int],
+    workers: int,
+    batch_size: int,
+    lru_size: int,
+    cache: bool,
+    cache_dir: str,
+    usage_ttl: float,
+    mapping_ttl: float,
+    usage_file: t.Optional[str],
+    mappings_file: t.Optional[str],
+    access_types: bool,
+    breakdown: bool,
+    show_timings: bool,
+    timings_file: t.Optional[str],
     search_pattern: str,
 ) -> None:
     """
@@ -130,23 +417,60 @@ def stdout(
 
     $ es-fieldusage stdout --hide-report --hide-headers --show-unaccessed 'index-*' \
      | grep process
+
+    --top and --bottom show only the N most or least accessed of the shown
+    fields, and --min-count and --max-count only fields accessed within that
+    range. The summary report still counts every field.
     """
     logger = logging.getLogger(__name__)
+    selection = get_selection(top, bottom, min_count, max_count)
+    offline_client = get_offline_client(usage_file, mappings_file)
+    metrics = get_metrics(show_timings, timings_file)
     try:
-        field_usage = FieldUsage(ctx.obj['configdict'], search_pattern)
+        field_usage = FieldUsage(
+            ctx.obj['configdict'],
+            search_pattern,
+            workers=workers,
+            batch_size=batch_size,
+            lru_size=lru_size,
+            cache=get_cache(cache, cache_dir, usage_ttl, mapping_ttl, offline_client),
+            client=offline_client,
+            metrics=metrics,
+            access_types=access_types,
+            keep_shards=breakdown,
+        )
     except Exception as exc:
         logger.critical(f'Exception encountered: {exc}')
         raise FatalException from exc
     if show_report:
         output_report(search_pattern, field_usage.report)
-    if show_accessed:
-        msg = header_msg('\nAccessed Fields (in descending frequency):', show_headers)
-        click.secho(msg, overline=show_headers, underline=show_headers, bold=True)
-        printout(field_usage.report['accessed'], show_counts, delimiter)
-    if show_unaccessed:
-        msg = header_msg('\nUnaccessed Fields', show_headers)
-        click.secho(msg, overline=show_headers, underline=show_headers, bold=True)
-        printout(field_usage.report['unaccessed'], show_counts, delimiter)
+    access = field_usage.report.get('access')
+    with field_usage.phase('output'):
+        shown = select_sections(
+            field_usage.report,
+            get_sections(show_accessed, show_unaccessed),
+            selection,
+        )
+        if show_accessed:
+            msg = header_msg(
+                '\nAccessed Fields (in descending frequency):', show_headers
+            )
+            click.secho(msg, overline=show_headers, underline=show_headers, bold=True)
+            if show_headers and show_counts and access is not None:
+                click.secho(access_header(delimiter), nl=False)
+            printout(shown['accessed'], show_counts, delimiter, access)
+        if show_unaccessed:
+            msg = header_msg('\nUnaccessed Fields', show_headers)
+            click.secho(msg, overline=show_headers, underline=show_headers, bold=True)
+            printout(shown['unaccessed'], show_counts, delimiter, access)
+        if breakdown:
+            msg = header_msg('\nField Reads Per Shard Copy', show_headers)
+            click.secho(msg, overline=show_headers, underline=show_headers, bold=True)
+            for line in breakdown_lines(
+                field_usage.breakdown, format_delimiter(delimiter)
+            ):
+                click.secho(line, nl=False)
+    report_timings(metrics, show_timings, timings_file)
 
 
 @click.command(epilog=EPILOG)
@@ -159,6 +483,27 @@ def stdout(
 @WRP(*escl.cli_opts('prefix', settings=OPTS))
 @WRP(*escl.cli_opts('suffix', settings=OPTS))
 @WRP(*escl.cli_opts('delimiter', settings=OPTS))
+@WRP(*escl.cli_opts('top', settings=OPTS))
+@WRP(*escl.cli_opts('bottom', settings=OPTS))
+@WRP(*escl.cli_opts('min-count', settings=OPTS))
+@WRP(*escl.cli_opts('max-count', settings=OPTS))
+@WRP(*escl.cli_opts('atomic', settings=OPTS, onoff={'on': '', 'off': 'no-'}))
+@WRP(*escl.cli_opts('output-format', settings=OPTS))
+@WRP(*escl.cli_opts('compression', settings=OPTS))
+@WRP(*escl.cli_opts('chunk-rows', settings=OPTS))
+@WRP(*escl.cli_opts('workers', settings=OPTS))
+@WRP(*escl.cli_opts('batch-size', settings=OPTS))
+@WRP(*escl.cli_opts('lru-size', settings=OPTS))
+@WRP(*escl.cli_opts('cache', settings=OPTS, onoff={'on': '', 'off': 'no-'}))
+@WRP(*escl.cli_opts('cache-dir', settings=OPTS))
+@WRP(*escl.cli_opts('usage-ttl', settings=OPTS))
+@WRP(*escl.cli_opts('mapping-ttl', settings=OPTS))
+@WRP(*escl.cli_opts('usage-file', settings=OPTS))
+@WRP(*escl.cli_opts('mappings-file', settings=OPTS))
+@WRP(*escl.cli_opts('access-types', settings=OPTS, onoff={'on': '', 'off': 'no-'}))
+@WRP(*escl.cli_opts('breakdown', settings=OPTS, onoff={'on': '', 'off': 'no-'}))
+@WRP(*escl.cli_opts('timings', settings=OPTS, onoff=SHW))
+@WRP(*escl.cli_opts('timings-file', settings=OPTS))
 @click.argument('search_pattern', type=str, nargs=1)
 @click.pass_context
 def file(
@@ -172,6 +517,27 @@ def file(
     prefix: str,
     suffix: str,
     delimiter: str,
+    top: t.Optional[int],
+    bottom: t.Optional[int],
+    min_count: t.Optional[int],
+    max_count: t.Optional[int],
+    atomic: bool,
+    output_format: str,
+    compression: str,
+    chunk_rows: int,
+    workers: int,
+    batch_size: int,
+    lru_size: int,
+    cache: bool,
+    cache_dir: str,
+    usage_ttl: float,
+    mapping_ttl: float,
+    usage_file: t.Optional[str],
+    mappings_file: t.Optional[str],
+    access_types: bool,
+    breakdown: bool,
+    show_timings: bool,
+    timings_file: t.Optional[str],
     search_pattern: str,
 ) -> None:
     """
@@ -185,10 +551,43 @@ def file(
 
     This allows you to write to one file per index automatically, should that
     be your desire.
+
+    With --breakdown, the field reads of every shard copy and node are also
+    written to {prefix}-_shards.{suffix}.
+
+    With --output-format ndjson, parquet or arrow, one file named
+    {prefix}.{format} is written instead, with a row per field per index (or
+    all_indices), and a column per access type with --access-types. Rows are
+    written --chunk-rows at a time, as lines, Parquet row groups or Arrow record
+    batches, optionally with --compression. Parquet and arrow require pyarrow.
+
+    --top, --bottom, --min-count and --max-count pick the fields written for
+    each index, as with the stdout command.
     """
     logger = logging.getLogger(__name__)
+    selection = get_selection(top, bottom, min_count, max_count)
+    if output_format != 'lines':
+        # Fail before collecting anything, not after
+        try:
+            check_dataset(output_format, compression)
+        except ConfigurationException as exc:
+            logger.critical(exc)
+            raise FatalException from exc
+    offline_client = get_offline_client(usage_file, mappings_file)
+    metrics = get_metrics(show_timings, timings_file)
     try:
-        field_usage = FieldUsage(ctx.obj['configdict'], search_pattern)
+        field_usage = FieldUsage(
+            ctx.obj['configdict'],
+            search_pattern,
+            workers=workers,
+            batch_size=batch_size,
+            lru_size=lru_size,
+            cache=get_cache(cache, cache_dir, usage_ttl, mapping_ttl, offline_client),
+            client=offline_client,
+            metrics=metrics,
+            access_types=access_types,
+            keep_shards=breakdown,
+        )
     except Exception as exc:
         logger.critical(f'Exception encountered: {exc}')
         raise FatalException from exc
@@ -196,39 +595,46 @@ def file(
         output_report(search_pattern, field_usage.report)
         click.secho()
 
-    all_data = get_per_index(field_usage, per_index)
-
-    files_written = []
-    for idx in list(all_data.keys()):
-        fname = f'{prefix}-{idx}.{suffix}'
-        filename = os.path.join(filepath, fname)
-
-        # if the file already exists, remove it first so we don't append to old
-        # data below
-        if os.path.exists(filename):
-            os.remove(filename)
-
-        # JSON output can be done from a dictionary. In order to preserve the
-        # ability to show/hide accessed & unaccessed, I need a clean dictionary
-        output = {}
-        files_written.append(fname)
-        for key, boolval in {
-            'accessed': show_accessed,
-            'unaccessed': show_unaccessed,
-        }.items():
-            if boolval:
-                output.update(all_data[idx][key])
-                if not suffix == 'json':
-                    generator = output_generator(
-                        all_data[idx][key], show_counts, delimiter
-                    )
-                    with open(filename, 'a', encoding='utf-8') as fdesc:
-                        fdesc.writelines(generator)
-        # Now we write output as a JSON object, if we selected that
-        if suffix == 'json':
-            with open(filename, 'a', encoding='utf-8') as fdesc:
-                json.dump(output, fdesc, indent=2)
-                fdesc.write('\n')
+    sections = get_sections(show_accessed, show_unaccessed)
+    all_data = SelectView(get_per_index(field_usage, per_index), sections, selection)
+    with field_usage.phase('output'):
+        if output_format == 'lines':
+            files_written = write_files(
+                all_data,
+                list(all_data.keys()),
+                sections,
+                show_counts,
+                filepath,
+                prefix,
+                suffix,
+                delimiter,
+                atomic=atomic,
+                workers=workers,
+            )
+        else:
+            fname = dataset_filename(prefix, output_format, compression)
+            rows = write_dataset(
+                os.path.join(filepath, fname),
+                all_data,
+                sections,
+                output_format,
+                compression=compression,
+                access=access_types,
+                chunk_rows=chunk_rows,
+                atomic=atomic,
+            )
+            logger.info(f'{rows} rows written to {fname}')
+            files_written = [fname]
+        if breakdown:
+            fname = f'{prefix}-_shards.{suffix}'
+            write_breakdown(
+                os.path.join(filepath, fname),
+                field_usage.breakdown,
+                delimiter,
+                suffix == 'json',
+                atomic=atomic,
+            )
+            files_written.append(fname)
     click.secho('Number of files written: ', nl=False)
     click.secho(len(files_written), bold=True)
     click.secho('Filenames: ', nl=False)
@@ -237,6 +643,7 @@ def file(
         click.secho(' ... (too many to show)')
     else:
         click.secho(files_written, bold=True)
+    report_timings(metrics, show_timings, timings_file)
 
 
 @click.command(epilog=EPILOG)
@@ -245,6 +652,21 @@ def file(
 @WRP(*escl.cli_opts('unaccessed', settings=OPTS, onoff=SHW, override=TRU))
 @WRP(*escl.cli_opts('index', settings=OPTS, onoff={'on': 'per-', 'off': 'not-per-'}))
 @WRP(*escl.cli_opts('indexname', settings=OPTS))
+@WRP(*escl.cli_opts('chunk-size', settings=OPTS))
+@WRP(*escl.cli_opts('max-retries', settings=OPTS))
+@WRP(*escl.cli_opts('initial-backoff', settings=OPTS))
+@WRP(*escl.cli_opts('workers', settings=OPTS))
+@WRP(*escl.cli_opts('batch-size', settings=OPTS))
+@WRP(*escl.cli_opts('lru-size', settings=OPTS))
+@WRP(*escl.cli_opts('cache', settings=OPTS, onoff={'on': '', 'off': 'no-'}))
+@WRP(*escl.cli_opts('cache-dir', settings=OPTS))
+@WRP(*escl.cli_opts('usage-ttl', settings=OPTS))
+@WRP(*escl.cli_opts('mapping-ttl', settings=OPTS))
+@WRP(*escl.cli_opts('usage-file', settings=OPTS))
+@WRP(*escl.cli_opts('mappings-file', settings=OPTS))
+@WRP(*escl.cli_opts('access-types', settings=OPTS, onoff={'on': '', 'off': 'no-'}))
+@WRP(*escl.cli_opts('timings', settings=OPTS, onoff=SHW))
+@WRP(*escl.cli_opts('timings-file', settings=OPTS))
 @click.argument('search_pattern', type=str, nargs=1)
 @click.pass_context
 def index(
@@ -254,69 +676,622 @@ def index(
     show_unaccessed: bool,
     per_index: bool,
     indexname: str,
+    chunk_size: int,
+    max_retries: int,
+    initial_backoff: float,
+    workers: int,
+    batch_size: int,
+    lru_size: int,
+    cache: bool,
+    cache_dir: str,
+    usage_ttl: float,
+    mapping_ttl: float,
+    usage_file: t.Optional[str],
+    mappings_file: t.Optional[str],
+    access_types: bool,
+    show_timings: bool,
+    timings_file: t.Optional[str],
     search_pattern: str,
 ) -> None:
     """
-    Write field usage information to file for SEARCH_PATTERN
+    Index field usage information for SEARCH_PATTERN into Elasticsearch
 
     $ es_fieldusage index [OPTIONS] SEARCH_PATTERN
 
     This will write a document per fieldname per index found in SEARCH_PATTERN
     to INDEXNAME, where the JSON structure is:
 
+    \b
     {
+      "@timestamp": TIMESTAMP,
       "index": SOURCEINDEXNAME,
       "field": {
         "name": "FIELDNAME",
         "count": COUNT
       }
     }
+
+    Documents are generated as they are sent with the bulk API, using --workers
+    threads. Bulk requests rejected with a 429 are retried with exponential
+    backoff.
+
+    With --usage-file and --mappings-file, field usage is read from those files,
+    and the documents are indexed into the configured cluster.
     """
     logger = logging.getLogger(__name__)
     logger.debug(f'indexname = {indexname}')
     timestamp = f"{datetime.now(timezone.utc).isoformat().split('.')[0]}.000Z"
+    offline_client = get_offline_client(usage_file, mappings_file)
+    metrics = get_metrics(show_timings, timings_file)
     try:
-        field_usage = FieldUsage(ctx.obj['configdict'], search_pattern)
+        field_usage = FieldUsage(
+            ctx.obj['configdict'],
+            search_pattern,
+            workers=workers,
+            batch_size=batch_size,
+            lru_size=lru_size,
+            cache=get_cache(cache, cache_dir, usage_ttl, mapping_ttl, offline_client),
+            client=offline_client,
+            metrics=metrics,
+            access_types=access_types,
+        )
     except Exception as exc:
         logger.critical(f'Exception encountered: {exc}')
         raise FatalException from exc
-    # client = field_usage.client
     if show_report:
         output_report(search_pattern, field_usage.report)
         click.secho()
 
+    if offline_client is None:
+        bulk_client = field_usage.client
+    else:
+        # Saved responses are read from files, but documents go to the cluster
+        try:
+            bulk_client = escl.get_client(configdict=ctx.obj['configdict'])
+        except Exception as exc:
+            logger.critical(f'Exception encountered: {exc}')
+            raise FatalException from exc
     all_data = get_per_index(field_usage, per_index)
+    sections = get_sections(show_accessed, show_unaccessed)
+    with field_usage.phase('output'):
+        summary = bulk_index(
+            bulk_client,
+            field_documents(all_data, sections, indexname, timestamp),
+            chunk_size=chunk_size,
+            workers=workers,
+            max_retries=max_retries,
+            initial_backoff=initial_backoff,
+        )
+    click.secho('Documents indexed: ', nl=False)
+    click.secho(summary['success'], bold=True)
+    click.secho('Documents failed: ', nl=False)
+    click.secho(summary['failed'], bold=True)
+    report_timings(metrics, show_timings, timings_file)
 
-    # TESTING
-    fname = 'testing'
-    filepath = os.getcwd()
-    filename = os.path.join(filepath, fname)
 
-    # If the file already exists, remove it so we don't append to old data
-    if os.path.exists(filename):
-        os.remove(filename)
-    # END TESTING
+@click.command(epilog=EPILOG)
+@WRP(*escl.cli_opts('interval', settings=OPTS))
+@WRP(*escl.cli_opts('polls', settings=OPTS))
+@WRP(*escl.cli_opts('sink', settings=OPTS))
+@WRP(*escl.cli_opts('report', settings=OPTS, onoff=SHW))
+@WRP(*escl.cli_opts('accessed', settings=OPTS, onoff=SHW, override=TRU))
+@WRP(*escl.cli_opts('unaccessed', settings=OPTS, onoff=SHW, override=TRU))
+@WRP(*escl.cli_opts('counts', settings=OPTS, onoff=SHW, override=TRU))
+@WRP(*escl.cli_opts('index', settings=OPTS, onoff={'on': 'per-', 'off': 'not-per-'}))
+@WRP(*escl.cli_opts('filepath', settings=OPTS, override=override_filepath()))
+@WRP(*escl.cli_opts('prefix', settings=OPTS))
+@WRP(*escl.cli_opts('suffix', settings=OPTS))
+@WRP(*escl.cli_opts('delimiter', settings=OPTS))
+@WRP(*escl.cli_opts('atomic', settings=OPTS, onoff={'on': '', 'off': 'no-'}))
+@WRP(*escl.cli_opts('indexname', settings=OPTS))
+@WRP(*escl.cli_opts('chunk-size', settings=OPTS))
+@WRP(*escl.cli_opts('max-retries', settings=OPTS))
+@WRP(*escl.cli_opts('initial-backoff', settings=OPTS))
+@WRP(*escl.cli_opts('workers', settings=OPTS))
+@WRP(*escl.cli_opts('batch-size', settings=OPTS))
+@WRP(*escl.cli_opts('access-types', settings=OPTS, onoff={'on': '', 'off': 'no-'}))
+@click.argument('search_pattern', type=str, nargs=1)
+@click.pass_context
+def watch(
+    ctx: click.Context,
+    interval: float,
+    polls: int,
+    sink: t.Sequence[str],
+    show_report: bool,
+    show_accessed: bool,
+    show_unaccessed: bool,
+    show_counts: bool,
+    per_index: bool,
+    filepath: str,
+    prefix: str,
+    suffix: str,
+    delimiter: str,
+    atomic: bool,
+    indexname: str,
+    chunk_size: int,
+    max_retries: int,
+    initial_backoff: float,
+    workers: int,
+    batch_size: int,
+    access_types: bool,
+    search_pattern: str,
+) -> None:
+    """
+    Poll field usage for SEARCH_PATTERN and send the results to each --sink
 
-    output = []
-    for idx in list(all_data.keys()):
-        for key, boolval in {
-            'accessed': show_accessed,
-            'unaccessed': show_unaccessed,
-        }.items():
-            if boolval:
-                for fieldname, value in all_data[idx][key].items():
-                    obj = {
-                        '@timestamp': timestamp,
-                        'index': idx,
-                        'field': {'name': fieldname, 'count': value},
-                    }
-                    output.append(obj)
+    $ es_fieldusage watch [OPTIONS] SEARCH_PATTERN
+
+    The client connection is made once and kept open, and the field usage API is
+    called again every --interval seconds. Only the indices whose counts changed
+    since the last poll are recomputed, and sent to the file and index sinks.
+    The stdout sink prints the report (with --show-report) and the number of
+    changed indices.
+
+    Files and documents are the same as those of the file and index commands.
+    Without --per-index, the all_indices file or documents are sent again
+    whenever any index changed.
+
+    Polling stops after --polls polls, or when interrupted with Ctrl-C.
+    """
+    logger = logging.getLogger(__name__)
+    try:
+        client = escl.get_client(configdict=ctx.obj['configdict'])
+        field_usage = FieldUsage(
+            ctx.obj['configdict'],
+            search_pattern,
+            workers=workers,
+            batch_size=batch_size,
+            client=client,
+            access_types=access_types,
+        )
+    except Exception as exc:
+        logger.critical(f'Exception encountered: {exc}')
+        raise FatalException from exc
+    sections = get_sections(show_accessed, show_unaccessed)
+    changed = list(field_usage.usage_stats)
+    started = time.monotonic()
+    poll = 1
+    try:
+        while True:
+            timestamp = f"{datetime.now(timezone.utc).isoformat().split('.')[0]}.000Z"
+            all_data = get_per_index(field_usage, per_index)
+            names = changed if per_index else (list(all_data) if changed else [])
+            if 'stdout' in sink:
+                click.secho(f'{timestamp} poll {poll}: ', nl=False)
+                click.secho(f'{len(changed)} indices changed', bold=True)
+                if show_report:
+                    output_report(search_pattern, field_usage.report)
+            if 'file' in sink and names:
+                write_files(
+                    all_data,
+                    names,
+                    sections,
+                    show_counts,
+                    filepath,
+                    prefix,
+                    suffix,
+                    delimiter,
+                    atomic=atomic,
+                    workers=workers,
+                )
+            if 'index' in sink and names:
+                summary = bulk_index(
+                    field_usage.client,
+                    field_documents(
+                        {name: all_data[name] for name in names},
+                        sections,
+                        indexname,
+                        timestamp,
+                    ),
+                    chunk_size=chunk_size,
+                    workers=workers,
+                    max_retries=max_retries,
+                    initial_backoff=initial_backoff,
+                )
+                if summary['failed']:
+                    logger.warning(f'{summary["failed"]} documents failed to index')
+            if polls and poll >= polls:
+                break
+            # Polls are scheduled from the start, so slow polls do not drift
+            time.sleep(max(0.0, started + poll * interval - time.monotonic()))
+            poll += 1
+            try:
+                changed = field_usage.refresh()
+            except Exception as exc:  # pylint: disable=W0718
+                # Keep the last results, and try again at the next poll
+                logger.error(f'Unable to poll field usage: {exc}')
+                changed = []
+    except KeyboardInterrupt:
+        click.secho('Stopped watching')
+
+
+@click.command(epilog=EPILOG)
+@WRP(*escl.cli_opts('headers', settings=OPTS, onoff=SHW))
+@WRP(*escl.cli_opts('counts', settings=OPTS, onoff=SHW, override=TRU))
+@WRP(
+    *escl.cli_opts(
+        'index',
+        settings=opts_with('index', help='Show changes per index'),
+        onoff={'on': 'per-', 'off': 'not-per-'},
+    )
+)
+@WRP(*escl.cli_opts('delimiter', settings=OPTS))
+@WRP(*escl.cli_opts('snapshot-dir', settings=OPTS))
+@WRP(*escl.cli_opts('save', settings=OPTS, onoff={'on': '', 'off': 'no-'}))
+@WRP(*escl.cli_opts('workers', settings=OPTS))
+@WRP(*escl.cli_opts('batch-size', settings=OPTS))
+@click.argument('search_pattern', type=str, nargs=1)
+@click.pass_context
+def diff(
+    ctx: click.Context,
+    show_headers: bool,
+    show_counts: bool,
+    per_index: bool,
+    delimiter: str,
+    snapshot_dir: str,
+    save: bool,
+    workers: int,
+    batch_size: int,
+    search_pattern: str,
+) -> None:
+    """
+    Show the fields in SEARCH_PATTERN whose usage changed since the last run
+
+    $ es-fieldusage diff [OPTIONS] SEARCH_PATTERN
+
+    The field usage counters for every shard copy are saved to --snapshot-dir
+    on each run, and compared to those from the previous run. Counters which
+    were reset by a shard relocation or node restart are accounted for. Only the
+    changes are kept from one run to the next, so the history stays small.
+
+    The first run only saves a snapshot to compare later runs to.
+    """
+    logger = logging.getLogger(__name__)
+    # Delta files are named by this, so runs within a second must not collide
+    now = datetime.now(timezone.utc).isoformat(timespec='microseconds')
+    timestamp = now.replace('+00:00', 'Z')
+    try:
+        field_usage = FieldUsage(
+            ctx.obj['configdict'],
+            search_pattern,
+            workers=workers,
+            batch_size=batch_size,
+            keep_shards=True,
+        )
+    except Exception as exc:
+        logger.critical(f'Exception encountered: {exc}')
+        raise FatalException from exc
+    store = SnapshotStore(snapshot_dir)
+    previous = store.latest()
+    snapshot = make_snapshot(search_pattern, field_usage.shard_usage, timestamp)
+    delta = None
+    if previous is None:
+        click.secho(f'No previous snapshot found in {snapshot_dir}')
+    else:
+        if previous['search_pattern'] != search_pattern:
+            logger.warning(
+                f'Previous snapshot was for search pattern '
+                f'{previous["search_pattern"]}, not {search_pattern}'
+            )
+        changes = diff_snapshots(previous, snapshot)
+        delta = {
+            'timestamp': timestamp,
+            'previous': previous['timestamp'],
+            'search_pattern': search_pattern,
+            'indices': changes,
+        }
+        output_delta_report(search_pattern, previous['timestamp'], changes)
+        if per_index:
+            all_changes = {idx: changes[idx] for idx in sorted(changes)}
+        else:
+            all_changes = {'all_indices': sum_dict_values(changes)}
+        for idx, fields in all_changes.items():
+            msg = header_msg(f'\nChanged Fields ({idx}):', show_headers)
+            click.secho(msg, overline=show_headers, underline=show_headers, bold=True)
+            printout(sort_by_value(fields), show_counts, delimiter)
+    if save:
+        store.save(snapshot, delta)
+        click.secho(f'Snapshot saved to {snapshot_dir}')
+
+
+@click.command(epilog=EPILOG)
+@WRP(
+    *escl.cli_opts(
+        'usage-file',
+        settings=opts_with(
+            'usage-file',
+            help='File to save the field usage API response to',
+            type=click.Path(dir_okay=False),
+            default='fieldusage.json.gz',
+            show_default=True,
+        ),
+    )
+)
+@WRP(
+    *escl.cli_opts(
+        'mappings-file',
+        settings=opts_with(
+            'mappings-file',
+            help='File to save the mappings API response to',
+            type=click.Path(dir_okay=False),
+            default='mappings.json.gz',
+            show_default=True,
+        ),
+    )
+)
+@WRP(*escl.cli_opts('batch-size', settings=OPTS))
+@click.argument('search_pattern', type=str, nargs=1)
+@click.pass_context
+def capture(
+    ctx: click.Context,
+    usage_file: str,
+    mappings_file: str,
+    batch_size: int,
+    search_pattern: str,
+) -> None:
+    """
+    Save the field usage and mappings API responses for SEARCH_PATTERN
+
+    $ es-fieldusage capture [OPTIONS] SEARCH_PATTERN
+
+    The stdout, file and advise commands can then build reports from these
+    files with --usage-file and --mappings-file, without calling the cluster
+    again, and the index command can index them into a cluster. Files ending in
+    .gz, .bz2 or .xz are compressed.
+    """
+    logger = logging.getLogger(__name__)
+    try:
+        client = escl.get_client(configdict=ctx.obj['configdict'])
+        if batch_size:
+            cat = client.cat.indices(
+                index=search_pattern, h='index', format='json', expand_wildcards='open'
+            )
+            indices = sorted(item['index'] for item in cat)
+            patterns = [
+                ','.join(chunk)
+                for chunk in chunk_indices(indices, MAX_INDEX_CHARS, batch_size)
+            ]
+        else:
+            patterns = [search_pattern]
+        usage: t.Dict[str, t.Any] = {}
+        for pattern in patterns:
+            response = client.indices.field_usage_stats(index=pattern)
+            usage.update(getattr(response, 'body', response))
+        usage.pop('_shards', None)
+        mappings: t.Dict[str, t.Any] = {}
+        for chunk in chunk_indices(list(usage), MAX_INDEX_CHARS):
+            response = client.indices.get_mapping(index=','.join(chunk))
+            mappings.update(getattr(response, 'body', response))
+        save_dump(usage_file, usage)
+        save_dump(mappings_file, mappings)
+    except Exception as exc:
+        logger.critical(f'Exception encountered: {exc}')
+        raise FatalException from exc
+    click.secho('Indices captured: ', nl=False)
+    click.secho(len(usage), bold=True)
+    click.secho('Files written: ', nl=False)
+    click.secho([usage_file, mappings_file], bold=True)
+
+
+@click.command(epilog=EPILOG)
+@WRP(*escl.cli_opts('disk-usage', settings=OPTS, onoff={'on': '', 'off': 'no-'}))
+@WRP(*escl.cli_opts('json', settings=OPTS, onoff={'on': 'as-', 'off': 'not-as-'}))
+@WRP(*escl.cli_opts('workers', settings=OPTS))
+@WRP(*escl.cli_opts('batch-size', settings=OPTS))
+@WRP(*escl.cli_opts('cache', settings=OPTS, onoff={'on': '', 'off': 'no-'}))
+@WRP(*escl.cli_opts('cache-dir', settings=OPTS))
+@WRP(*escl.cli_opts('usage-ttl', settings=OPTS))
+@WRP(*escl.cli_opts('mapping-ttl', settings=OPTS))
+@WRP(*escl.cli_opts('usage-file', settings=OPTS))
+@WRP(*escl.cli_opts('mappings-file', settings=OPTS))
+@click.argument('search_pattern', type=str, nargs=1)
+@click.pass_context
+def advise(
+    ctx: click.Context,
+    disk_usage: bool,
+    as_json: bool,
+    workers: int,
+    batch_size: int,
+    cache: bool,
+    cache_dir: str,
+    usage_ttl: float,
+    mapping_ttl: float,
+    usage_file: t.Optional[str],
+    mappings_file: t.Optional[str],
+    search_pattern: str,
+) -> None:
+    """
+    Recommend mapping changes for the fields in SEARCH_PATTERN
+
+    $ es-fieldusage advise [OPTIONS] SEARCH_PATTERN
+
+    Every type of access to each field is counted, and compared to its mapping.
+    Fields which are never searched, sorted, aggregated or scored can have
+    their index, doc_values or norms disabled, objects where nothing is
+    accessed can be disabled entirely, and unused multi-fields removed.
+    Indices sharing a mapping (e.g. from one index template) are advised on
+    together.
 
-    # TESTING
-    with open(filename, 'a', encoding='utf-8') as fdesc:
-        json.dump(output, fdesc, indent=2)
-        fdesc.write('\n')
-    # END TESTING
+    With --disk-usage, the savings of each change are estimated from the disk
+    usage API. This needs the cluster, so it cannot be used with --usage-file
+    and --mappings-file.
+
+    Usage is only counted since each shard copy started tracking it (usually
+    when it was last started or relocated), so check that this covers every
+    kind of query you run before making changes.
+    """
+    logger = logging.getLogger(__name__)
+    if disk_usage and (usage_file or mappings_file):
+        raise click.UsageError(
+            '--disk-usage cannot be used with --usage-file and --mappings-file'
+        )
+    offline_client = get_offline_client(usage_file, mappings_file)
+    try:
+        field_usage = FieldUsage(
+            ctx.obj['configdict'],
+            search_pattern,
+            workers=workers,
+            batch_size=batch_size,
+            cache=get_cache(cache, cache_dir, usage_ttl, mapping_ttl, offline_client),
+            client=offline_client,
+            access_types=True,
+        )
+        groups = advise_mappings(field_usage, disk_usage=disk_usage)
+    except Exception as exc:
+        logger.critical(f'Exception encountered: {exc}')
+        raise FatalException from exc
+    if as_json:
+        click.echo(json.dumps(groups, indent=2))
+    else:
+        output_advice(search_pattern, groups)
+
+
+@click.command(epilog=EPILOG)
+@WRP(*escl.cli_opts('cluster', settings=OPTS))
+@WRP(*escl.cli_opts('cluster-workers', settings=OPTS))
+@WRP(*escl.cli_opts('report', settings=OPTS, onoff=SHW))
+@WRP(*escl.cli_opts('headers', settings=OPTS, onoff=SHW))
+@WRP(*escl.cli_opts('accessed', settings=OPTS, onoff=SHW))
+@WRP(*escl.cli_opts('unaccessed', settings=OPTS, onoff=SHW))
+@WRP(*escl.cli_opts('counts', settings=OPTS, onoff=SHW))
+@WRP(*escl.cli_opts('delimiter', settings=OPTS))
+@WRP(*escl.cli_opts('json', settings=OPTS, onoff={'on': 'as-', 'off': 'not-as-'}))
+@WRP(*escl.cli_opts('workers', settings=OPTS))
+@WRP(*escl.cli_opts('batch-size', settings=OPTS))
+@WRP(*escl.cli_opts('access-types', settings=OPTS, onoff={'on': '', 'off': 'no-'}))
+@click.argument('search_pattern', type=str, nargs=1)
+def clusters(
+    cluster: t.Sequence[str],
+    cluster_workers: int,
+    show_report: bool,
+    show_headers: bool,
+    show_accessed: bool,
+    show_unaccessed: bool,
+    show_counts: bool,
+    delimiter: str,
+    as_json: bool,
+    workers: int,
+    batch_size: int,
+    access_types: bool,
+    search_pattern: str,
+) -> None:
+    """
+    Show field usage for SEARCH_PATTERN in several clusters, and merged
+
+    $ es-fieldusage clusters --cluster prod=prod.yml --cluster dr.yml 'index-*'
+
+    Every --cluster is an es_client configuration file, named NAME (or after the
+    file without its suffix). The connection settings of the top-level command
+    are not used. Clusters are collected from concurrently, each with its own
+    client, so the run takes about as long as the slowest cluster.
+
+    The report of each cluster is shown, then the report and fields of all of
+    them merged, with the counts of fields of the same name summed. With
+    --as-json, the reports and fields of every cluster and the merged ones are
+    printed as JSON instead. Clusters which fail are logged and skipped.
+    """
+    logger = logging.getLogger(__name__)
+    try:
+        configs = load_configs(cluster)
+    except Exception as exc:
+        logger.critical(f'Exception encountered: {exc}')
+        raise FatalException from exc
+    usages, errors = collect_clusters(
+        configs,
+        search_pattern,
+        cluster_workers or len(configs),
+        workers=workers,
+        batch_size=batch_size,
+        access_types=access_types,
+    )
+    if not usages:
+        logger.critical('Unable to collect field usage from any cluster')
+        raise FatalException
+    reports = {name: usages[name].report for name in configs if name in usages}
+    merged = merge_reports(reports)
+    if as_json:
+        data = {
+            'clusters': {name: report_to_dict(rpt) for name, rpt in reports.items()},
+            'merged': report_to_dict(merged),
+            'errors': errors,
+        }
+        click.echo(json.dumps(data, indent=2))
+        return
+    if show_report:
+        for name, report in reports.items():
+            output_report(f'{search_pattern} (cluster {name})', report)
+        output_report(f'{search_pattern} (all clusters)', merged)
+    access = merged.get('access')
+    if show_accessed:
+        msg = header_msg('\nAccessed Fields (in descending frequency):', show_headers)
+        click.secho(msg, overline=show_headers, underline=show_headers, bold=True)
+        if show_headers and show_counts and access is not None:
+            click.secho(access_header(delimiter), nl=False)
+        printout(merged['accessed'], show_counts, delimiter, access)
+    if show_unaccessed:
+        msg = header_msg('\nUnaccessed Fields', show_headers)
+        click.secho(msg, overline=show_headers, underline=show_headers, bold=True)
+        printout(merged['unaccessed'], show_counts, delimiter, access)
+    if errors:
+        click.secho('Clusters failed: ', nl=False)
+        click.secho(sorted(errors), bold=True)
+
+
+@click.command(epilog=EPILOG)
+@WRP(*escl.cli_opts('host', settings=OPTS))
+@WRP(*escl.cli_opts('port', settings=OPTS))
+@WRP(*escl.cli_opts('interval', settings=OPTS))
+@WRP(*escl.cli_opts('top-fields', settings=OPTS))
+@WRP(*escl.cli_opts('rollup', settings=OPTS))
+@WRP(*escl.cli_opts('workers', settings=OPTS))
+@WRP(*escl.cli_opts('batch-size', settings=OPTS))
+@click.argument('search_pattern', type=str, nargs=1)
+@click.pass_context
+def export(
+    ctx: click.Context,
+    host: str,
+    port: int,
+    interval: float,
+    top_fields: int,
+    rollup: t.Sequence[str],
+    workers: int,
+    batch_size: int,
+    search_pattern: str,
+) -> None:
+    """
+    Serve field usage for SEARCH_PATTERN as Prometheus metrics
+
+    $ es-fieldusage export [OPTIONS] SEARCH_PATTERN
+
+    The reads of each field of each index are served at
+    http://HOST:PORT/metrics, along with the total reads and the number of
+    accessed and unaccessed fields of each index. Field usage is collected again
+    every --interval seconds over one client connection, and only indices which
+    changed are computed again. Scrapes are served from the last result, and
+    never call the cluster.
+
+    To keep the number of series down, only the --top-fields most read fields
+    of each index get their own series, and indices matching a --rollup pattern
+    (e.g. 'logs-*') are summed into one index label of that pattern.
+    """
+    logger = logging.getLogger(__name__)
+    try:
+        field_usage = FieldUsage(
+            ctx.obj['configdict'],
+            search_pattern,
+            workers=workers,
+            batch_size=batch_size,
+            client=escl.get_client(configdict=ctx.obj['configdict']),
+        )
+        exporter = Exporter(field_usage, top_fields=top_fields, rollups=rollup)
+    except Exception as exc:
+        logger.critical(f'Exception encountered: {exc}')
+        raise FatalException from exc
+    click.secho(f'Serving metrics at http://{host}:{port}/metrics')
+    try:
+        exporter.serve(host, port, interval)
+    except KeyboardInterrupt:
+        click.secho('Stopped serving metrics')
 
 
 @click.command(epilog=EPILOG)
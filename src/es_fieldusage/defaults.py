@@ -3,13 +3,86 @@
 # pylint: disable=E1120
 import typing as t
 import os
-
+import click
 
 # This value is hard-coded in the Dockerfile, so don't change it
 FILEPATH_OVERRIDE: str = '/fileoutput'
 
 INDEXNAME: str = 'es-fieldusage'
 
+# Index names are sent comma-separated in the URL path. Elasticsearch rejects
+# request lines longer than 4kb by default (http.max_initial_line_length), so
+# keep batches of index names comfortably below that.
+MAX_INDEX_CHARS: int = 3072
+
+# Only ask the field usage API for what we actually read. Each shard's
+# tracking_id is kept so that indices whose shards have no field stats yet are
+# still returned, along with the node it is on and whether it is the primary.
+# The _id and _source entries are dropped server-side, as are all of the
+# per-access-type counters besides "any".
+USAGE_FILTER_PATH: t.List[str] = [
+    '-*.shards.stats.fields._id',
+    '-*.shards.stats.fields._source',
+    '*.shards.tracking_id',
+    '*.shards.routing.node',
+    '*.shards.routing.primary',
+    '*.shards.stats.fields.*.any',
+]
+
+# The per-access-type counters kept for each field with --access-types, in the
+# order they are stored. Nested counters are named by their dotted path.
+ACCESS_TYPES: t.Tuple[str, ...] = (
+    'any',
+    'inverted_index.terms',
+    'inverted_index.postings',
+    'inverted_index.proximity',
+    'inverted_index.positions',
+    'inverted_index.term_frequencies',
+    'inverted_index.offsets',
+    'inverted_index.payloads',
+    'stored_fields',
+    'doc_values',
+    'points',
+    'norms',
+    'term_vectors',
+    'knn_vectors',
+)
+
+# As USAGE_FILTER_PATH, but keeping every per-access-type counter
+ACCESS_FILTER_PATH: t.List[str] = [
+    '-*.shards.stats.fields._id',
+    '-*.shards.stats.fields._source',
+    '*.shards.tracking_id',
+    '*.shards.routing.node',
+    '*.shards.routing.primary',
+    '*.shards.stats.fields',
+]
+
+# What to read from the disk usage API to estimate the savings of mapping changes
+DISK_USAGE_FILTER_PATH: t.List[str] = [
+    '*.store_size_in_bytes',
+    '*.fields.*.total_in_bytes',
+    '*.fields.*.inverted_index.total_in_bytes',
+    '*.fields.*.points_in_bytes',
+    '*.fields.*.doc_values_in_bytes',
+    '*.fields.*.norms_in_bytes',
+    '*.fields.*.term_vectors_in_bytes',
+]
+
+# What to read from the cluster metadata to tell whether a cached mapping is
+# still current
+MAPPING_VERSION_FILTER_PATH: t.List[str] = [
+    'metadata.indices.*.mapping_version',
+    'metadata.indices.*.settings.index.uuid',
+]
+
+# Output files are written through a buffer of this many bytes
+WRITE_BUFFER: int = 1024 * 1024
+
+# Files kept in the --snapshot-dir of the diff command
+SNAPSHOT_FILE: str = 'latest.json.gz'
+DELTA_PREFIX: str = 'delta-'
+
 EPILOG: str = 'Learn more at https://github.com/untergeek/es-fieldusage'
 
 HELP_OPTIONS: t.Dict[str, t.List[str]] = {'help_option_names': ['-h', '--help']}
@@ -46,6 +119,26 @@ OPTS: t.Dict[str, t.Dict[str, t.Any]] = {
         'default': ',',
         'show_default': True,
     },
+    'top': {
+        'help': 'Only the N most accessed of the shown fields',
+        'type': click.IntRange(min=1),
+        'default': None,
+    },
+    'bottom': {
+        'help': 'Only the N least accessed of the shown fields',
+        'type': click.IntRange(min=1),
+        'default': None,
+    },
+    'min-count': {
+        'help': 'Only fields accessed at least this many times',
+        'type': click.IntRange(min=0),
+        'default': None,
+    },
+    'max-count': {
+        'help': 'Only fields accessed at most this many times',
+        'type': click.IntRange(min=0),
+        'default': None,
+    },
     'index': {
         'help': 'Create one file per index found',
         'default': False,
@@ -56,6 +149,24 @@ OPTS: t.Dict[str, t.Dict[str, t.Any]] = {
         'default': INDEXNAME,
         'show_default': True,
     },
+    'chunk-size': {
+        'help': 'Number of documents per bulk request',
+        'type': click.IntRange(min=1),
+        'default': 500,
+        'show_default': True,
+    },
+    'max-retries': {
+        'help': 'Times to retry a bulk request rejected with a 429',
+        'type': click.IntRange(min=0),
+        'default': 3,
+        'show_default': True,
+    },
+    'initial-backoff': {
+        'help': 'Seconds to wait before the first retry, doubling for each retry',
+        'type': click.FloatRange(min=0),
+        'default': 2.0,
+        'show_default': True,
+    },
     'filepath': {
         'help': 'Path where files will be written',
         'default': os.getcwd(),
@@ -71,5 +182,202 @@ OPTS: t.Dict[str, t.Dict[str, t.Any]] = {
         'default': 'csv',
         'show_default': True,
     },
+    'output-format': {
+        'help': (
+            'lines writes a file per index (or all_indices) named with --suffix. '
+            'ndjson, parquet and arrow write one {prefix}.{format} file with a row '
+            'per index and field'
+        ),
+        'type': click.Choice(['lines', 'ndjson', 'parquet', 'arrow']),
+        'default': 'lines',
+        'show_default': True,
+    },
+    'compression': {
+        'help': (
+            'Compression of the ndjson (gzip, bz2, xz), parquet (snappy, gzip, '
+            'zstd, lz4, brotli) or arrow (zstd, lz4) file'
+        ),
+        'type': click.Choice(
+            ['none', 'gzip', 'bz2', 'xz', 'snappy', 'zstd', 'lz4', 'brotli']
+        ),
+        'default': 'none',
+        'show_default': True,
+    },
+    'chunk-rows': {
+        'help': 'Rows generated and written at a time in the ndjson, parquet and arrow formats',
+        'type': click.IntRange(min=1),
+        'default': 100000,
+        'show_default': True,
+    },
+    'workers': {
+        'help': 'Number of concurrent threads for fetching, merging and writing data',
+        'type': click.IntRange(min=1),
+        'default': 1,
+        'show_default': True,
+    },
+    'batch-size': {
+        'help': 'Number of indices per field usage API call (0 means all at once)',
+        'type': click.IntRange(min=0),
+        'default': 0,
+        'show_default': True,
+    },
+    'lru-size': {
+        'help': (
+            'Compute per-index results on demand, keeping at most this many in '
+            'memory (0 computes and keeps them all)'
+        ),
+        'type': click.IntRange(min=0),
+        'default': 0,
+        'show_default': True,
+    },
+    'atomic': {
+        'help': 'Write each file to a temporary file, then rename it into place',
+        'default': False,
+        'show_default': True,
+    },
+    'snapshot-dir': {
+        'help': 'Path where field usage snapshots are kept',
+        'default': os.path.join(os.getcwd(), 'snapshots'),
+        'show_default': True,
+    },
+    'save': {
+        'help': 'Save this run as the snapshot to compare the next run to',
+        'default': True,
+        'show_default': True,
+    },
+    'cache': {
+        'help': 'Cache field usage and mapping API responses on disk',
+        'default': False,
+        'show_default': True,
+    },
+    'cache-dir': {
+        'help': 'Path where cached API responses are kept',
+        'default': os.path.join(os.path.expanduser('~'), '.cache', 'es-fieldusage'),
+        'show_default': True,
+    },
+    'usage-ttl': {
+        'help': 'Seconds a cached field usage response is used for',
+        'type': click.FloatRange(min=0),
+        'default': 300.0,
+        'show_default': True,
+    },
+    'mapping-ttl': {
+        'help': 'Seconds a cached mapping is used for, unless it changes sooner',
+        'type': click.FloatRange(min=0),
+        'default': 3600.0,
+        'show_default': True,
+    },
+    'access-types': {
+        'help': (
+            'Also count each type of access per field (inverted index, stored '
+            'fields, doc values, points, norms, term vectors and knn vectors)'
+        ),
+        'default': False,
+        'show_default': True,
+    },
+    'disk-usage': {
+        'help': (
+            'Estimate savings with the disk usage API, which analyzes every shard '
+            'and is expensive'
+        ),
+        'default': False,
+        'show_default': True,
+    },
+    'json': {
+        'help': 'Output as JSON',
+        'default': False,
+        'show_default': True,
+    },
+    'breakdown': {
+        'help': 'Show field reads per node and per shard copy, to find skew',
+        'default': False,
+        'show_default': True,
+    },
+    'cluster': {
+        'help': (
+            'Collect from the cluster in this es_client configuration file, given '
+            'as NAME=FILE or FILE (may be repeated)'
+        ),
+        'multiple': True,
+        'required': True,
+    },
+    'cluster-workers': {
+        'help': 'Clusters to collect from at once (0 means all of them)',
+        'type': click.IntRange(min=0),
+        'default': 0,
+        'show_default': True,
+    },
+    'interval': {
+        'help': 'Seconds between polls of the field usage API',
+        'type': click.FloatRange(min=1),
+        'default': 300.0,
+        'show_default': True,
+    },
+    'polls': {
+        'help': 'Stop after this many polls (0 means poll until interrupted)',
+        'type': click.IntRange(min=0),
+        'default': 0,
+        'show_default': True,
+    },
+    'sink': {
+        'help': 'Where to send the results of each poll (may be repeated)',
+        'type': click.Choice(['stdout', 'file', 'index']),
+        'multiple': True,
+        'default': ['stdout'],
+        'show_default': True,
+    },
+    'host': {
+        'help': 'Address to serve metrics on',
+        'default': '127.0.0.1',
+        'show_default': True,
+    },
+    'port': {
+        'help': 'Port to serve metrics on',
+        'type': click.IntRange(min=1, max=65535),
+        'default': 9707,
+        'show_default': True,
+    },
+    'top-fields': {
+        'help': (
+            'Fields per index with their own series. Reads of the rest are summed '
+            'as field __other__'
+        ),
+        'type': click.IntRange(min=0),
+        'default': 10,
+        'show_default': True,
+    },
+    'rollup': {
+        'help': (
+            'Sum the indices matching this wildcard pattern into one index label '
+            '(may be repeated)'
+        ),
+        'multiple': True,
+    },
+    'timings': {
+        'help': 'Show time, API calls and peak memory use for each phase of the run',
+        'default': False,
+        'show_default': True,
+    },
+    'timings-file': {
+        'help': 'Also write the timings to this file as JSON',
+        'type': click.Path(dir_okay=False),
+        'default': None,
+    },
+    'usage-file': {
+        'help': (
+            'Read field usage from this saved API response instead of the cluster '
+            '(requires --mappings-file)'
+        ),
+        'type': click.Path(exists=True, dir_okay=False),
+        'default': None,
+    },
+    'mappings-file': {
+        'help': (
+            'Read mappings from this saved API response instead of the cluster '
+            '(requires --usage-file)'
+        ),
+        'type': click.Path(exists=True, dir_okay=False),
+        'default': None,
+    },
     'show_hidden': {'help': 'Show all options', 'is_flag': True, 'default': False},
 }
@@ -0,0 +1,323 @@
+"""Mapping recommendations from field usage and access type counters"""
+
+import typing as t
+from es_fieldusage.defaults import (
+    ACCESS_TYPES,
+    DISK_USAGE_FILTER_PATH,
+    MAX_INDEX_CHARS,
+)
+from es_fieldusage.helpers.utils import chunk_indices
+
+# Field types which have doc_values, and which can be indexed (by an inverted
+# index or by points)
+DOC_VALUES_TYPES: t.FrozenSet[str] = frozenset(
+    [
+        'boolean',
+        'byte',
+        'date',
+        'date_nanos',
+        'double',
+        'float',
+        'geo_point',
+        'half_float',
+        'integer',
+        'ip',
+        'keyword',
+        'long',
+        'scaled_float',
+        'short',
+        'unsigned_long',
+        'version',
+    ]
+)
+INDEXABLE_TYPES: t.FrozenSet[str] = DOC_VALUES_TYPES - {'version'}
+
+# Positions of the counters used here in ACCESS_TYPES
+ANY = ACCESS_TYPES.index('any')
+INVERTED_INDEX = [
+    num for num, name in enumerate(ACCESS_TYPES) if name.startswith('inverted_index')
+]
+POSITIONS = ACCESS_TYPES.index('inverted_index.positions')
+PROXIMITY = ACCESS_TYPES.index('inverted_index.proximity')
+POINTS = ACCESS_TYPES.index('points')
+DOC_VALUES = ACCESS_TYPES.index('doc_values')
+NORMS = ACCESS_TYPES.index('norms')
+TERM_VECTORS = ACCESS_TYPES.index('term_vectors')
+
+# The disk usage API components saved by each mapping change
+SAVINGS: t.Dict[str, t.Tuple[str, ...]] = {
+    'index': ('inverted_index', 'points'),
+    'doc_values': ('doc_values',),
+    'norms': ('norms',),
+    'term_vector': ('term_vectors',),
+    'enabled': ('total',),
+    'remove': ('total',),
+}
+
+
+def field_sizes(response: t.Dict[str, t.Any]) -> t.Dict[str, t.Dict[str, int]]:
+    """
+    Return the bytes used on disk by each field in a disk usage API ``response``
+    for a single index, per component (inverted_index, points, doc_values, norms,
+    term_vectors and total)
+    """
+    sizes = {}
+    for field, stats in response.get('fields', {}).items():
+        sizes[field] = {
+            'total': stats.get('total_in_bytes', 0),
+            'inverted_index': stats.get('inverted_index', {}).get('total_in_bytes', 0),
+            'points': stats.get('points_in_bytes', 0),
+            'doc_values': stats.get('doc_values_in_bytes', 0),
+            'norms': stats.get('norms_in_bytes', 0),
+            'term_vectors': stats.get('term_vectors_in_bytes', 0),
+        }
+    return sizes
+
+
+def fetch_disk_usage(
+    field_usage: t.Any, indices: t.Sequence[str]
+) -> t.Tuple[t.Dict[str, t.Dict[str, int]], int]:
+    """
+    Call the disk usage API for ``indices`` through ``field_usage`` (a
+    :py:class:`~.es_fieldusage.main.FieldUsage`), and return the bytes used by
+    each field per component, summed across all of them, and their total store
+    size. This analyzes every shard, so it is expensive.
+    """
+    response = field_usage.call_api(
+        'disk_usage',
+        field_usage.client.indices.disk_usage,
+        index=','.join(indices),
+        run_expensive_tasks=True,
+        filter_path=DISK_USAGE_FILTER_PATH,
+    )
+    response = getattr(response, 'body', response)
+    sizes: t.Dict[str, t.Dict[str, int]] = {}
+    store_size = 0
+    for idx in indices:
+        if idx not in response:
+            continue
+        store_size += response[idx].get('store_size_in_bytes', 0)
+        for field, components in field_sizes(response[idx]).items():
+            total = sizes.setdefault(field, dict.fromkeys(components, 0))
+            for key, value in components.items():
+                total[key] += value
+    return sizes, store_size
+
+
+def walk_mapping(
+    properties: t.Dict[str, t.Any], prefix: str = ''
+) -> t.Generator[t.Tuple[str, t.Dict[str, t.Any], bool], None, None]:
+    """
+    Yield the dotted name and parameters of every object and field in mapping
+    ``properties``, parents before children, and whether each is an object
+    """
+    for key, value in properties.items():
+        if not isinstance(value, dict):
+            continue
+        name = f'{prefix}{key}'
+        if 'properties' in value:
+            yield name, value, True
+            yield from walk_mapping(value['properties'], f'{name}.')
+        else:
+            yield name, value, False
+
+
+def field_names(params: t.Dict[str, t.Any], name: str) -> t.List[str]:
+    """Return ``name`` and the dotted names of all of its multi-fields"""
+    return [name] + [f'{name}.{sub}' for sub in params.get('fields', {})]
+
+
+def advise_field(
+    name: str, params: t.Dict[str, t.Any], counters: t.Sequence[int]
+) -> t.Dict[str, t.Any]:
+    """
+    Return the mapping changes for field ``name``, with mapping ``params``, which
+    its access type ``counters`` show would lose nothing, with the reason for
+    each
+    """
+    ftype = params.get('type', 'object')
+    change: t.Dict[str, t.Any] = {}
+    reasons = []
+    if ftype == 'text' and params.get('index', True) and not counters[ANY]:
+        # Nothing else about an unindexed text field matters
+        return {'change': {'index': False}, 'reasons': ['never accessed']}
+    searched = any(counters[num] for num in INVERTED_INDEX) or counters[POINTS]
+    if ftype in INDEXABLE_TYPES and params.get('index', True) and not searched:
+        change['index'] = False
+        reasons.append('never searched')
+    if (
+        ftype in DOC_VALUES_TYPES
+        and params.get('doc_values', True)
+        and not counters[DOC_VALUES]
+    ):
+        change['doc_values'] = False
+        reasons.append('never sorted, aggregated or read by scripts')
+    norms = params.get('norms', ftype == 'text')
+    if norms and not counters[NORMS]:
+        change['norms'] = False
+        reasons.append('never scored')
+    if params.get('term_vector', 'no') != 'no' and not counters[TERM_VECTORS]:
+        change['term_vector'] = 'no'
+        reasons.append('term vectors never read')
+    if (
+        ftype == 'text'
+        and params.get('index', True)
+        and params.get('index_options', 'positions') in ('positions', 'offsets')
+        and not (counters[POSITIONS] or counters[PROXIMITY])
+    ):
+        change['index_options'] = 'freqs'
+        reasons.append('never used by phrase or proximity queries')
+    return {'change': change, 'reasons': reasons}
+
+
+def estimate(
+    changes: t.Iterable[str],
+    names: t.Iterable[str],
+    sizes: t.Optional[t.Dict[str, t.Dict[str, int]]],
+) -> t.Optional[int]:
+    """
+    Return the bytes on disk saved by making ``changes`` to the fields ``names``,
+    according to disk usage ``sizes``, or None if sizes are not known
+    """
+    if sizes is None:
+        return None
+    components = set()
+    for key in changes:
+        components.update(SAVINGS.get(key, ()))
+    if 'total' in components:
+        components = {'total'}
+    return sum(
+        sizes.get(name, {}).get(component, 0)
+        for name in names
+        for component in components
+    )
+
+
+def advise_mapping(
+    properties: t.Dict[str, t.Any],
+    counters: t.Mapping[str, t.Sequence[int]],
+    sizes: t.Optional[t.Dict[str, t.Dict[str, int]]] = None,
+) -> t.List[t.Dict[str, t.Any]]:
+    """
+    Return recommended changes to mapping ``properties``, given the summed
+    access type ``counters`` of every field, keyed by dotted name, for the
+    indices using that mapping. Each recommendation has the dotted ``field``
+    name, an ``action`` of ``update`` (with the mapping parameters to set in
+    ``change``) or ``remove`` (for an unused multi-field), the ``reasons``, and
+    the estimated ``savings`` in bytes if disk usage ``sizes`` are given.
+
+    An object with no accessed fields at all is disabled as a whole, rather
+    than changing each of its fields.
+    """
+    zeros = (0,) * len(ACCESS_TYPES)
+    covered: t.List[str] = []
+    result = []
+
+    def unused(name: str) -> bool:
+        return not counters.get(name, zeros)[ANY]
+
+    for name, params, is_object in walk_mapping(properties):
+        if any(name.startswith(prefix) for prefix in covered):
+            continue
+        if is_object:
+            leaves = [
+                leaf
+                for child, child_params, child_object in walk_mapping(
+                    params['properties'], f'{name}.'
+                )
+                if not child_object
+                for leaf in field_names(child_params, child)
+            ]
+            if (
+                params.get('type', 'object') == 'object'
+                and params.get('enabled', True)
+                and leaves
+                and all(unused(leaf) for leaf in leaves)
+            ):
+                covered.append(f'{name}.')
+                result.append(
+                    {
+                        'field': name,
+                        'action': 'update',
+                        'change': {'enabled': False},
+                        'reasons': ['no field in this object is ever accessed'],
+                        'savings': estimate(['enabled'], leaves, sizes),
+                    }
+                )
+            continue
+        advice = advise_field(name, params, counters.get(name, zeros))
+        if advice['change']:
+            result.append(
+                {
+                    'field': name,
+                    'action': 'update',
+                    'change': advice['change'],
+                    'reasons': advice['reasons'],
+                    'savings': estimate(advice['change'], [name], sizes),
+                }
+            )
+        for sub in field_names(params, name)[1:]:
+            if unused(sub):
+                result.append(
+                    {
+                        'field': sub,
+                        'action': 'remove',
+                        'change': {},
+                        'reasons': ['multi-field never accessed'],
+                        'savings': estimate(['remove'], [sub], sizes),
+                    }
+                )
+    return result
+
+
+def advise(field_usage: t.Any, disk_usage: bool = False) -> t.List[t.Dict[str, t.Any]]:
+    """
+    Return mapping recommendations for all indices found by ``field_usage`` (a
+    :py:class:`~.es_fieldusage.main.FieldUsage` collecting access types), from
+    :py:func:`advise_mapping`. Indices with identical mappings (e.g. from the
+    same index template) are grouped, and advised on together from their summed
+    counters.
+
+    Each group has its ``indices`` and ``recommendations``. If ``disk_usage`` is
+    True, the disk usage API is called for the indices in each group, and the
+    group also has its total ``store_size`` and estimated ``savings`` in bytes.
+    Otherwise both are None.
+    """
+    indices = field_usage.indices
+    if not isinstance(indices, list):
+        indices = [indices]
+    field_usage.get_mappings(indices)
+    groups: t.Dict[str, t.List[str]] = {}
+    for idx in indices:
+        groups.setdefault(field_usage.mappings_data[idx], []).append(idx)
+    result = []
+    for key, members in groups.items():
+        sizes = None
+        store_size = None
+        if disk_usage:
+            sizes = {}
+            store_size = 0
+            for chunk in chunk_indices(members, MAX_INDEX_CHARS):
+                chunk_sizes, chunk_store = fetch_disk_usage(field_usage, chunk)
+                store_size += chunk_store
+                for field, components in chunk_sizes.items():
+                    total = sizes.setdefault(field, dict.fromkeys(components, 0))
+                    for component, value in components.items():
+                        total[component] += value
+        with field_usage.phase('advise'):
+            counters = field_usage.access_stats.totals(members)
+            recommendations = advise_mapping(
+                field_usage.mapping_cache[key], counters, sizes
+            )
+        savings = None
+        if disk_usage:
+            savings = sum(rec['savings'] for rec in recommendations)
+        result.append(
+            {
+                'indices': members,
+                'recommendations': recommendations,
+                'store_size': store_size,
+                'savings': savings,
+            }
+        )
+    return result
@@ -0,0 +1,82 @@
+"""Field reads per shard copy and per node, to find skewed query routing"""
+
+import typing as t
+
+UNKNOWN_NODE: str = 'unknown'
+
+
+def skew(reads: t.Sequence[int]) -> float:
+    """
+    Return how many times more field reads the busiest of ``reads`` had than the
+    mean. Evenly spread reads give 1.0, and one of four copies taking every read
+    gives 4.0. No reads at all give 0.0.
+    """
+    total = sum(reads)
+    if not total:
+        return 0.0
+    return max(reads) * len(reads) / total
+
+
+def breakdown(
+    shard_usage: t.Dict[str, t.Dict[str, t.Dict[str, t.Any]]],
+) -> t.Dict[str, t.Any]:
+    """
+    Return the field reads per node and per shard copy of each index in
+    ``shard_usage``, as collected by :py:class:`~.es_fieldusage.main.FieldUsage`
+    with ``keep_shards=True``, with the :py:func:`skew` of each.
+
+    Nodes are ordered by reads (descending), indices by skew (descending), and
+    the copies of each index by reads (descending).
+    """
+    nodes: t.Dict[str, int] = {}
+    indices: t.Dict[str, t.Dict[str, t.Any]] = {}
+    for idx, copies in shard_usage.items():
+        rows = []
+        for tracking_id, copy in copies.items():
+            reads = sum(copy['fields'].values())
+            node = copy.get('node') or UNKNOWN_NODE
+            nodes[node] = nodes.get(node, 0) + reads
+            rows.append(
+                {
+                    'tracking_id': tracking_id,
+                    'node': node,
+                    'primary': copy.get('primary'),
+                    'reads': reads,
+                }
+            )
+        rows.sort(key=lambda row: -row['reads'])
+        indices[idx] = {
+            'reads': sum(row['reads'] for row in rows),
+            'skew': skew([row['reads'] for row in rows]),
+            'copies': rows,
+        }
+    return {
+        'node_skew': skew(list(nodes.values())),
+        'nodes': dict(sorted(nodes.items(), key=lambda item: (-item[1], item[0]))),
+        'indices': dict(
+            sorted(indices.items(), key=lambda item: (-item[1]['skew'], item[0]))
+        ),
+    }
+
+
+def breakdown_lines(
+    data: t.Dict[str, t.Any], delimiter: str
+) -> t.Generator[str, None, None]:
+    """
+    Yield a header line, then one line per shard copy in ``data`` from
+    :py:func:`breakdown`, with its index, tracking_id, node, whether it is the
+    primary, its reads, and the skew of its index, separated by ``delimiter``
+    """
+    columns = ['index', 'tracking_id', 'node', 'primary', 'reads', 'index_skew']
+    yield f'{delimiter.join(columns)}\n'
+    for idx, stats in data['indices'].items():
+        for row in stats['copies']:
+            values = [
+                idx,
+                row['tracking_id'],
+                row['node'],
+                row['primary'],
+                row['reads'],
+                f'{stats["skew"]:.2f}',
+            ]
+            yield f'{delimiter.join(str(value) for value in values)}\n'
@@ -0,0 +1,102 @@
+"""Bulk indexing of field usage documents"""
+
+import typing as t
+import logging
+import threading
+from elasticsearch8 import Elasticsearch
+from elasticsearch8.helpers import streaming_bulk
+from es_fieldusage.defaults import ACCESS_TYPES
+from es_fieldusage.helpers.store import counters_to_dict
+from es_fieldusage.helpers.utils import concurrent_map
+
+
+class LockedIterator:
+    """Wrap ``iterable`` so that several threads can safely consume it"""
+
+    def __init__(self, iterable: t.Iterable[t.Any]) -> None:
+        self.iterator = iter(iterable)
+        self.lock = threading.Lock()
+
+    def __iter__(self) -> 'LockedIterator':
+        return self
+
+    def __next__(self) -> t.Any:
+        with self.lock:
+            return next(self.iterator)
+
+
+def field_documents(
+    data: t.Mapping[str, t.Mapping[str, t.Mapping[str, t.Any]]],
+    sections: t.Sequence[str],
+    indexname: str,
+    timestamp: str,
+) -> t.Generator[t.Dict[str, t.Any], None, None]:
+    """
+    Lazily yield one bulk action per field per index in ``data``, for the named
+    ``sections`` (e.g. accessed, unaccessed), to be indexed into ``indexname``
+
+    If an index also has ``access`` counters, each document includes the count
+    for every access type as ``field.access``.
+    """
+    for idx in data:
+        per_index = data[idx]
+        access = per_index.get('access')
+        for key in sections:
+            for fieldname, value in per_index[key].items():
+                field = {'name': fieldname, 'count': value}
+                if access is not None:
+                    field['access'] = counters_to_dict(
+                        access.counters_for(fieldname), ACCESS_TYPES
+                    )
+                yield {
+                    '_index': indexname,
+                    '@timestamp': timestamp,
+                    'index': idx,
+                    'field': field,
+                }
+
+
+def bulk_index(
+    client: Elasticsearch,
+    actions: t.Iterable[t.Dict[str, t.Any]],
+    chunk_size: int = 500,
+    workers: int = 1,
+    max_retries: int = 3,
+    initial_backoff: float = 2,
+) -> t.Dict[str, int]:
+    """
+    Send ``actions`` to Elasticsearch with the streaming_bulk helper, on
+    ``workers`` threads which share the one stream of actions. Chunks rejected
+    with a 429 are retried up to ``max_retries`` times with exponential backoff,
+    starting at ``initial_backoff`` seconds.
+
+    Return a summary with the number of documents indexed and failed.
+    """
+    logger = logging.getLogger(__name__)
+    shared = LockedIterator(actions)
+
+    def consume(_: int) -> t.Dict[str, int]:
+        summary = {'success': 0, 'failed': 0}
+        for success, item in streaming_bulk(
+            client,
+            shared,
+            chunk_size=chunk_size,
+            max_retries=max_retries,
+            initial_backoff=initial_backoff,
+            raise_on_error=False,
+            raise_on_exception=False,
+        ):
+            if success:
+                summary['success'] += 1
+            else:
+                summary['failed'] += 1
+                logger.debug(f'Failed to index document: {item}')
+        return summary
+
+    summary = {'success': 0, 'failed': 0}
+    for result in concurrent_map(consume, range(workers), workers):
+        summary['success'] += result['success']
+        summary['failed'] += result['failed']
+    if summary['failed']:
+        logger.error(f'{summary["failed"]} documents failed to index')
+    return summary
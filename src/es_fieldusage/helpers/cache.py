@@ -0,0 +1,78 @@
+"""On-disk cache of Elasticsearch API responses"""
+
+import typing as t
+import hashlib
+import logging
+import os
+import time
+from es_fieldusage.helpers.utils import load_json, save_json
+
+
+class DiskCache:
+    """
+    Cache of JSON-serializable API responses under ``path``, one compressed file
+    per entry. Every entry belongs to a ``kind`` (e.g. usage, mapping), and
+    expires after the number of seconds in ``ttls`` for that kind. Entries are
+    keyed by the ``cluster`` they came from as well as by ``key``, so the same
+    index names on different clusters never share an entry.
+
+    An entry may also be stored with a ``validator``, such as an index UUID and
+    mapping version. It is then only returned if the same validator is given.
+    """
+
+    def __init__(self, path: str, ttls: t.Dict[str, float]) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.ttls = ttls
+
+    def filename(self, kind: str, cluster: str, key: str) -> str:
+        """Return the name of the file for ``key`` of ``kind`` on ``cluster``"""
+        digest = hashlib.sha1(f'{cluster}\n{key}'.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, kind, f'{digest}.json.gz')
+
+    def get(
+        self, kind: str, cluster: str, key: str, validator: t.Optional[str] = None
+    ) -> t.Any:
+        """
+        Return the cached data for ``key`` of ``kind`` on ``cluster``, or None if
+        there is no entry, it has expired, or its validator does not match
+        ``validator``
+        """
+        filename = self.filename(kind, cluster, key)
+        if not os.path.exists(filename):
+            return None
+        try:
+            entry = load_json(filename)
+        except (OSError, ValueError) as exc:
+            self.logger.warning(f'Ignoring unreadable cache file {filename}: {exc}')
+            return None
+        if entry['key'] != key or entry.get('cluster') != cluster:
+            return None
+        if time.time() - entry['time'] > self.ttls.get(kind, 0):
+            self.logger.debug(f'Cached {kind} for {key} has expired')
+            return None
+        if validator is not None and entry['validator'] != validator:
+            self.logger.debug(f'Cached {kind} for {key} has changed')
+            return None
+        self.logger.debug(f'Using cached {kind} for {key}')
+        return entry['data']
+
+    def set(
+        self,
+        kind: str,
+        cluster: str,
+        key: str,
+        data: t.Any,
+        validator: t.Optional[str] = None,
+    ) -> None:
+        """Store ``data`` for ``key`` of ``kind`` on ``cluster``"""
+        filename = self.filename(kind, cluster, key)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        entry = {
+            'cluster': cluster,
+            'key': key,
+            'time': time.time(),
+            'validator': validator,
+            'data': data,
+        }
+        save_json(filename, entry)
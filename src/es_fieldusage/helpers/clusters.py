@@ -0,0 +1,132 @@
+"""Collect field usage from several clusters at once, and merge the results"""
+
+import typing as t
+import logging
+from pathlib import Path
+from es_client.helpers.config import get_yaml
+from es_fieldusage.defaults import ACCESS_TYPES
+from es_fieldusage.exceptions import ConfigurationException
+from es_fieldusage.helpers.store import AccessStore, UsageStore, counters_to_dict
+from es_fieldusage.helpers.utils import concurrent_map
+from es_fieldusage.main import FieldUsage
+
+
+def parse_cluster(value: str) -> t.Tuple[str, str]:
+    """
+    Return the name and configuration file path of cluster ``value``, given as
+    NAME=PATH, or as just PATH, in which case the name is the file name without
+    its suffix
+    """
+    if '=' in value:
+        name, path = value.split('=', 1)
+    else:
+        name, path = Path(value).stem, value
+    if not name or not path:
+        raise ConfigurationException(f'Invalid cluster: {value}')
+    return name, path
+
+
+def load_configs(values: t.Sequence[str]) -> t.Dict[str, t.Dict[str, t.Any]]:
+    """
+    Return the client configuration of each cluster in ``values`` (see
+    :py:func:`parse_cluster`), keyed by name, read from its es_client YAML
+    configuration file
+    """
+    configs: t.Dict[str, t.Dict[str, t.Any]] = {}
+    for value in values:
+        name, path = parse_cluster(value)
+        if name in configs:
+            raise ConfigurationException(f'Duplicate cluster name: {name}')
+        configs[name] = get_yaml(path) or {}
+    return configs
+
+
+def collect(
+    configs: t.Dict[str, t.Dict[str, t.Any]],
+    search_pattern: str,
+    cluster_workers: int,
+    **kwargs: t.Any,
+) -> t.Tuple[t.Dict[str, FieldUsage], t.Dict[str, str]]:
+    """
+    Collect field usage for ``search_pattern`` from every cluster in ``configs``
+    with a :py:class:`~.es_fieldusage.main.FieldUsage` (and so a client and
+    connection pool) each, passing it ``kwargs``. Up to ``cluster_workers``
+    clusters are collected, and their reports built, concurrently.
+
+    Return the FieldUsage of each cluster which succeeded, and the error of each
+    which failed, both keyed by name.
+    """
+    logger = logging.getLogger(__name__)
+
+    def collect_one(
+        name: str,
+    ) -> t.Tuple[t.Optional[FieldUsage], t.Optional[str]]:
+        try:
+            field_usage = FieldUsage(configs[name], search_pattern, **kwargs)
+            _ = field_usage.report
+        except Exception as exc:  # pylint: disable=W0718
+            logger.error(f'Unable to collect field usage from cluster {name}: {exc}')
+            return None, str(exc)
+        return field_usage, None
+
+    names = list(configs)
+    usages = {}
+    errors = {}
+    for name, (field_usage, error) in zip(
+        names, concurrent_map(collect_one, names, cluster_workers)
+    ):
+        if field_usage is None:
+            errors[name] = error
+        else:
+            usages[name] = field_usage
+    return usages, errors
+
+
+def merge_reports(reports: t.Dict[str, t.Dict[str, t.Any]]) -> t.Dict[str, t.Any]:
+    """
+    Return one report, like :py:attr:`~.es_fieldusage.main.FieldUsage.report`,
+    with the counts (and access type counters, if every report has them) of
+    each field summed across all cluster ``reports``, keyed by cluster name.
+    Its indices are named CLUSTER:INDEX.
+    """
+    usage = UsageStore()
+    access: t.Optional[AccessStore] = None
+    if reports and all('access' in report for report in reports.values()):
+        access = AccessStore(len(ACCESS_TYPES), usage.fields)
+    indices = []
+    for name, report in reports.items():
+        found = report['indices']
+        if not isinstance(found, list):
+            found = [found]
+        indices.extend(f'{name}:{idx}' for idx in found)
+        usage[name] = {**report['accessed'], **report['unaccessed']}
+        if access is not None:
+            access[name] = report['access']
+    totals = usage.totals()
+    accessed, unaccessed = totals.split()
+    merged: t.Dict[str, t.Any] = {
+        'indices': indices,
+        'field_count': len(totals),
+        'accessed': accessed,
+        'unaccessed': unaccessed,
+    }
+    if access is not None:
+        merged['access'] = access.totals()
+    return merged
+
+
+def report_to_dict(report: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+    """Return ``report`` as a JSON-serializable dictionary"""
+    indices = report['indices']
+    data = {
+        'indices': indices if isinstance(indices, list) else [indices],
+        'field_count': report['field_count'],
+        'accessed': dict(report['accessed'].items()),
+        'unaccessed': dict(report['unaccessed'].items()),
+    }
+    if 'access' in report:
+        data['access'] = {
+            name: counters_to_dict(values, ACCESS_TYPES)
+            for name, values in report['access'].items()
+        }
+    return data
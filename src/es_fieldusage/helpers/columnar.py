@@ -0,0 +1,202 @@
+"""Write field usage as one consolidated dataset in a streaming or columnar format"""
+
+import typing as t
+import bz2
+import gzip
+import io
+import json
+import lzma
+from itertools import islice
+from es_fieldusage.defaults import ACCESS_TYPES
+from es_fieldusage.exceptions import ConfigurationException
+from es_fieldusage.helpers.writer import open_output
+
+try:
+    import pyarrow as pa
+    from pyarrow import ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None  # pylint: disable=C0103
+
+# The file extension of each format, and the compression codecs it supports
+EXTENSIONS: t.Dict[str, str] = {
+    'ndjson': 'ndjson',
+    'parquet': 'parquet',
+    'arrow': 'arrow',
+}
+COMPRESSION: t.Dict[str, t.Tuple[str, ...]] = {
+    'ndjson': ('none', 'gzip', 'bz2', 'xz'),
+    'parquet': ('none', 'snappy', 'gzip', 'zstd', 'lz4', 'brotli'),
+    'arrow': ('none', 'zstd', 'lz4'),
+}
+# Compressed NDJSON is written through these, and named with these suffixes
+OPENERS: t.Dict[str, t.Tuple[t.Callable[..., t.IO[t.Any]], str]] = {
+    'gzip': (gzip.open, '.gz'),
+    'bz2': (bz2.open, '.bz2'),
+    'xz': (lzma.open, '.xz'),
+}
+
+
+def dataset_columns(access: bool) -> t.List[str]:
+    """
+    Return the column names of the dataset: index, field and count, then one per
+    access type (other than any, which is the count) if ``access`` is True, with
+    dots replaced by underscores
+    """
+    columns = ['index', 'field', 'count']
+    if access:
+        columns.extend(name.replace('.', '_') for name in ACCESS_TYPES[1:])
+    return columns
+
+
+def dataset_rows(
+    all_data: t.Mapping[str, t.Dict[str, t.Any]], sections: t.Sequence[str]
+) -> t.Generator[t.Tuple[t.Any, ...], None, None]:
+    """
+    Yield a row of :py:func:`dataset_columns` for every field in the
+    ``sections`` of every index in ``all_data``, as returned by
+    :py:func:`~.es_fieldusage.commands.get_per_index`. Only one index is read
+    from ``all_data`` at a time.
+    """
+    for idx, data in all_data.items():
+        access = data.get('access')
+        for key in sections:
+            for field, count in data[key].items():
+                if access is None:
+                    yield idx, field, count
+                else:
+                    yield (idx, field, count, *access.counters_for(field)[1:])
+
+
+def chunked(
+    rows: t.Iterable[t.Tuple[t.Any, ...]], size: int
+) -> t.Generator[t.List[t.Tuple[t.Any, ...]], None, None]:
+    """Yield lists of up to ``size`` of ``rows``"""
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def check_dataset(fmt: str, compression: str) -> None:
+    """
+    Raise ConfigurationException if format ``fmt`` does not support
+    ``compression``, or needs pyarrow and it is not installed
+    """
+    if compression not in COMPRESSION[fmt]:
+        raise ConfigurationException(
+            f'{fmt} does not support {compression} compression. Choose one of '
+            f'{", ".join(COMPRESSION[fmt])}'
+        )
+    if fmt != 'ndjson' and pa is None:
+        raise ConfigurationException(
+            f'{fmt} output requires pyarrow. Install it with: '
+            'pip install es-fieldusage[columnar]'
+        )
+
+
+def dataset_filename(prefix: str, fmt: str, compression: str) -> str:
+    """Return the name of the dataset file in format ``fmt``"""
+    fname = f'{prefix}.{EXTENSIONS[fmt]}'
+    if fmt == 'ndjson' and compression in OPENERS:
+        fname += OPENERS[compression][1]
+    return fname
+
+
+def write_ndjson(
+    fdesc: t.IO[bytes],
+    columns: t.Sequence[str],
+    rows: t.Iterable[t.Tuple[t.Any, ...]],
+    compression: str,
+    chunk_rows: int,
+) -> None:
+    """
+    Write ``rows`` to binary ``fdesc`` as one JSON object per line, compressed
+    with ``compression`` (gzip, bz2, xz or none)
+    """
+
+    def write_lines(text: t.TextIO) -> None:
+        for chunk in chunked(rows, chunk_rows):
+            text.writelines(f'{json.dumps(dict(zip(columns, row)))}\n' for row in chunk)
+
+    if compression in OPENERS:
+        # Closing the compressed stream leaves fdesc open
+        with OPENERS[compression][0](fdesc, 'wt', encoding='utf-8') as text:
+            write_lines(text)
+    else:
+        text = io.TextIOWrapper(fdesc, encoding='utf-8')
+        write_lines(text)
+        text.detach()
+
+
+def arrow_schema(columns: t.Sequence[str]) -> t.Any:
+    """Return the Arrow schema of ``columns``"""
+    return pa.schema(
+        [
+            (name, pa.string() if name in ('index', 'field') else pa.int64())
+            for name in columns
+        ]
+    )
+
+
+def arrow_batches(
+    schema: t.Any, rows: t.Iterable[t.Tuple[t.Any, ...]], chunk_rows: int
+) -> t.Generator[t.Any, None, None]:
+    """Yield Arrow record batches of up to ``chunk_rows`` of ``rows``"""
+    for chunk in chunked(rows, chunk_rows):
+        yield pa.RecordBatch.from_arrays(
+            [
+                pa.array(values, type=field.type)
+                for values, field in zip(zip(*chunk), schema)
+            ],
+            schema=schema,
+        )
+
+
+def write_dataset(
+    filename: str,
+    all_data: t.Mapping[str, t.Dict[str, t.Any]],
+    sections: t.Sequence[str],
+    fmt: str,
+    compression: str = 'none',
+    access: bool = False,
+    chunk_rows: int = 100000,
+    atomic: bool = False,
+) -> int:
+    """
+    Write the ``sections`` of every index in ``all_data`` to ``filename`` as one
+    dataset in format ``fmt`` (ndjson, parquet or arrow), with a row per index
+    and field (see :py:func:`dataset_columns`), and return the number of rows.
+
+    Rows are generated and written ``chunk_rows`` at a time, as lines, Parquet
+    row groups or Arrow record batches, so the whole dataset is never held in
+    memory. Parquet and Arrow require pyarrow.
+    """
+    check_dataset(fmt, compression)
+    columns = dataset_columns(access)
+    written = 0
+
+    def counted() -> t.Generator[t.Tuple[t.Any, ...], None, None]:
+        nonlocal written
+        for row in dataset_rows(all_data, sections):
+            written += 1
+            yield row
+
+    with open_output(filename, atomic=atomic, binary=True) as fdesc:
+        if fmt == 'ndjson':
+            write_ndjson(fdesc, columns, counted(), compression, chunk_rows)
+        elif fmt == 'parquet':
+            schema = arrow_schema(columns)
+            with pq.ParquetWriter(fdesc, schema, compression=compression) as writer:
+                for batch in arrow_batches(schema, counted(), chunk_rows):
+                    writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            schema = arrow_schema(columns)
+            codec = None if compression == 'none' else compression
+            options = ipc.IpcWriteOptions(compression=codec)
+            with ipc.new_file(fdesc, schema, options=options) as writer:
+                for batch in arrow_batches(schema, counted(), chunk_rows):
+                    writer.write_batch(batch)
+    return written
@@ -0,0 +1,242 @@
+"""Serve field usage as Prometheus metrics"""
+
+import typing as t
+import logging
+import threading
+import time
+from fnmatch import fnmatchcase
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from es_fieldusage.helpers.store import CountsView, sum_rows
+
+CONTENT_TYPE: str = 'text/plain; version=0.0.4; charset=utf-8'
+OTHER_FIELDS: str = '__other__'
+
+# Name, type and help of each metric, in the order they are rendered. Field usage
+# counts are reset when a shard copy is started or relocated, so they are gauges.
+METRICS: t.List[t.Tuple[str, str, str]] = [
+    (
+        'es_fieldusage_field_reads',
+        'gauge',
+        'Reads of each field, summed across all shard copies of the indices',
+    ),
+    ('es_fieldusage_index_reads', 'gauge', 'Reads of all fields of the indices'),
+    ('es_fieldusage_fields', 'gauge', 'Fields of the indices, by whether accessed'),
+    ('es_fieldusage_indices', 'gauge', 'Indices rolled up into the index label'),
+]
+
+
+def escape(value: str) -> str:
+    """Return ``value`` escaped for use as a label value"""
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def sample(name: str, labels: t.Dict[str, str], value: t.Union[int, float]) -> str:
+    """Return one sample line of metric ``name`` with ``labels``"""
+    pairs = ','.join(f'{key}="{escape(val)}"' for key, val in labels.items())
+    return f'{name}{{{pairs}}} {value}\n'
+
+
+def group_lines(
+    group: str, counts: t.Mapping[str, int], members: int, top_fields: int
+) -> t.Dict[str, t.List[str]]:
+    """
+    Return the sample lines of each metric for index label ``group``, made of
+    ``members`` indices with field ``counts`` ordered by count (descending).
+    Only the first ``top_fields`` fields get their own series, and the reads of
+    the rest are summed into one series for field ``__other__``.
+    """
+    lines: t.Dict[str, t.List[str]] = {name: [] for name, _, _ in METRICS}
+    field_lines = lines['es_fieldusage_field_reads']
+    total = accessed = other = rest = 0
+    for num, (field, count) in enumerate(counts.items()):
+        total += count
+        accessed += 1 if count else 0
+        if num < top_fields:
+            field_lines.append(
+                sample(
+                    'es_fieldusage_field_reads', {'index': group, 'field': field}, count
+                )
+            )
+        else:
+            other += count
+            rest += 1
+    if rest:
+        field_lines.append(
+            sample(
+                'es_fieldusage_field_reads',
+                {'index': group, 'field': OTHER_FIELDS},
+                other,
+            )
+        )
+    lines['es_fieldusage_index_reads'].append(
+        sample('es_fieldusage_index_reads', {'index': group}, total)
+    )
+    for state, value in (
+        ('accessed', accessed),
+        ('unaccessed', len(counts) - accessed),
+    ):
+        lines['es_fieldusage_fields'].append(
+            sample('es_fieldusage_fields', {'index': group, 'state': state}, value)
+        )
+    lines['es_fieldusage_indices'].append(
+        sample('es_fieldusage_indices', {'index': group}, members)
+    )
+    return lines
+
+
+class Exporter:
+    """
+    Render the per-index results of ``field_usage`` (a
+    :py:class:`~.es_fieldusage.main.FieldUsage`) as Prometheus metrics, and keep
+    them for every scrape until :py:meth:`refresh` is called.
+
+    Indices matching one of the ``rollups`` patterns are summed into a single
+    index label of that pattern, and only the ``top_fields`` most read fields of
+    each index label get their own series. The lines of each index label are
+    kept, and only those of labels with changed indices are rendered again.
+    """
+
+    def __init__(
+        self,
+        field_usage: t.Any,
+        top_fields: int = 10,
+        rollups: t.Sequence[str] = (),
+    ) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.field_usage = field_usage
+        self.top_fields = top_fields
+        self.rollups = list(rollups)
+        self.lock = threading.Lock()
+        self.members: t.Dict[str, t.List[str]] = {}
+        self.lines: t.Dict[str, t.Dict[str, t.List[str]]] = {}
+        self.body = b''
+        self.refreshed = 0.0
+        self.render_seconds = 0.0
+        self.errors = 0
+        self.update(list(field_usage.results_by_index))
+
+    def group(self, idx: str) -> str:
+        """Return the index label of ``idx``: its rollup pattern, or its name"""
+        for pattern in self.rollups:
+            if fnmatchcase(idx, pattern):
+                return pattern
+        return idx
+
+    def render(self, group: str, members: t.Sequence[str]) -> t.Dict[str, t.List[str]]:
+        """Return the sample lines of each metric for ``group`` of ``members``"""
+        results = self.field_usage.results_by_index
+        if len(members) == 1:
+            counts = results[members[0]]
+        else:
+            rows = (results.row(idx) for idx in members)
+            counts = CountsView(results.fields, *sum_rows(results.fields, rows))
+        return group_lines(group, counts, len(members), self.top_fields)
+
+    def update(self, changed: t.Sequence[str]) -> None:
+        """
+        Render the index labels which include any of the ``changed`` indices, or
+        which gained or lost indices, again, and rebuild the response body
+        """
+        start = time.perf_counter()
+        members: t.Dict[str, t.List[str]] = {}
+        for idx in self.field_usage.results_by_index:
+            members.setdefault(self.group(idx), []).append(idx)
+        stale = {self.group(idx) for idx in changed}
+        stale.update(
+            group for group, idxs in members.items() if idxs != self.members.get(group)
+        )
+        lines = {group: self.lines[group] for group in members if group not in stale}
+        for group in stale:
+            if group in members:
+                lines[group] = self.render(group, members[group])
+        self.members = members
+        self.lines = lines
+        self.refreshed = time.time()
+        self.render_seconds = time.perf_counter() - start
+        body = self.build()
+        with self.lock:
+            self.body = body
+
+    def build(self) -> bytes:
+        """Return the response body from the lines of every index label"""
+        chunks = []
+        for name, mtype, text in METRICS:
+            chunks.append(f'# HELP {name} {text}\n# TYPE {name} {mtype}\n')
+            for group in sorted(self.lines):
+                chunks.extend(self.lines[group][name])
+        chunks.append(
+            '# HELP es_fieldusage_last_refresh_timestamp_seconds Time of the last '
+            'refresh\n'
+            '# TYPE es_fieldusage_last_refresh_timestamp_seconds gauge\n'
+            f'es_fieldusage_last_refresh_timestamp_seconds {self.refreshed}\n'
+            '# HELP es_fieldusage_render_seconds Time spent rendering the last '
+            'refresh\n'
+            '# TYPE es_fieldusage_render_seconds gauge\n'
+            f'es_fieldusage_render_seconds {self.render_seconds}\n'
+            '# HELP es_fieldusage_refresh_errors_total Refreshes which failed\n'
+            '# TYPE es_fieldusage_refresh_errors_total counter\n'
+            f'es_fieldusage_refresh_errors_total {self.errors}\n'
+        )
+        return ''.join(chunks).encode('utf-8')
+
+    def refresh(self) -> None:
+        """
+        Collect field usage again, and render only the index labels which
+        changed. If that fails, the error is logged and counted, and the previous
+        metrics are kept.
+        """
+        try:
+            changed = self.field_usage.refresh()
+            self.update(changed)
+        except Exception as exc:  # pylint: disable=W0718
+            self.logger.error(f'Unable to refresh field usage: {exc}')
+            self.errors += 1
+            body = self.build()
+            with self.lock:
+                self.body = body
+
+    def serve(self, host: str, port: int, interval: float) -> None:
+        """
+        Serve the metrics at http://``host``:``port``/metrics, and refresh them
+        every ``interval`` seconds in a background thread, until interrupted
+        """
+        stop = threading.Event()
+
+        def poll() -> None:
+            while not stop.wait(interval):
+                self.refresh()
+
+        server = ThreadingHTTPServer((host, port), make_handler(self))
+        thread = threading.Thread(target=poll, daemon=True)
+        thread.start()
+        try:
+            server.serve_forever()
+        finally:
+            stop.set()
+            server.server_close()
+
+
+def make_handler(exporter: Exporter) -> t.Type[BaseHTTPRequestHandler]:
+    """Return a request handler class serving the metrics of ``exporter``"""
+
+    class Handler(BaseHTTPRequestHandler):
+        """Serve the cached metrics at /metrics"""
+
+        def do_GET(self) -> None:  # pylint: disable=C0103
+            """Respond with the metrics, or 404 for any other path"""
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            with exporter.lock:
+                body = exporter.body
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: t.Any) -> None:
+            # pylint: disable=W0622
+            exporter.logger.debug(format % args)
+
+    return Handler
@@ -0,0 +1,85 @@
+"""Timing, API call and memory instrumentation"""
+
+import typing as t
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # pragma: no cover (Windows)
+    resource = None  # pylint: disable=C0103
+
+
+def peak_rss() -> t.Optional[int]:
+    """
+    Return the peak resident set size of this process in bytes, or None where
+    it cannot be read
+    """
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+def response_size(response: t.Any) -> t.Optional[int]:
+    """
+    Return the size in bytes of API ``response`` from its Content-Length header,
+    or None if it has none. The body is not serialized again to measure it.
+    """
+    meta = getattr(response, 'meta', None)
+    if meta is None:
+        return None
+    length = meta.headers.get('content-length')
+    return None if length is None else int(length)
+
+
+class Metrics:
+    """
+    Collect the wall time spent in each named phase of a run, and the number of
+    calls, bytes received and time taken for each Elasticsearch API. Phases and
+    calls may be recorded from several threads, in which case their times are
+    summed. The bytes of an API are None if the size of any of its responses
+    was unknown.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.phases: t.Dict[str, float] = {}
+        self.api: t.Dict[str, t.Dict[str, t.Any]] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> t.Generator[None, None, None]:
+        """Add the time spent in the block to phase ``name``"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def api_call(self, name: str, response: t.Any, elapsed: float) -> None:
+        """Record a call to API ``name`` which returned ``response``"""
+        size = response_size(response)
+        with self.lock:
+            stats = self.api.setdefault(name, {'calls': 0, 'bytes': 0, 'seconds': 0.0})
+            stats['calls'] += 1
+            if size is None or stats['bytes'] is None:
+                stats['bytes'] = None
+            else:
+                stats['bytes'] += size
+            stats['seconds'] += elapsed
+
+    def summary(self) -> t.Dict[str, t.Any]:
+        """Return everything recorded so far as a JSON-serializable dictionary"""
+        with self.lock:
+            return {
+                'total_seconds': time.perf_counter() - self.started,
+                'phases': dict(self.phases),
+                'api': {name: dict(stats) for name, stats in self.api.items()},
+                'peak_rss_bytes': peak_rss(),
+            }
@@ -0,0 +1,114 @@
+"""Read and write saved API responses, for building reports offline"""
+
+import typing as t
+import bz2
+import gzip
+import json
+import logging
+import lzma
+from fnmatch import fnmatchcase
+from es_fieldusage.exceptions import ResultNotExpected
+
+OPENERS: t.Dict[str, t.Callable[..., t.IO[t.Any]]] = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open,
+}
+
+
+def open_dump(filename: str, mode: str) -> t.IO[t.Any]:
+    """
+    Open ``filename`` in text ``mode``, compressed according to its extension
+    (.gz, .bz2 or .xz), or uncompressed otherwise
+    """
+    for suffix, opener in OPENERS.items():
+        if filename.endswith(suffix):
+            return opener(filename, f'{mode}t', encoding='utf-8')
+    return open(filename, mode, encoding='utf-8')
+
+
+def load_dump(filename: str) -> t.Dict[str, t.Any]:
+    """Load a saved API response from ``filename``"""
+    with open_dump(filename, 'r') as fdesc:
+        return json.load(fdesc)
+
+
+def save_dump(filename: str, data: t.Dict[str, t.Any]) -> None:
+    """Save API response ``data`` to ``filename``"""
+    with open_dump(filename, 'w') as fdesc:
+        json.dump(data, fdesc)
+
+
+def match_indices(search_pattern: str, indices: t.Iterable[str]) -> t.List[str]:
+    """
+    Return the names in ``indices`` matching ``search_pattern``, which may be a
+    comma-separated list of names and wildcard patterns. Patterns starting with
+    ``-`` exclude the indices they match.
+    """
+    matched: t.List[str] = []
+    for pattern in search_pattern.split(','):
+        if pattern.startswith('-'):
+            matched = [idx for idx in matched if not fnmatchcase(idx, pattern[1:])]
+            continue
+        if pattern == '_all':
+            pattern = '*'
+        for idx in indices:
+            if idx not in matched and fnmatchcase(idx, pattern):
+                matched.append(idx)
+    return matched
+
+
+class OfflineIndices:
+    """The parts of the indices API used by FieldUsage, from saved responses"""
+
+    def __init__(self, usage: t.Dict[str, t.Any], mappings: t.Dict[str, t.Any]):
+        self.usage = usage
+        self.mappings = mappings
+
+    def field_usage_stats(self, index: str, **_: t.Any) -> t.Dict[str, t.Any]:
+        """Return the saved field usage for the indices matching ``index``"""
+        names = [name for name in self.usage if name != '_shards']
+        return {idx: self.usage[idx] for idx in match_indices(index, names)}
+
+    def get_mapping(self, index: str, **_: t.Any) -> t.Dict[str, t.Any]:
+        """Return the saved mappings for the indices matching ``index``"""
+        return {idx: self.mappings[idx] for idx in match_indices(index, self.mappings)}
+
+
+class OfflineCat:
+    """The parts of the cat API used by FieldUsage, from saved responses"""
+
+    def __init__(self, usage: t.Dict[str, t.Any]) -> None:
+        self.usage = usage
+
+    def indices(self, index: str, **_: t.Any) -> t.List[t.Dict[str, str]]:
+        """Return the index names in the saved field usage matching ``index``"""
+        names = [name for name in self.usage if name != '_shards']
+        return [{'index': idx} for idx in match_indices(index, names)]
+
+
+class OfflineCluster:
+    """The cluster API is not available offline"""
+
+    def state(self, **_: t.Any) -> t.Dict[str, t.Any]:
+        """Cluster metadata is never saved, so this always raises an exception"""
+        raise ResultNotExpected('Cluster state is not available offline')
+
+
+class OfflineClient:
+    """
+    Stand-in for the Elasticsearch client which answers the API calls made by
+    :py:class:`~.es_fieldusage.main.FieldUsage` from a saved field_usage_stats
+    response in ``usage_file`` and a saved get_mapping response in
+    ``mappings_file``. Reports can then be rebuilt without touching the cluster.
+    """
+
+    def __init__(self, usage_file: str, mappings_file: str) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.logger.info(f'Reading field usage from {usage_file}')
+        usage = load_dump(usage_file)
+        self.logger.info(f'Reading mappings from {mappings_file}')
+        mappings = load_dump(mappings_file)
+        self.indices = OfflineIndices(usage, mappings)
+        self.cat = OfflineCat(usage)
+        self.cluster = OfflineCluster()
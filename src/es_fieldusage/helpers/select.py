@@ -0,0 +1,89 @@
+"""Select the most or least accessed fields from results already in order"""
+
+import typing as t
+from collections import deque
+from collections.abc import Mapping
+from itertools import chain, dropwhile, islice, takewhile
+
+
+def select_counts(
+    items: t.Iterable[t.Tuple[str, int]],
+    top: t.Optional[int] = None,
+    bottom: t.Optional[int] = None,
+    min_count: t.Optional[int] = None,
+    max_count: t.Optional[int] = None,
+) -> t.Dict[str, int]:
+    """
+    Return the ``top`` or ``bottom`` N of the field name and count ``items``,
+    with counts from ``min_count`` to ``max_count`` (both inclusive), in the
+    order they are read.
+
+    ``items`` must be ordered by count (descending), as every result is. The
+    items in range are then one run of ``items``, and the top or bottom N are
+    the first or last N of it, so nothing is sorted again. Fields with equal
+    counts keep their order, e.g. mapping order within an index.
+    """
+    if max_count is not None:
+        items = dropwhile(lambda item: item[1] > max_count, items)
+    if min_count is not None:
+        items = takewhile(lambda item: item[1] >= min_count, items)
+    if top is not None:
+        return dict(islice(items, top))
+    if bottom is not None:
+        return dict(deque(items, maxlen=bottom))
+    return dict(items)
+
+
+def select_sections(
+    data: t.Dict[str, t.Any],
+    sections: t.Sequence[str],
+    selection: t.Dict[str, t.Optional[int]],
+) -> t.Dict[str, t.Any]:
+    """
+    Return ``data`` (with accessed and unaccessed fields, and any other keys)
+    with only the fields picked from the named ``sections`` by
+    :py:func:`select_counts` with the keyword arguments in ``selection``, so
+    that e.g. the top N is taken across both accessed and unaccessed fields if
+    both are shown. The accessed fields all come before the unaccessed ones, so
+    the sections are read in that order. ``data`` is returned as it is if
+    nothing is selected.
+    """
+    if all(value is None for value in selection.values()):
+        return data
+    picked = select_counts(
+        chain.from_iterable(data[key].items() for key in sections), **selection
+    )
+    result = dict(data)
+    result['accessed'] = {name: count for name, count in picked.items() if count}
+    result['unaccessed'] = {name: count for name, count in picked.items() if not count}
+    return result
+
+
+class SelectView(Mapping):
+    """
+    Dict-like view of per-index ``data``, as returned by
+    :py:func:`~.es_fieldusage.commands.get_per_index`, where the fields of each
+    index are picked by :py:func:`select_sections` when that index is accessed
+    """
+
+    def __init__(
+        self,
+        data: t.Mapping[str, t.Dict[str, t.Any]],
+        sections: t.Sequence[str],
+        selection: t.Dict[str, t.Optional[int]],
+    ) -> None:
+        self.data = data
+        self.sections = sections
+        self.selection = selection
+
+    def __getitem__(self, index: str) -> t.Dict[str, t.Any]:
+        return select_sections(self.data[index], self.sections, self.selection)
+
+    def __contains__(self, index: object) -> bool:
+        return index in self.data
+
+    def __iter__(self) -> t.Iterator[str]:
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
@@ -0,0 +1,104 @@
+"""Local snapshots of field usage counters, and the deltas between them"""
+
+import typing as t
+import logging
+import os
+from es_fieldusage.defaults import DELTA_PREFIX, SNAPSHOT_FILE
+from es_fieldusage.helpers.utils import load_json, save_json
+
+
+def make_snapshot(
+    search_pattern: str,
+    shard_usage: t.Dict[str, t.Dict[str, t.Dict[str, t.Any]]],
+    timestamp: str,
+) -> t.Dict[str, t.Any]:
+    """
+    Return a snapshot of the per-shard-copy field counters in ``shard_usage``, as
+    collected by :py:class:`~.es_fieldusage.main.FieldUsage` with
+    ``keep_shards=True``
+    """
+    return {
+        'timestamp': timestamp,
+        'search_pattern': search_pattern,
+        'indices': shard_usage,
+    }
+
+
+def diff_snapshots(
+    previous: t.Dict[str, t.Any], current: t.Dict[str, t.Any]
+) -> t.Dict[str, t.Dict[str, int]]:
+    """
+    Return the change in each field's count per index from ``previous`` to
+    ``current``. Only fields whose count changed are included.
+
+    Field usage counters are kept per shard copy, and are cumulative since that
+    copy started tracking, identified by its tracking_id. A copy found in both
+    snapshots contributes the difference between its counts. A copy that is new
+    in ``current`` (e.g. after a relocation or node restart reset its counters)
+    started from zero, so all of its counts are new. Copies which have gone away
+    contribute nothing.
+    """
+    result: t.Dict[str, t.Dict[str, int]] = {}
+    for idx, shards in current['indices'].items():
+        before = previous['indices'].get(idx, {})
+        changes: t.Dict[str, int] = {}
+        for tracking_id, shard in shards.items():
+            old = before.get(tracking_id, {}).get('fields', {})
+            for field, count in shard['fields'].items():
+                delta = count - old.get(field, 0)
+                if delta < 0:
+                    # Counters never go down for the same tracking_id, but be
+                    # safe and treat this as a reset
+                    delta = count
+                if delta:
+                    changes[field] = changes.get(field, 0) + delta
+        if changes:
+            result[idx] = changes
+    return result
+
+
+class SnapshotStore:
+    """
+    Directory of field usage snapshots. The full counters from the most recent
+    run are kept in one file, which is what the next run is compared to. Each
+    run after that only adds a small file of the counts which changed.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    @property
+    def latest_file(self) -> str:
+        """The file containing the most recent full snapshot"""
+        return os.path.join(self.path, SNAPSHOT_FILE)
+
+    def latest(self) -> t.Optional[t.Dict[str, t.Any]]:
+        """Return the most recent snapshot, or None if there is not one yet"""
+        if not os.path.exists(self.latest_file):
+            return None
+        return load_json(self.latest_file)
+
+    def delta_files(self) -> t.List[str]:
+        """Return the names of all saved delta files, oldest first"""
+        return sorted(
+            fname for fname in os.listdir(self.path) if fname.startswith(DELTA_PREFIX)
+        )
+
+    def save(
+        self,
+        snapshot: t.Dict[str, t.Any],
+        delta: t.Optional[t.Dict[str, t.Any]] = None,
+    ) -> None:
+        """
+        Save ``delta``, if provided, then replace the latest snapshot with
+        ``snapshot``
+        """
+        if delta is not None:
+            stamp = snapshot['timestamp'].replace(':', '')
+            filename = os.path.join(self.path, f'{DELTA_PREFIX}{stamp}.json.gz')
+            self.logger.debug(f'Saving delta to {filename}')
+            save_json(filename, delta)
+        self.logger.debug(f'Saving snapshot to {self.latest_file}')
+        save_json(self.latest_file, snapshot)
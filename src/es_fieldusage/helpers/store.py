@@ -0,0 +1,515 @@
+"""Compact, columnar storage for field usage counts"""
+
+import typing as t
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping, MutableMapping
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # pylint: disable=C0103
+
+# Array typecodes for field ids and counts
+ID_TYPE: str = 'I'
+COUNT_TYPE: str = 'q'
+
+
+class FieldTable:
+    """
+    Table of interned field names. Each distinct name is stored once and
+    referred to everywhere else by its integer id. Interning is thread-safe.
+    """
+
+    def __init__(self) -> None:
+        self.names: t.List[str] = []
+        self.ids: t.Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def intern(self, name: str) -> int:
+        """Return the id for ``name``, adding it to the table if necessary"""
+        try:
+            return self.ids[name]
+        except KeyError:
+            with self._lock:
+                if name not in self.ids:
+                    self.names.append(name)
+                    self.ids[name] = len(self.names) - 1
+                return self.ids[name]
+
+
+class CountsView(Mapping):
+    """
+    Read-only, dict-like view of field names to counts, backed by a pair of
+    arrays of field ids and counts. Only positions ``start`` to ``stop`` are
+    visible.
+    """
+
+    def __init__(
+        self,
+        fields: FieldTable,
+        ids: array,
+        counts: array,
+        start: int = 0,
+        stop: t.Optional[int] = None,
+    ) -> None:
+        self.fields = fields
+        self.ids = ids
+        self.counts = counts
+        self.start = start
+        self.stop = len(ids) if stop is None else stop
+        self._positions: t.Optional[t.Dict[int, int]] = None
+
+    def __getitem__(self, name: str) -> int:
+        fid = self.fields.ids.get(name)
+        if self._positions is None:
+            self._positions = {
+                self.ids[pos]: pos for pos in range(self.start, self.stop)
+            }
+        if fid is None or fid not in self._positions:
+            raise KeyError(name)
+        return self.counts[self._positions[fid]]
+
+    def __iter__(self) -> t.Iterator[str]:
+        names = self.fields.names
+        for pos in range(self.start, self.stop):
+            yield names[self.ids[pos]]
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({dict(self.items())})'
+
+    def items(self) -> t.Iterator[t.Tuple[str, int]]:  # type: ignore[override]
+        """Yield (name, count) pairs in stored order"""
+        names = self.fields.names
+        for pos in range(self.start, self.stop):
+            yield names[self.ids[pos]], self.counts[pos]
+
+    def split(self) -> t.Tuple['CountsView', 'CountsView']:
+        """
+        Return views of the non-zero and zero counts, in that order. This assumes
+        the counts are sorted in descending order, so the zeros are at the end.
+        """
+        pos = self.start
+        while pos < self.stop and self.counts[pos] != 0:
+            pos += 1
+        return (
+            CountsView(self.fields, self.ids, self.counts, self.start, pos),
+            CountsView(self.fields, self.ids, self.counts, pos, self.stop),
+        )
+
+
+class CountersView(Mapping):
+    """
+    Read-only, dict-like view of field names to a tuple of ``width`` counters,
+    one per access type. It is backed by an array of field ids and one flat array
+    of counters, ``width`` per field.
+    """
+
+    def __init__(
+        self, fields: FieldTable, ids: array, counters: array, width: int
+    ) -> None:
+        self.fields = fields
+        self.ids = ids
+        self.counters = counters
+        self.width = width
+        self._positions: t.Optional[t.Dict[int, int]] = None
+
+    def __getitem__(self, name: str) -> t.Tuple[int, ...]:
+        fid = self.fields.ids.get(name)
+        if self._positions is None:
+            self._positions = {fid: pos for pos, fid in enumerate(self.ids)}
+        if fid is None or fid not in self._positions:
+            raise KeyError(name)
+        start = self._positions[fid] * self.width
+        return tuple(self.counters[start : start + self.width])
+
+    def __iter__(self) -> t.Iterator[str]:
+        names = self.fields.names
+        for fid in self.ids:
+            yield names[fid]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({dict(self.items())})'
+
+    def counters_for(self, name: str) -> t.Tuple[int, ...]:
+        """Return the counters for ``name``, or all zeros if it has none"""
+        try:
+            return self[name]
+        except KeyError:
+            return (0,) * self.width
+
+
+def to_arrays(
+    fields: FieldTable, items: t.Iterable[t.Tuple[str, int]]
+) -> t.Tuple[array, array]:
+    """Return arrays of interned field ids and counts from ``items``"""
+    ids = array(ID_TYPE)
+    counts = array(COUNT_TYPE)
+    for name, count in items:
+        ids.append(fields.intern(name))
+        counts.append(count)
+    return ids, counts
+
+
+def sum_rows(
+    fields: FieldTable, rows: t.Iterable[t.Tuple[array, array]]
+) -> t.Tuple[array, array]:
+    """
+    Sum the counts per field id across all ``rows`` of field ids and counts.
+
+    Return arrays of the field ids found and their totals, ordered by total
+    (descending), then by field name. If NumPy is installed, the summing and
+    ordering are each done in one vectorized operation. Otherwise this falls back
+    to pure Python.
+    """
+    if np is not None:
+        return _sum_rows_numpy(fields, rows)
+    return _sum_rows_python(fields, rows)
+
+
+def _sum_rows_python(
+    fields: FieldTable, rows: t.Iterable[t.Tuple[array, array]]
+) -> t.Tuple[array, array]:
+    # Rows may intern new fields as they are read (e.g. from a LazyStore), so
+    # they are all read before the totals are sized
+    rows = list(rows)
+    totals = [0] * len(fields)
+    found = bytearray(len(fields))
+    for ids, counts in rows:
+        for fid, count in zip(ids, counts):
+            totals[fid] += count
+            found[fid] = 1
+    names = fields.names
+    order = sorted(
+        (fid for fid, flag in enumerate(found) if flag),
+        key=lambda fid: (-totals[fid], names[fid]),
+    )
+    return array(ID_TYPE, order), array(COUNT_TYPE, [totals[fid] for fid in order])
+
+
+def _sum_rows_numpy(
+    fields: FieldTable, rows: t.Iterable[t.Tuple[array, array]]
+) -> t.Tuple[array, array]:
+    id_arrays = []
+    count_arrays = []
+    for ids, counts in rows:
+        id_arrays.append(np.frombuffer(ids, dtype=ID_TYPE))
+        count_arrays.append(np.frombuffer(counts, dtype=COUNT_TYPE))
+    if not id_arrays:
+        return array(ID_TYPE), array(COUNT_TYPE)
+    all_ids = np.concatenate(id_arrays)
+    totals = np.zeros(len(fields), dtype=COUNT_TYPE)
+    np.add.at(totals, all_ids, np.concatenate(count_arrays))
+    found = np.flatnonzero(np.bincount(all_ids, minlength=len(fields)))
+    # Rank the names alphabetically so the final ordering is one lexsort
+    name_rank = np.empty(len(fields), dtype=np.int64)
+    name_rank[np.argsort(np.array(fields.names))] = np.arange(len(fields))
+    order = found[np.lexsort((name_rank[found], -totals[found]))]
+    return (
+        array(ID_TYPE, order.astype(ID_TYPE).tobytes()),
+        array(COUNT_TYPE, totals[order].tobytes()),
+    )
+
+
+def to_counter_arrays(
+    fields: FieldTable, items: t.Iterable[t.Tuple[str, t.Sequence[int]]]
+) -> t.Tuple[array, array]:
+    """
+    Return an array of interned field ids and a flat array of their counters
+    from ``items``, which must all have the same number of counters
+    """
+    ids = array(ID_TYPE)
+    counters = array(COUNT_TYPE)
+    for name, values in items:
+        ids.append(fields.intern(name))
+        counters.extend(values)
+    return ids, counters
+
+
+def sum_counter_rows(
+    fields: FieldTable, rows: t.Iterable[t.Tuple[array, array]], width: int
+) -> t.Tuple[array, array]:
+    """
+    Sum each of the ``width`` counters per field id across all ``rows`` of field
+    ids and flat counters.
+
+    Return arrays of the field ids found, in id order, and their summed counters.
+    If NumPy is installed, the rows are summed as one two-dimensional array.
+    Otherwise this falls back to pure Python.
+    """
+    if np is not None:
+        return _sum_counter_rows_numpy(fields, rows, width)
+    return _sum_counter_rows_python(fields, rows, width)
+
+
+def _sum_counter_rows_python(
+    fields: FieldTable, rows: t.Iterable[t.Tuple[array, array]], width: int
+) -> t.Tuple[array, array]:
+    totals: t.Dict[int, t.List[int]] = {}
+    for ids, counters in rows:
+        for pos, fid in enumerate(ids):
+            values = counters[pos * width : (pos + 1) * width]
+            if fid in totals:
+                total = totals[fid]
+                for num, value in enumerate(values):
+                    total[num] += value
+            else:
+                totals[fid] = list(values)
+    order = sorted(totals)
+    flat = array(COUNT_TYPE)
+    for fid in order:
+        flat.extend(totals[fid])
+    return array(ID_TYPE, order), flat
+
+
+def _sum_counter_rows_numpy(
+    fields: FieldTable, rows: t.Iterable[t.Tuple[array, array]], width: int
+) -> t.Tuple[array, array]:
+    id_arrays = []
+    counter_arrays = []
+    for ids, counters in rows:
+        id_arrays.append(np.frombuffer(ids, dtype=ID_TYPE))
+        counter_arrays.append(
+            np.frombuffer(counters, dtype=COUNT_TYPE).reshape(-1, width)
+        )
+    if not id_arrays:
+        return array(ID_TYPE), array(COUNT_TYPE)
+    all_ids = np.concatenate(id_arrays)
+    totals = np.zeros((len(fields), width), dtype=COUNT_TYPE)
+    np.add.at(totals, all_ids, np.concatenate(counter_arrays))
+    found = np.flatnonzero(np.bincount(all_ids, minlength=len(fields)))
+    return (
+        array(ID_TYPE, found.astype(ID_TYPE).tobytes()),
+        array(COUNT_TYPE, totals[found].tobytes()),
+    )
+
+
+def counters_to_dict(
+    values: t.Sequence[int], names: t.Sequence[str]
+) -> t.Dict[str, t.Any]:
+    """
+    Return ``values`` as a dictionary keyed by the matching counter ``names``,
+    nested the same way as in the field usage API (e.g. inverted_index.terms
+    becomes {'inverted_index': {'terms': ...}})
+    """
+    result: t.Dict[str, t.Any] = {}
+    for name, value in zip(names, values):
+        node = result
+        *parents, key = name.split('.')
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[key] = value
+    return result
+
+
+class UsageStore(MutableMapping):
+    """
+    Dict-like store of per-index field counts, keyed by index name. Every index
+    is one row of field ids and counts, and all rows share one
+    :py:class:`FieldTable`, so each field name is only kept once no matter how
+    many indices it appears in. Rows are returned as :py:class:`CountsView`
+    objects, and can be set from any mapping of field name to count.
+    """
+
+    def __init__(self, fields: t.Optional[FieldTable] = None) -> None:
+        self.fields = FieldTable() if fields is None else fields
+        self._rows: t.Dict[str, t.Tuple[array, array]] = {}
+
+    def __getitem__(self, index: str) -> CountsView:
+        ids, counts = self._rows[index]
+        return CountsView(self.fields, ids, counts)
+
+    def __setitem__(self, index: str, value: t.Mapping[str, int]) -> None:
+        self._rows[index] = to_arrays(self.fields, value.items())
+
+    def __delitem__(self, index: str) -> None:
+        del self._rows[index]
+
+    def __iter__(self) -> t.Iterator[str]:
+        return iter(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({list(self._rows)})'
+
+    def set_row(self, index: str, ids: array, counts: array) -> None:
+        """Set the raw arrays of field ids and counts for ``index``"""
+        self._rows[index] = (ids, counts)
+
+    def row(self, index: str) -> t.Tuple[array, array]:
+        """Return the raw arrays of field ids and counts for ``index``"""
+        return self._rows[index]
+
+    def rows(self) -> t.Iterator[t.Tuple[array, array]]:
+        """Yield the raw arrays of field ids and counts for every index"""
+        return iter(self._rows.values())
+
+    def totals(self) -> CountsView:
+        """
+        Return a view of the counts summed per field across all indices, ordered
+        by count (descending), then by field name
+        """
+        return CountsView(self.fields, *sum_rows(self.fields, self.rows()))
+
+
+class LazyStore(Mapping):
+    """
+    Dict-like store of per-index field counts, like :py:class:`UsageStore`, for
+    a known list of ``indices``. The row for an index is only computed by calling
+    ``compute(index)`` when it is first accessed, and at most ``maxsize`` rows are
+    kept, discarding the least recently used.
+    """
+
+    def __init__(
+        self,
+        fields: FieldTable,
+        indices: t.Sequence[str],
+        compute: t.Callable[[str], t.Tuple[array, array]],
+        maxsize: int,
+    ) -> None:
+        self.fields = fields
+        self.indices = list(indices)
+        self.compute = compute
+        self.maxsize = maxsize
+        self._known = set(self.indices)
+        self._cache: t.OrderedDict[str, t.Tuple[array, array]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getitem__(self, index: str) -> CountsView:
+        ids, counts = self.row(index)
+        return CountsView(self.fields, ids, counts)
+
+    def __contains__(self, index: object) -> bool:
+        return index in self._known
+
+    def __iter__(self) -> t.Iterator[str]:
+        return iter(self.indices)
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self.indices})'
+
+    def row(self, index: str) -> t.Tuple[array, array]:
+        """
+        Return the raw arrays of field ids and counts for ``index``, computing
+        them if they are not cached
+        """
+        if index not in self._known:
+            raise KeyError(index)
+        with self._lock:
+            if index in self._cache:
+                self._cache.move_to_end(index)
+                return self._cache[index]
+        # Compute outside of the lock so other indices are not held up
+        value = self.compute(index)
+        with self._lock:
+            self._cache[index] = value
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return value
+
+    def rows(self) -> t.Iterator[t.Tuple[array, array]]:
+        """Yield the raw arrays of field ids and counts for every index, in order"""
+        for index in self.indices:
+            yield self.row(index)
+
+    def totals(self) -> CountsView:
+        """
+        Return a view of the counts summed per field across all indices, ordered
+        by count (descending), then by field name
+        """
+        return CountsView(self.fields, *sum_rows(self.fields, self.rows()))
+
+
+class AccessStore(MutableMapping):
+    """
+    Dict-like store of per-index, per-access-type field counters, keyed by index
+    name. Like :py:class:`UsageStore`, every index is one row sharing a
+    :py:class:`FieldTable`, but each field has ``width`` counters, kept together
+    in one flat array. Rows are returned as :py:class:`CountersView` objects, and
+    can be set from any mapping of field name to a sequence of counters.
+    """
+
+    def __init__(self, width: int, fields: t.Optional[FieldTable] = None) -> None:
+        self.width = width
+        self.fields = FieldTable() if fields is None else fields
+        self._rows: t.Dict[str, t.Tuple[array, array]] = {}
+
+    def __getitem__(self, index: str) -> CountersView:
+        ids, counters = self._rows[index]
+        return CountersView(self.fields, ids, counters, self.width)
+
+    def __setitem__(self, index: str, value: t.Mapping[str, t.Sequence[int]]) -> None:
+        self._rows[index] = to_counter_arrays(self.fields, value.items())
+
+    def __delitem__(self, index: str) -> None:
+        del self._rows[index]
+
+    def __iter__(self) -> t.Iterator[str]:
+        return iter(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({list(self._rows)})'
+
+    def totals(self, indices: t.Optional[t.Iterable[str]] = None) -> CountersView:
+        """
+        Return a view of the counters summed per field across all indices, or
+        only across ``indices`` if given
+        """
+        if indices is None:
+            rows: t.Iterable[t.Tuple[array, array]] = self._rows.values()
+        else:
+            rows = (self._rows[index] for index in indices)
+        ids, counters = sum_counter_rows(self.fields, rows, self.width)
+        return CountersView(self.fields, ids, counters, self.width)
+
+
+class SplitView(Mapping):
+    """
+    Dict-like view of ``results``, a mapping of index names to
+    :py:class:`CountsView`, where each index maps to a dictionary of its
+    ``accessed`` and ``unaccessed`` fields. Nothing is computed until an index is
+    accessed. If ``access`` is given, each index's :py:class:`CountersView` from
+    it is included as ``access``.
+    """
+
+    def __init__(
+        self,
+        results: t.Mapping[str, CountsView],
+        access: t.Optional[t.Mapping[str, CountersView]] = None,
+    ) -> None:
+        self.results = results
+        self.access = access
+
+    def __getitem__(self, index: str) -> t.Dict[str, t.Any]:
+        accessed, unaccessed = self.results[index].split()
+        data: t.Dict[str, t.Any] = {'accessed': accessed, 'unaccessed': unaccessed}
+        if self.access is not None:
+            data['access'] = self.access[index]
+        return data
+
+    def __contains__(self, index: object) -> bool:
+        return index in self.results
+
+    def __iter__(self) -> t.Iterator[str]:
+        return iter(self.results)
+
+    def __len__(self) -> int:
+        return len(self.results)
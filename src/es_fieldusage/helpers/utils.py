@@ -1,67 +1,161 @@
 """Utility helper functions"""
 
 import typing as t
+import gzip
+import hashlib
+import json
+import os
+import tempfile
 from collections import defaultdict
-from functools import reduce
+from concurrent.futures import ThreadPoolExecutor
 from itertools import chain
-from operator import getitem, itemgetter
+from operator import itemgetter
 import click
+from es_fieldusage.defaults import ACCESS_TYPES
 from es_fieldusage.exceptions import ConfigurationException
+from es_fieldusage.helpers.writer import replace_file
 
 
-def convert_mapping(
-    data: t.Dict[str, t.Any], new_dict: t.Optional[t.Dict[str, t.Any]] = None
-) -> t.Dict[str, t.Any]:
+def chunk_indices(
+    indices: t.Sequence[str], max_chars: int, max_count: int = 0
+) -> t.Generator[t.List[str], None, None]:
     """
-    Convert an Elasticsearch mapping into a dictionary more closely approximating
-    the one coming from the field usage API.
-
-    Receive the mapping dict as ``data``
-    Strip out "properties" keys. They are not in the field_usage stats paths.
-    Set the value at the end of each dict path to 0 (we merge counts from field
-    usage later)
-    """
-    if new_dict is None:
-        new_dict = {}
-    retval = {}
-    for key, value in data.items():
-        new_dict[key] = value
-        if isinstance(value, dict):
-            if 'properties' in value:
-                new_dict[key] = value['properties']
-                retval[key] = convert_mapping(new_dict[key], new_dict={})
-            else:
-                retval[key] = 0
-    return retval
+    Yield lists of index names from ``indices`` where each list, when joined with
+    commas, is no longer than ``max_chars``. An index name longer than
+    ``max_chars`` by itself is yielded alone. If ``max_count`` is set, no list
+    will contain more than ``max_count`` index names.
+    """
+    chunk: t.List[str] = []
+    length = 0
+    for idx in indices:
+        # Add one for the comma if this is not the first index in the chunk
+        addition = len(idx) + (1 if chunk else 0)
+        full = max_count and len(chunk) >= max_count
+        if chunk and (full or length + addition > max_chars):
+            yield chunk
+            chunk = []
+            addition = len(idx)
+            length = 0
+        chunk.append(idx)
+        length += addition
+    if chunk:
+        yield chunk
 
 
-def detuple(path: t.List[t.Any]) -> t.List[t.Any]:
-    """If we used a tuple to access a dict path, we fix it to be a list again here"""
-    if len(path) == 1 and isinstance(path[0], tuple):
-        return list(path[0])
-    return path
+def concurrent_map(
+    func: t.Callable[[t.Any], t.Any], items: t.Sequence[t.Any], workers: int = 1
+) -> t.List[t.Any]:
+    """
+    Return ``[func(item) for item in items]``, in order. If ``workers`` is greater
+    than 1, the calls are spread across a pool of that many threads.
+    """
+    if workers > 1 and len(items) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(func, items))
+    return [func(item) for item in items]
 
 
-def get_value_from_path(data: t.Dict[str, t.Any], path: t.List[t.Any]) -> t.Any:
+def flatten_mapping(data: t.Dict[str, t.Any]) -> t.List[str]:
     """
-    Return value from dict ``data``. Recreate all keys from list ``path``
+    Return the dotted names of all leaf fields in mapping ``data``, in mapping
+    order, as they would be named by the field usage API.
+
+    This is done in a single pass. The "properties" keys are not part of the
+    field names, and multi-fields are not included (they only appear in the field
+    usage data).
     """
-    return reduce(getitem, path, data)
+    fields: t.List[str] = []
 
+    def walk(properties: t.Dict[str, t.Any], prefix: str) -> None:
+        for key, value in properties.items():
+            if isinstance(value, dict):
+                if 'properties' in value:
+                    walk(value['properties'], f'{prefix}{key}.')
+                else:
+                    fields.append(f'{prefix}{key}')
 
-def iterate_paths(
-    data: t.Dict[str, t.Any], path: t.Optional[t.List[str]] = None
-) -> t.Generator[t.List[str], None, None]:
-    """Recursively extract all paths from a dictionary"""
-    if path is None:
-        path = []
-    for key, value in data.items():
-        newpath = path + [key]
-        if isinstance(value, dict):
-            for subkey in iterate_paths(value, newpath):
-                yield subkey
+    walk(data, '')
+    return fields
+
+
+def format_bytes(num: float) -> str:
+    """Return ``num`` bytes in the largest binary unit below it"""
+    for unit in ('B', 'KiB', 'MiB', 'GiB', 'TiB'):
+        if abs(num) < 1024 or unit == 'TiB':
+            break
+        num /= 1024
+    return f'{num:.1f} {unit}'
+
+
+def load_json(filename: str) -> t.Any:
+    """Load JSON data from gzip-compressed ``filename``"""
+    with gzip.open(filename, 'rt', encoding='utf-8') as fdesc:
+        return json.load(fdesc)
+
+
+def mapping_hash(data: t.Dict[str, t.Any]) -> str:
+    """
+    Return a content hash of mapping ``data``. Key order is preserved, as it
+    determines the order of fields in the results.
+    """
+    content = json.dumps(data, separators=(',', ':'), default=str)
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def output_advice(search_pattern: str, groups: t.List[t.Dict[str, t.Any]]) -> None:
+    """
+    Output the mapping recommendations from
+    :py:func:`~.es_fieldusage.helpers.advisor.advise` to command-line/console
+    """
+    click.secho('\nMapping Recommendations', overline=True, underline=True, bold=True)
+    click.secho('\nSearch Pattern: ', nl=False)
+    click.secho(search_pattern, bold=True)
+    for num, group in enumerate(groups, start=1):
+        indices = group['indices']
+        click.secho(f'\nMapping {num} of {len(groups)}, used by ', nl=False)
+        click.secho(f'{len(indices)} ', bold=True, nl=False)
+        click.secho('indices: ', nl=False)
+        if len(indices) > 3:
+            click.secho(f'{indices[0:3]} ...', bold=True)
         else:
-            yield newpath
+            click.secho(f'{indices}', bold=True)
+        if not group['recommendations']:
+            click.secho('  No changes recommended')
+        for rec in group['recommendations']:
+            click.secho(f'  {rec["field"]}: ', nl=False)
+            if rec['action'] == 'remove':
+                click.secho('remove multi-field', bold=True, nl=False)
+            else:
+                click.secho(json.dumps(rec['change']), bold=True, nl=False)
+            click.secho(f' ({", ".join(rec["reasons"])})', nl=False)
+            if rec['savings'] is not None:
+                click.secho(f' saves {format_bytes(rec["savings"])}', nl=False)
+            click.secho()
+        if group['savings'] is not None:
+            click.secho('Estimated Savings: ', nl=False)
+            click.secho(
+                f'{format_bytes(group["savings"])} of '
+                f'{format_bytes(group["store_size"])}',
+                bold=True,
+            )
+
+
+def output_delta_report(
+    search_pattern: str, previous: str, changes: t.Dict[str, t.Dict[str, int]]
+) -> None:
+    """
+    Output summary report data for the field usage changes since the snapshot
+    taken at ``previous`` to command-line/console
+    """
+    click.secho('\nChange Report', overline=True, underline=True, bold=True)
+    click.secho('\nSearch Pattern: ', nl=False)
+    click.secho(search_pattern, bold=True)
+    click.secho('Changes Since: ', nl=False)
+    click.secho(previous, bold=True)
+    click.secho('Indices Changed: ', nl=False)
+    click.secho(len(changes), bold=True)
+    click.secho('Fields Changed: ', nl=False)
+    click.secho(len(set().union(*changes.values())), bold=True)
 
 
 def output_report(search_pattern: str, report: t.Dict[str, t.Any]) -> None:
@@ -91,6 +185,54 @@ def output_report(search_pattern: str, report: t.Dict[str, t.Any]) -> None:
     # Unaccessed Fields
     click.secho('Unaccessed Fields: ', nl=False)
     click.secho(len(report['unaccessed'].keys()), bold=True)
+    # Fields with each access type, if access types were collected
+    if 'access' in report:
+        used = [0] * len(ACCESS_TYPES)
+        for values in report['access'].values():
+            for num, value in enumerate(values):
+                if value:
+                    used[num] += 1
+        click.secho('Fields Accessed By Type:')
+        for name, count in zip(ACCESS_TYPES[1:], used[1:]):
+            click.secho(f'  {name}: ', nl=False)
+            click.secho(count, bold=True)
+    # Busiest nodes and most skewed indices, if shard copies were kept
+    if 'breakdown' in report:
+        breakdown = report['breakdown']
+        click.secho('Node Read Skew: ', nl=False)
+        click.secho(f'{breakdown["node_skew"]:.2f}', bold=True)
+        click.secho('Busiest Nodes:')
+        for node, reads in list(breakdown['nodes'].items())[0:3]:
+            click.secho(f'  {node}: ', nl=False)
+            click.secho(f'{reads} reads', bold=True)
+        click.secho('Most Skewed Indices:')
+        for idx, stats in list(breakdown['indices'].items())[0:3]:
+            busiest = stats['copies'][0] if stats['copies'] else {}
+            click.secho(f'  {idx}: ', nl=False)
+            click.secho(f'skew {stats["skew"]:.2f}', bold=True, nl=False)
+            click.secho(f', busiest copy on node {busiest.get("node")}')
+
+
+def output_timings(timings: t.Dict[str, t.Any]) -> None:
+    """
+    Output the phase timings, API calls and peak memory use collected by
+    :py:class:`~.es_fieldusage.helpers.metrics.Metrics` to command-line/console
+    """
+    click.secho('\nTimings', overline=True, underline=True, bold=True)
+    click.secho('\nTotal Time: ', nl=False)
+    click.secho(f'{timings["total_seconds"]:.3f}s', bold=True)
+    for name, seconds in timings['phases'].items():
+        click.secho(f'Phase {name}: ', nl=False)
+        click.secho(f'{seconds:.3f}s', bold=True)
+    for name, stats in timings['api'].items():
+        size = 'unknown size' if stats['bytes'] is None else f'{stats["bytes"]} bytes'
+        click.secho(f'API {name}: ', nl=False)
+        click.secho(
+            f'{stats["calls"]} calls, {size}, {stats["seconds"]:.3f}s', bold=True
+        )
+    if timings['peak_rss_bytes'] is not None:
+        click.secho('Peak RSS: ', nl=False)
+        click.secho(f'{timings["peak_rss_bytes"] / 1048576:.1f} MiB', bold=True)
 
 
 def override_settings(
@@ -110,6 +252,23 @@ def passthrough(func: t.Callable) -> t.Callable:
     return lambda a, k: func(*a, **k)
 
 
+def save_json(filename: str, data: t.Any) -> None:
+    """
+    Write ``data`` as gzip-compressed JSON to ``filename``. A temporary file is
+    renamed into place, so an interrupted run never leaves a truncated file.
+    """
+    dirname, basename = os.path.split(os.path.abspath(filename))
+    fdnum, tmpname = tempfile.mkstemp(prefix=f'.{basename}.', dir=dirname)
+    os.close(fdnum)
+    try:
+        with gzip.open(tmpname, 'wt', encoding='utf-8') as fdesc:
+            json.dump(data, fdesc, separators=(',', ':'))
+        replace_file(tmpname, filename)
+    except BaseException:
+        os.remove(tmpname)
+        raise
+
+
 def sort_by_name(data: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
     """Sort dictionary by key alphabetically"""
     return dict(sorted(data.items(), key=itemgetter(0)))
@@ -0,0 +1,83 @@
+"""Buffered, streaming file output"""
+
+import typing as t
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from es_fieldusage.defaults import WRITE_BUFFER
+
+
+def _read_umask() -> int:
+    """Return the process umask. It can only be read by setting it."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Read once at import, as changing it later would race with other threads
+UMASK = _read_umask()
+
+
+def replace_file(tmpname: str, filename: str) -> None:
+    """
+    Rename temporary file ``tmpname`` to ``filename``. Temporary files are created
+    readable only by their owner, so the mode of the file being replaced is kept,
+    or the one a plain ``open`` would have given a new file is applied.
+    """
+    try:
+        mode = os.stat(filename).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~UMASK
+    os.chmod(tmpname, mode)
+    os.replace(tmpname, filename)
+
+
+@contextmanager
+def open_output(
+    filename: str,
+    atomic: bool = False,
+    buffering: int = WRITE_BUFFER,
+    binary: bool = False,
+) -> t.Generator[t.IO[t.Any], None, None]:
+    """
+    Open ``filename`` for writing exactly once, with a large write buffer, and
+    replace any existing file. It is opened as UTF-8 text, or in binary mode if
+    ``binary`` is True.
+
+    If ``atomic`` is True, everything is written to a temporary file in the same
+    directory, which is renamed to ``filename`` only if the block completes
+    without error. Readers will then never see a partially written file.
+    """
+    mode, encoding = ('wb', None) if binary else ('w', 'utf-8')
+    if not atomic:
+        with open(filename, mode, encoding=encoding, buffering=buffering) as fdesc:
+            yield fdesc
+        return
+    dirname, basename = os.path.split(os.path.abspath(filename))
+    fdnum, tmpname = tempfile.mkstemp(prefix=f'.{basename}.', dir=dirname)
+    try:
+        with os.fdopen(fdnum, mode, encoding=encoding, buffering=buffering) as fdesc:
+            yield fdesc
+        replace_file(tmpname, filename)
+    except BaseException:
+        os.remove(tmpname)
+        raise
+
+
+def json_chunks(
+    sections: t.Iterable[t.Mapping[str, t.Any]],
+) -> t.Generator[str, None, None]:
+    """
+    Yield the key/value pairs of all ``sections`` as text chunks of a single JSON
+    object, formatted exactly as ``json.dump(..., indent=2)`` would, followed by
+    a newline. Nothing is combined into one dictionary first.
+    """
+    separator = '{\n  '
+    for section in sections:
+        for key, value in section.items():
+            # Nested values are indented one level deeper than the keys
+            text = json.dumps(value, indent=2).replace('\n', '\n  ')
+            yield f'{separator}{json.dumps(key)}: {text}'
+            separator = ',\n  '
+    yield '{}\n' if separator.startswith('{') else '\n}\n'
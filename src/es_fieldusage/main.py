@@ -3,23 +3,85 @@
 # pylint: disable=R0902
 import typing as t
 import logging
+import time
+from array import array
+from contextlib import nullcontext
 from es_client.helpers.config import get_client
+from es_fieldusage.defaults import (
+    ACCESS_FILTER_PATH,
+    ACCESS_TYPES,
+    MAPPING_VERSION_FILTER_PATH,
+    MAX_INDEX_CHARS,
+    USAGE_FILTER_PATH,
+)
 from es_fieldusage.helpers import utils as u
+from es_fieldusage.helpers.breakdown import breakdown
+from es_fieldusage.helpers.cache import DiskCache
+from es_fieldusage.helpers.metrics import Metrics
+from es_fieldusage.helpers.store import (
+    AccessStore,
+    CountersView,
+    CountsView,
+    FieldTable,
+    LazyStore,
+    SplitView,
+    UsageStore,
+    to_arrays,
+)
 from es_fieldusage.exceptions import ResultNotExpected, ValueMismatch
 
+# Each of ACCESS_TYPES as a path of keys in the per-field stats
+ACCESS_PATHS: t.List[t.List[str]] = [name.split('.') for name in ACCESS_TYPES]
+
 
 class FieldUsage:
     """Main Class"""
 
-    def __init__(self, configdict: t.Dict[str, t.Any], search_pattern: str) -> None:
+    def __init__(
+        self,
+        configdict: t.Dict[str, t.Any],
+        search_pattern: str,
+        workers: int = 1,
+        batch_size: int = 0,
+        lru_size: int = 0,
+        keep_shards: bool = False,
+        cache: t.Optional[DiskCache] = None,
+        client: t.Optional[t.Any] = None,
+        metrics: t.Optional[Metrics] = None,
+        access_types: bool = False,
+    ) -> None:
         self.logger = logging.getLogger(__name__)
-        self.client = get_client(configdict=configdict)
-        self.usage_stats = {}
+        # A client may be provided, e.g. an OfflineClient reading saved responses
+        if client is None:
+            client = get_client(configdict=configdict)
+        self.client = client
+        self.workers = workers
+        self.batch_size = batch_size
+        self.lru_size = lru_size
+        self.keep_shards = keep_shards
+        self.cache = cache
+        self.metrics = metrics
+        # Cached responses are only ever used for the cluster they came from
+        self.cluster = self.cluster_identity(configdict) if cache is not None else ''
+        # All per-index and summed counts share one table of field names
+        self.fields = FieldTable()
+        self.usage_stats = UsageStore(self.fields)
+        # With access_types, every counter in ACCESS_TYPES is also kept per field
+        self.access_stats: t.Optional[AccessStore] = None
+        if access_types:
+            self.access_stats = AccessStore(len(ACCESS_TYPES), self.fields)
+        self.access_results_data: t.Optional[CountersView] = None
         self.indices_data = []
-        self.per_index_data = {}
-        self.results_data = {}
+        self.per_index_data: t.Union[UsageStore, LazyStore] = UsageStore(self.fields)
+        self.results_data: t.Optional[CountsView] = None
         self.report_data = {}
-        self.per_index_report_data = {}
+        self.per_index_report_data: t.Optional[SplitView] = None
+        self.shard_usage: t.Dict[str, t.Dict[str, t.Dict[str, t.Any]]] = {}
+        self.breakdown_data: t.Optional[t.Dict[str, t.Any]] = None
+        self.mappings_data = {}
+        self.mapping_cache = {}
+        self.leaf_cache = {}
+        self.search_pattern = search_pattern
         self.logger.info(
             f"Initializing FieldUsage with search pattern: {search_pattern}"
         )
@@ -29,56 +91,321 @@ class FieldUsage:
         """
         Get ``raw_data`` from the field_usage_stats API for all indices in
         ``search_pattern`` Iterate over ``raw_data`` to build ``self.usage_stats``
+
+        If ``self.batch_size`` is set, ``search_pattern`` is first resolved to
+        concrete index names, and the field usage API is called for batches of at
+        most that many indices. Each response is summed into ``self.usage_stats``
+        and discarded before the next, which bounds peak memory use.
+        """
+        if self.batch_size:
+            indices = self.resolve_indices(search_pattern)
+            self.logger.debug(
+                f'Collecting field usage for {len(indices)} indices in batches of '
+                f'{self.batch_size}'
+            )
+            patterns = [
+                ','.join(chunk)
+                for chunk in u.chunk_indices(indices, MAX_INDEX_CHARS, self.batch_size)
+            ]
+        else:
+            patterns = [search_pattern]
+        with self.phase('collect'):
+            for usage in u.concurrent_map(self.collect, patterns, self.workers):
+                self.usage_stats.update(usage)
+
+    def refresh(self) -> t.List[str]:
+        """
+        Collect field usage for ``self.search_pattern`` again, reusing the
+        client, field names and mappings already fetched, and return the names
+        of the indices which are new or whose counts changed.
+
+        Only the results of those indices are recomputed, and their mappings
+        fetched again, in case fields were added. Indices which are gone are
+        dropped. Totals and reports are rebuilt from the updated results when
+        next accessed.
+        """
+        previous = self.usage_stats
+        self.usage_stats = UsageStore(self.fields)
+        if self.access_stats is not None:
+            self.access_stats = AccessStore(len(ACCESS_TYPES), self.fields)
+        self.shard_usage = {}
+        self.get(self.search_pattern)
+        changed = [
+            idx
+            for idx in self.usage_stats
+            if idx not in previous or self.usage_stats.row(idx) != previous.row(idx)
+        ]
+        removed = [idx for idx in previous if idx not in self.usage_stats]
+        self.logger.debug(
+            f'{len(changed)} indices changed and {len(removed)} removed since the '
+            f'last collection'
+        )
+        for idx in changed:
+            self.mappings_data.pop(idx, None)
+        self.indices_data = []
+        self.results_data = None
+        self.report_data = {}
+        self.per_index_report_data = None
+        self.access_results_data = None
+        self.breakdown_data = None
+        if isinstance(self.per_index_data, LazyStore):
+            # The indices of a LazyStore are fixed, so it is created again
+            self.per_index_data = UsageStore(self.fields)
+        elif self.per_index_data:
+            for idx in removed:
+                del self.per_index_data[idx]
+            self.get_mappings(changed)
+            with self.phase('merge'):
+                rows = u.concurrent_map(self.result_row, changed, self.workers)
+                for idx, (ids, counts) in zip(changed, rows):
+                    self.per_index_data.set_row(idx, ids, counts)
+        return changed
+
+    def phase(self, name: str) -> t.ContextManager[None]:
+        """
+        Return a context manager which adds the time spent in it to phase
+        ``name`` of ``self.metrics``, or does nothing if metrics are not collected
+        """
+        if self.metrics is None:
+            return nullcontext()
+        return self.metrics.phase(name)
+
+    def call_api(self, name: str, method: t.Callable[..., t.Any], **kwargs) -> t.Any:
+        """
+        Return the response of API ``method`` called with ``kwargs``, recording
+        the call as ``name`` in ``self.metrics`` if metrics are collected
+        """
+        start = time.perf_counter()
+        response = method(**kwargs)
+        if self.metrics is not None:
+            self.metrics.api_call(name, response, time.perf_counter() - start)
+        return response
+
+    def cluster_identity(self, configdict: t.Dict[str, t.Any]) -> str:
+        """
+        Return the cluster UUID, which identifies the cluster in every cache key.
+        If it cannot be read, the configured hosts or cloud_id are used instead.
         """
         try:
-            field_usage = self.client.indices.field_usage_stats(index=search_pattern)
+            info = self.call_api('info', self.client.info, filter_path='cluster_uuid')
+            return f"uuid:{info['cluster_uuid']}"
         except Exception as exc:
-            self.logger.error(f"Unable to get field usage: {exc}")
-            raise ResultNotExpected(f'Unable to get field usage: {exc}') from exc
+            self.logger.warning(f'Unable to get the cluster UUID: {exc}')
+        settings = configdict.get('elasticsearch', {}).get('client', {})
+        if settings.get('cloud_id'):
+            return f"cloud_id:{settings['cloud_id']}"
+        hosts = settings.get('hosts') or []
+        if isinstance(hosts, str):
+            hosts = [hosts]
+        return f"hosts:{','.join(sorted(hosts))}"
+
+    def collect(self, search_pattern: str) -> t.Dict[str, t.Dict[str, int]]:
+        """
+        Call the field_usage_stats API for ``search_pattern`` and return the
+        summed stats for each index found, keyed by index name
+
+        If ``self.keep_shards`` is True, the counts for each shard copy are also
+        kept in ``self.shard_usage``, keyed by index name and tracking_id. If
+        access types are being collected, the summed counters of each index are
+        kept in ``self.access_stats``.
+        """
+        usage = {}
+        field_usage = self.fetch_usage(search_pattern)
         for index in list(field_usage.keys()):
             if index == '_shards':
                 # Ignore this key as it is "global"
                 continue
-            self.usage_stats[index] = self.sum_index_stats(field_usage, index)
+            usage[index] = self.sum_index_stats(field_usage, index)
+            if self.access_stats is not None:
+                self.access_stats[index] = self.sum_access_stats(field_usage, index)
+            if self.keep_shards:
+                self.shard_usage[index] = self.shard_index_stats(field_usage, index)
+        return usage
+
+    def fetch_usage(self, search_pattern: str) -> t.Dict[str, t.Any]:
+        """
+        Return the field_usage_stats API response for ``search_pattern``, from
+        ``self.cache`` if it has an unexpired copy. Only the ``any`` counters are
+        requested, unless access types are being collected.
+
+        A cached response is only used if the UUIDs and mapping versions of the
+        indices matching ``search_pattern`` are unchanged, so an index which was
+        added, recreated or remapped since is never missed.
+        """
+        filter_path = USAGE_FILTER_PATH
+        cache_key = search_pattern
+        if self.access_stats is not None:
+            filter_path = ACCESS_FILTER_PATH
+            # Index names cannot contain a colon, so this never clashes
+            cache_key = f'{search_pattern}:access'
+        validator = None
+        if self.cache is not None:
+            versions = self.mapping_versions([search_pattern])
+            if versions:
+                validator = ','.join(
+                    f'{idx}={versions[idx]}' for idx in sorted(versions)
+                )
+            cached = self.cache.get('usage', self.cluster, cache_key, validator)
+            if cached is not None:
+                return cached
+        try:
+            response = self.call_api(
+                'field_usage_stats',
+                self.client.indices.field_usage_stats,
+                index=search_pattern,
+                filter_path=filter_path,
+            )
+        except Exception as exc:
+            self.logger.error(f"Unable to get field usage: {exc}")
+            raise ResultNotExpected(f'Unable to get field usage: {exc}') from exc
+        field_usage = getattr(response, 'body', response)
+        if self.cache is not None:
+            self.cache.set('usage', self.cluster, cache_key, field_usage, validator)
+        return field_usage
+
+    def resolve_indices(self, search_pattern: str) -> t.List[str]:
+        """
+        Return the sorted names of all open indices matching ``search_pattern``
+        """
+        try:
+            cat = self.call_api(
+                'cat.indices',
+                self.client.cat.indices,
+                index=search_pattern,
+                h='index',
+                format='json',
+                expand_wildcards='open',
+            )
+        except Exception as exc:
+            self.logger.error(f"Unable to resolve indices: {exc}")
+            raise ResultNotExpected(f'Unable to resolve indices: {exc}') from exc
+        return sorted(item['index'] for item in cat)
+
+    def get_mappings(self, indices: t.Sequence[str]) -> None:
+        """
+        Fetch the field mappings for all of ``indices`` in as few API calls as
+        possible, sending batches of index names which fit in the URL, and store
+        them with :py:meth:`cache_mapping`. Indices already fetched are skipped.
+        """
+        pending = [idx for idx in indices if idx not in self.mappings_data]
+        chunks = list(u.chunk_indices(pending, MAX_INDEX_CHARS))
+        with self.phase('mappings'):
+            u.concurrent_map(self.get_mapping_chunk, chunks, self.workers)
+
+    def get_mapping_chunk(self, chunk: t.List[str]) -> None:
+        """
+        Fetch and cache the field mappings for the indices in ``chunk``
+
+        If ``self.cache`` is set, mappings are read from it for any index whose
+        UUID and mapping version are unchanged, and only the rest are fetched.
+        """
+        versions: t.Dict[str, str] = {}
+        if self.cache is not None:
+            versions = self.mapping_versions(chunk)
+            pending = []
+            for idx in chunk:
+                cached = self.cache.get('mapping', self.cluster, idx, versions.get(idx))
+                if cached is None:
+                    pending.append(idx)
+                else:
+                    self.cache_mapping(idx, cached)
+            chunk = pending
+            if not chunk:
+                return
+        self.logger.debug(f'Fetching mappings for {len(chunk)} indices')
+        try:
+            response = self.call_api(
+                'get_mapping', self.client.indices.get_mapping, index=','.join(chunk)
+            )
+        except Exception as exc:
+            self.logger.error(f"Unable to get mappings: {exc}")
+            raise ResultNotExpected(f'Unable to get mappings: {exc}') from exc
+        for idx in chunk:
+            if idx not in response:
+                raise ResultNotExpected(f'No mapping returned for index {idx}')
+            properties = dict(response[idx]['mappings'].get('properties', {}))
+            self.cache_mapping(idx, properties)
+            if self.cache is not None:
+                self.cache.set(
+                    'mapping', self.cluster, idx, properties, versions.get(idx)
+                )
+
+    def mapping_versions(self, indices: t.Sequence[str]) -> t.Dict[str, str]:
+        """
+        Return a string of the UUID and mapping version of each of ``indices``
+        from the cluster metadata, which changes whenever the index is recreated
+        or its mapping is updated. If the metadata cannot be read, return an
+        empty dictionary, so cached responses are only checked against their TTL.
+        """
+        try:
+            state = self.call_api(
+                'cluster.state',
+                self.client.cluster.state,
+                metric='metadata',
+                index=','.join(indices),
+                filter_path=MAPPING_VERSION_FILTER_PATH,
+            )
+        except Exception as exc:
+            self.logger.warning(f'Unable to get index mapping versions: {exc}')
+            return {}
+        versions = {}
+        for idx, meta in state.get('metadata', {}).get('indices', {}).items():
+            uuid = meta.get('settings', {}).get('index', {}).get('uuid')
+            versions[idx] = f"{uuid}:{meta.get('mapping_version')}"
+        return versions
+
+    def cache_mapping(self, idx: str, properties: t.Dict[str, t.Any]) -> None:
+        """
+        Store the field mappings ``properties`` for ``idx`` under their content
+        hash. Indices with identical mappings (e.g. from the same index template)
+        share one mapping and one flattened list of leaf fields.
+        """
+        key = u.mapping_hash(properties)
+        if key not in self.mapping_cache:
+            self.mapping_cache[key] = properties
+            self.leaf_cache[key] = tuple(u.flatten_mapping(properties))
+        self.mappings_data[idx] = key
 
     def get_field_mappings(self, idx: str) -> t.Dict[str, t.Any]:
         """
         Return only the field mappings for index ``idx`` (not the entire index
         mapping)
         """
-        return dict(
-            self.client.indices.get_mapping(index=idx)[idx]['mappings']['properties']
-        )
+        if idx not in self.mappings_data:
+            self.get_mappings([idx])
+        return self.mapping_cache[self.mappings_data[idx]]
 
-    def populate_values(
-        self, idx: str, data: t.Dict[t.Any, t.Any]
-    ) -> t.Dict[t.Any, t.Any]:
-        """Now add the field usage values for idx to data and return the result"""
-        for field in list(self.usage_stats[idx].keys()):
-            if '.' in field:
-                path = tuple(field.split('.'))
-            else:
-                path = field
-            data[path] = self.usage_stats[idx][field]
+    def get_leaf_fields(self, idx: str) -> t.Tuple[str, ...]:
+        """Return the dotted names of all leaf fields in the mapping for ``idx``"""
+        if idx not in self.mappings_data:
+            self.get_mappings([idx])
+        return self.leaf_cache[self.mappings_data[idx]]
+
+    def populate_values(self, idx: str, data: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+        """
+        Now add the field usage values for idx to data and return the result.
+        Both are keyed by dotted field name, so this is a straight overlay.
+        """
+        data.update(self.usage_stats[idx])
         return data
 
-    def get_resultset(self, idx: str) -> t.Dict[t.Any, t.Any]:
+    def get_resultset(self, idx: str) -> t.Dict[str, t.Any]:
         """Populate a result set with the fields in the index mapping"""
         result = {}
         if idx in self.usage_stats:
-            allfields = u.convert_mapping(self.get_field_mappings(idx))
+            allfields = dict.fromkeys(self.get_leaf_fields(idx), 0)
             result = self.populate_values(idx, allfields)
         return result
 
     def merge_results(self, idx: str) -> t.Dict[str, t.Any]:
-        """Merge field usage data with index mapping"""
-        retval = {}
-        data = self.get_resultset(idx)
-        for path in u.iterate_paths(data):
-            value = u.get_value_from_path(data, path)
-            key = '.'.join(u.detuple(path))
-            retval[key] = value
-        return retval
+        """
+        Merge field usage data with index mapping
+
+        Every leaf field in the mapping starts at 0, and the usage counts are laid
+        over the top. Fields only present in the usage data (e.g. multi-fields)
+        are added after the mapped fields.
+        """
+        return self.get_resultset(idx)
 
     def verify_single_index(self, index: t.Optional[str] = None) -> str:
         """
@@ -101,35 +428,35 @@ class FieldUsage:
         return index
 
     @property
-    def per_index_report(self) -> t.Dict[str, t.Any]:
-        """Generate summary report data"""
-        if not self.per_index_report_data:
+    def per_index_report(self) -> SplitView:
+        """
+        Generate summary report data. The accessed and unaccessed fields for each
+        index are split out when that index is accessed.
+        """
+        if self.per_index_report_data is None:
             self.report_data['indices'] = self.indices
             self.report_data['field_count'] = len(self.results.keys())
-            for idx in list(self.results_by_index.keys()):
-                self.per_index_report_data[idx] = {}
-                self.per_index_report_data[idx]['accessed'] = {}
-                self.per_index_report_data[idx]['unaccessed'] = {}
-                for key, value in self.results_by_index[idx].items():
-                    if value == 0:
-                        self.per_index_report_data[idx]['unaccessed'][key] = value
-                    else:
-                        self.per_index_report_data[idx]['accessed'][key] = value
+            self.per_index_report_data = SplitView(
+                self.results_by_index, self.access_stats
+            )
         return self.per_index_report_data
 
     @property
     def report(self) -> t.Dict[str, t.Any]:
         """Generate summary report data"""
-        if not self.report_data:
+        # per_index_report may have already set indices and field_count
+        if 'accessed' not in self.report_data:
             self.report_data['indices'] = self.indices
             self.report_data['field_count'] = len(self.results.keys())
-            self.report_data['accessed'] = {}
-            self.report_data['unaccessed'] = {}
-            for key, value in self.results.items():
-                if value == 0:
-                    self.report_data['unaccessed'][key] = value
-                else:
-                    self.report_data['accessed'][key] = value
+            results = self.results
+            with self.phase('report'):
+                accessed, unaccessed = results.split()
+            self.report_data['accessed'] = accessed
+            self.report_data['unaccessed'] = unaccessed
+            if self.access_stats is not None:
+                self.report_data['access'] = self.access_results
+            if self.keep_shards:
+                self.report_data['breakdown'] = self.breakdown
         return self.report_data
 
     def result(self, idx: t.Optional[str] = None) -> t.Dict[str, t.Any]:
@@ -137,31 +464,72 @@ class FieldUsage:
         idx = self.verify_single_index(index=idx)
         return u.sort_by_value(self.merge_results(idx))
 
+    def result_row(self, idx: str) -> t.Tuple[array, array]:
+        """Return ``self.result(idx)`` as arrays of field ids and counts"""
+        return to_arrays(self.fields, self.result(idx=idx).items())
+
     @property
-    def results_by_index(self) -> t.Dict[str, t.Dict[str, t.Any]]:
+    def results_by_index(self) -> t.Union[UsageStore, LazyStore]:
         """
         Return all results as a dictionary, with the index name as the root key,
-        and all stats for that index as the value, which is a dictionary generated
-        by ``self.result()``.
+        and all stats for that index as the value, which is a view of the data
+        generated by ``self.result()``.
+
+        If ``self.lru_size`` is set, the result for each index is only computed
+        when it is accessed, and at most ``self.lru_size`` are kept in memory.
         """
         if not self.per_index_data:
             if not isinstance(self.indices, list):
                 idx_list = [self.indices]
             else:
                 idx_list = self.indices
-            for idx in idx_list:
-                self.per_index_data[idx] = self.result(idx=idx)
+            # Fetch all of the mappings up front in batches rather than making
+            # one API call per index
+            self.get_mappings(idx_list)
+            if self.lru_size:
+                self.per_index_data = LazyStore(
+                    self.fields, idx_list, self.result_row, self.lru_size
+                )
+                return self.per_index_data
+            with self.phase('merge'):
+                rows = u.concurrent_map(self.result_row, idx_list, self.workers)
+                for idx, (ids, counts) in zip(idx_list, rows):
+                    self.per_index_data.set_row(idx, ids, counts)
         return self.per_index_data
 
     @property
-    def results(self) -> t.Dict[str, t.Any]:
+    def results(self) -> CountsView:
         """Return results for all indices found with values summed per mapping leaf"""
-        # The summing re-orders things so it needs to be re-sorted
-        if not self.results_data:
-            _ = u.sort_by_value(u.sum_dict_values(self.results_by_index))
-            self.results_data = dict(_)
+        if self.results_data is None:
+            results_by_index = self.results_by_index
+            with self.phase('aggregate'):
+                self.results_data = results_by_index.totals()
         return self.results_data
 
+    @property
+    def access_results(self) -> t.Optional[CountersView]:
+        """
+        Return the counters for each access type in ``ACCESS_TYPES``, summed per
+        field across all indices found, or None if they were not collected
+        """
+        if self.access_stats is None:
+            return None
+        if self.access_results_data is None:
+            with self.phase('aggregate'):
+                self.access_results_data = self.access_stats.totals()
+        return self.access_results_data
+
+    @property
+    def breakdown(self) -> t.Dict[str, t.Any]:
+        """
+        Return the field reads per node and per shard copy of each index, with
+        their skew, from ``self.shard_usage``. This is only populated if
+        ``self.keep_shards`` is True.
+        """
+        if self.breakdown_data is None:
+            self.breakdown_data = breakdown(self.shard_usage)
+        return self.breakdown_data
+
     @property
     def indices(self) -> t.Union[str, t.List[str]]:
         """Return all indices found"""
@@ -171,24 +539,83 @@ class FieldUsage:
             return self.indices_data[0]
         return self.indices_data
 
+    def shard_fields(self, shard: t.Dict[str, t.Any]) -> t.Dict[str, int]:
+        """
+        Return the ``any`` counter for each field in ``shard``. Shards without
+        any field stats return nothing, as the API response may be filtered down
+        to nothing for them.
+        """
+        result: t.Dict[str, int] = {}
+        fields = shard.get('stats', {}).get('fields', {})
+        for field, stats in fields.items():
+            if field in ('_id', '_source'):
+                # We don't care about these because these can be used by
+                # runtime queries
+                continue
+            result[field] = stats.get('any', 0)
+        return result
+
+    def shard_index_stats(
+        self, field_usage: t.Dict[str, t.Any], idx: str
+    ) -> t.Dict[str, t.Dict[str, t.Any]]:
+        """
+        Return the field counts for each shard copy in ``idx`` by tracking_id,
+        with the node it is on and whether it is the primary
+        """
+        result = {}
+        for num, shard in enumerate(field_usage[idx].get('shards', [])):
+            routing = shard.get('routing', {})
+            result[shard.get('tracking_id', str(num))] = {
+                'fields': self.shard_fields(shard),
+                'node': routing.get('node'),
+                'primary': routing.get('primary'),
+            }
+        return result
+
     def sum_index_stats(
         self, field_usage: t.Dict[str, t.Any], idx: str
     ) -> t.Dict[str, int]:
-        """Per field, sum all of the usage stats for all shards in ``idx``"""
+        """
+        Per field, sum all of the usage stats for all shards in ``idx``
 
-        def appender(result, field, value):
-            if field not in result:
-                result[field] = value
-            else:
-                result[field] += value
-            return result
+        Only the ``any`` counter is read.
+        """
+        result: t.Dict[str, int] = {}
+        for shard in field_usage[idx].get('shards', []):
+            for field, count in self.shard_fields(shard).items():
+                result[field] = result.get(field, 0) + count
+        return result
 
-        result = {}
-        for shard in field_usage[idx]['shards']:
-            for field in list(shard['stats']['fields'].keys()):
-                if field in ['_id', '_source']:
-                    # We don't care about these because these can be used by
-                    # runtime queries
-                    continue
-                result = appender(result, field, shard['stats']['fields'][field]['any'])
+    def shard_access(self, shard: t.Dict[str, t.Any]) -> t.Dict[str, t.List[int]]:
+        """
+        Return every counter in ``ACCESS_TYPES`` for each field in ``shard``.
+        Counters missing from the response count as 0.
+        """
+        result: t.Dict[str, t.List[int]] = {}
+        fields = shard.get('stats', {}).get('fields', {})
+        for field, stats in fields.items():
+            if field in ('_id', '_source'):
+                continue
+            values = []
+            for path in ACCESS_PATHS:
+                value = stats
+                for key in path:
+                    value = value.get(key, 0) if isinstance(value, dict) else 0
+                values.append(value if isinstance(value, int) else 0)
+            result[field] = values
+        return result
+
+    def sum_access_stats(
+        self, field_usage: t.Dict[str, t.Any], idx: str
+    ) -> t.Dict[str, t.List[int]]:
+        """
+        Per field, sum each counter in ``ACCESS_TYPES`` for all shards in ``idx``
+        """
+        result: t.Dict[str, t.List[int]] = {}
+        for shard in field_usage[idx].get('shards', []):
+            for field, values in self.shard_access(shard).items():
+                if field in result:
+                    result[field] = [a + b for a, b in zip(result[field], values)]
+                else:
+                    result[field] = values
         return result
@@ -0,0 +1,158 @@
+"""
+Benchmark FieldUsage against a synthetic cluster
+
+$ python -m tests.benchmarks.run [OPTIONS]
+
+Every phase is run ``--repeat`` times against freshly generated state, and the
+fastest, mean and slowest wall clock times are written as JSON to ``--output``,
+along with the versions and dataset parameters, so results from different
+releases can be compared.
+"""
+
+import typing as t
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+import click
+from es_fieldusage.commands import write_file
+from es_fieldusage.helpers import store
+from es_fieldusage.main import FieldUsage
+from es_fieldusage.version import __version__
+from tests.benchmarks.synthetic import SyntheticClient, make_cluster
+
+
+def measure(
+    func: t.Callable[[t.Any], t.Any],
+    setup: t.Callable[[], t.Any],
+    repeat: int,
+) -> t.Dict[str, float]:
+    """
+    Time ``func`` ``repeat`` times, each time passing it the result of an untimed
+    call to ``setup``, and return the fastest, mean and slowest times in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        func(state)
+        times.append(time.perf_counter() - start)
+    return {
+        'min': min(times),
+        'mean': statistics.mean(times),
+        'max': max(times),
+        'repeat': repeat,
+    }
+
+
+def write_all(field_usage: FieldUsage, path: str, suffix: str) -> None:
+    """Write the accessed and unaccessed fields of every index, as the file command does"""
+    data = field_usage.per_index_report
+    for idx in data:
+        write_file(
+            os.path.join(path, f'es_fieldusage-{idx}.{suffix}'),
+            data[idx],
+            ['accessed', 'unaccessed'],
+            True,
+            ':',
+            suffix == 'json',
+        )
+
+
+def run_benchmarks(
+    params: t.Dict[str, t.Any], repeat: int = 3, workers: int = 1
+) -> t.Dict[str, t.Any]:
+    """
+    Generate a synthetic cluster from ``params`` (see
+    :py:func:`~.tests.benchmarks.synthetic.make_cluster`) and return the timings
+    of each phase of building a report from it
+    """
+    usage, mappings = make_cluster(**params)
+    indices = [idx for idx in usage if idx != '_shards']
+
+    def new() -> FieldUsage:
+        return FieldUsage(
+            {}, '*', workers=workers, client=SyntheticClient(usage, mappings)
+        )
+
+    def with_mappings() -> FieldUsage:
+        field_usage = new()
+        field_usage.get_mappings(indices)
+        return field_usage
+
+    def with_results() -> FieldUsage:
+        field_usage = new()
+        _ = field_usage.results
+        return field_usage
+
+    def sum_all(field_usage: FieldUsage) -> None:
+        for idx in indices:
+            field_usage.sum_index_stats(usage, idx)
+
+    def merge_all(field_usage: FieldUsage) -> None:
+        for idx in indices:
+            field_usage.merge_results(idx)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as path:
+        phases = {
+            'get': (lambda _: new(), lambda: None),
+            'sum_index_stats': (sum_all, with_mappings),
+            'merge_results': (merge_all, with_mappings),
+            'results': (lambda field_usage: field_usage.results, new),
+            'report': (lambda field_usage: field_usage.report, with_results),
+            'file': (lambda field_usage: write_all(field_usage, path, 'txt'), new),
+            'file_json': (
+                lambda field_usage: write_all(field_usage, path, 'json'),
+                new,
+            ),
+        }
+        for name, (func, setup) in phases.items():
+            results[name] = measure(func, setup, repeat)
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'es_fieldusage': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': store.np is not None,
+        'workers': workers,
+        'params': params,
+        'results': results,
+    }
+
+
+@click.command()
+@click.option('--indices', type=int, default=100, help='Number of indices')
+@click.option('--shards', type=int, default=1, help='Primary shards per index')
+@click.option('--replicas', type=int, default=1, help='Replicas per shard')
+@click.option('--fields', type=int, default=500, help='Leaf fields per index')
+@click.option('--depth', type=int, default=2, help='Object nesting depth')
+@click.option(
+    '--multi-fields', type=float, default=0.2, help='Fraction with a multi-field'
+)
+@click.option('--accessed', type=float, default=0.5, help='Fraction of fields used')
+@click.option('--templates', type=int, default=5, help='Number of distinct mappings')
+@click.option('--seed', type=int, default=0, help='Random seed')
+@click.option('--repeat', type=int, default=3, help='Times to run each phase')
+@click.option('--workers', type=int, default=1, help='FieldUsage worker threads')
+@click.option(
+    '--output',
+    type=click.Path(dir_okay=False),
+    default='benchmark-results.json',
+    help='File to write the results to',
+)
+def main(repeat: int, workers: int, output: str, **params: t.Any) -> None:
+    """Benchmark FieldUsage against a synthetic cluster"""
+    data = run_benchmarks(params, repeat=repeat, workers=workers)
+    for name, timing in data['results'].items():
+        click.echo(f'{name:>16}: {timing["min"]:.4f}s (mean {timing["mean"]:.4f}s)')
+    with open(output, 'w', encoding='utf-8') as fdesc:
+        json.dump(data, fdesc, indent=2)
+    click.echo(f'Results written to {output}')
+
+
+if __name__ == '__main__':
+    main()  # pylint: disable=E1120
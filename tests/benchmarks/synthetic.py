@@ -0,0 +1,150 @@
+"""Synthetic field_usage_stats and get_mapping payloads for benchmarking"""
+
+import typing as t
+import random
+from es_fieldusage.helpers.offline import OfflineCat, OfflineCluster, OfflineIndices
+
+FANOUT = 4
+INVERTED_INDEX = (
+    'terms',
+    'postings',
+    'proximity',
+    'positions',
+    'term_frequencies',
+    'offsets',
+    'payloads',
+)
+COUNTERS = ('stored_fields', 'doc_values', 'points', 'norms', 'term_vectors')
+
+
+def leaf_path(num: int, depth: int) -> t.List[str]:
+    """
+    Return the path of object names and the leaf name for field number ``num``,
+    nested ``depth`` objects deep. Consecutive fields share parent objects.
+    """
+    parents = [
+        f'obj{(num // FANOUT ** (level + 1)) % FANOUT}' for level in range(depth)
+    ]
+    return list(reversed(parents)) + [f'field{num}']
+
+
+def make_properties(
+    fields: int, depth: int, multi_fields: float, seed: int = 0
+) -> t.Tuple[t.Dict[str, t.Any], t.List[str]]:
+    """
+    Return the mapping properties for ``fields`` leaf fields nested ``depth``
+    objects deep, and the dotted names of every field which can show up in the
+    field usage API. A ``multi_fields`` fraction of the leaves are text fields
+    with a ``keyword`` multi-field.
+    """
+    rng = random.Random(seed)
+    properties: t.Dict[str, t.Any] = {}
+    names: t.List[str] = []
+    for num in range(fields):
+        path = leaf_path(num, depth)
+        node = properties
+        for name in path[:-1]:
+            node = node.setdefault(name, {'properties': {}})['properties']
+        dotted = '.'.join(path)
+        if rng.random() < multi_fields:
+            node[path[-1]] = {
+                'type': 'text',
+                'fields': {'keyword': {'type': 'keyword', 'ignore_above': 256}},
+            }
+            names.extend([dotted, f'{dotted}.keyword'])
+        else:
+            node[path[-1]] = {'type': 'keyword'}
+            names.append(dotted)
+    return properties, names
+
+
+def field_stats(count: int, searched: bool = True, aggregated: bool = False):
+    """
+    Return the usage stats of one field, as returned by the API, for ``count``
+    accesses by search and/or aggregations
+    """
+    stats = {
+        'any': count,
+        'inverted_index': {key: count if searched else 0 for key in INVERTED_INDEX},
+        **{key: 0 for key in COUNTERS},
+        'knn_vectors': 0,
+    }
+    if aggregated:
+        stats['doc_values'] = count
+    return stats
+
+
+def make_shard(
+    names: t.Sequence[str], accessed: float, rng: random.Random, copy: str
+) -> t.Dict[str, t.Any]:
+    """Return the usage of one shard copy, where ``accessed`` of ``names`` are used"""
+    fields = {'_id': field_stats(rng.randint(1, 1000))}
+    for name in names:
+        if rng.random() < accessed:
+            # Fields are searched, aggregated, or both
+            kind = rng.randint(0, 2)
+            fields[name] = field_stats(rng.randint(1, 100000), kind != 1, kind != 0)
+    return {
+        'tracking_id': copy,
+        'tracking_started_at_millis': 1700000000000,
+        'routing': {
+            'state': 'STARTED',
+            'primary': copy.endswith('-p'),
+            'node': f'node{rng.randint(0, 9)}',
+            'relocating_node': None,
+        },
+        'stats': {'all_fields': field_stats(0), 'fields': fields},
+    }
+
+
+def make_cluster(
+    indices: int = 10,
+    shards: int = 1,
+    replicas: int = 1,
+    fields: int = 100,
+    depth: int = 1,
+    multi_fields: float = 0.2,
+    accessed: float = 0.5,
+    templates: int = 1,
+    seed: int = 0,
+) -> t.Tuple[t.Dict[str, t.Any], t.Dict[str, t.Any]]:
+    """
+    Return a field_usage_stats response and a get_mapping response for
+    ``indices`` indices of ``shards`` primary shards with ``replicas`` replicas
+    each. Every index has ``fields`` leaf fields, from one of ``templates``
+    distinct mappings, and each shard copy has used about an ``accessed``
+    fraction of them. The same arguments always produce the same payloads.
+    """
+    rng = random.Random(seed)
+    mappings = [
+        make_properties(fields, depth, multi_fields, seed=seed + num)
+        for num in range(templates)
+    ]
+    usage: t.Dict[str, t.Any] = {
+        '_shards': {'total': indices * shards, 'successful': indices * shards}
+    }
+    get_mapping: t.Dict[str, t.Any] = {}
+    for num in range(indices):
+        idx = f'index-{num:05d}'
+        properties, names = mappings[num % templates]
+        get_mapping[idx] = {'mappings': {'properties': properties}}
+        usage[idx] = {
+            'shards': [
+                make_shard(names, accessed, rng, f'{idx}-{shard}-{copy}')
+                for shard in range(shards)
+                for copy in ['p'] + [f'r{rep}' for rep in range(replicas)]
+            ]
+        }
+    return usage, get_mapping
+
+
+class SyntheticClient:
+    """
+    Mock Elasticsearch client serving synthetic payloads to
+    :py:class:`~.es_fieldusage.main.FieldUsage`
+    """
+
+    def __init__(self, usage: t.Dict[str, t.Any], mappings: t.Dict[str, t.Any]):
+        self.indices = OfflineIndices(usage, mappings)
+        self.cat = OfflineCat(usage)
+        self.cluster = OfflineCluster()
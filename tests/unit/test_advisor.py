@@ -0,0 +1,151 @@
+"""Unit tests for the advisor module."""
+
+# pylint: disable=C0116
+import json
+from unittest.mock import patch
+from click.testing import CliRunner
+from es_fieldusage.commands import advise
+from es_fieldusage.defaults import ACCESS_TYPES
+from es_fieldusage.helpers.advisor import (
+    advise as advise_mappings,
+    advise_field,
+    advise_mapping,
+    field_sizes,
+)
+from es_fieldusage.main import FieldUsage
+
+
+def counters(**values):
+    return tuple(values.get(name.replace('.', '__'), 0) for name in ACCESS_TYPES)
+
+
+def test_advise_field_keyword():
+    params = {'type': 'keyword'}
+    searched = counters(any=2, inverted_index__terms=2)
+    assert advise_field('f', params, searched)['change'] == {'doc_values': False}
+    aggregated = counters(any=2, doc_values=2)
+    assert advise_field('f', params, aggregated)['change'] == {'index': False}
+    both = counters(any=2, inverted_index__terms=1, doc_values=1)
+    assert not advise_field('f', params, both)['change']
+    # Already disabled parameters are not recommended again
+    params = {'type': 'keyword', 'doc_values': False}
+    assert not advise_field('f', params, searched)['change']
+
+
+def test_advise_field_numeric_points():
+    assert not advise_field(
+        'f', {'type': 'long'}, counters(any=1, points=1, doc_values=1)
+    )['change']
+
+
+def test_advise_field_text():
+    params = {'type': 'text'}
+    assert advise_field('f', params, counters())['change'] == {'index': False}
+    phrase = counters(any=1, inverted_index__positions=1, norms=1)
+    assert not advise_field('f', params, phrase)['change']
+    match = counters(any=1, inverted_index__terms=1)
+    assert advise_field('f', params, match)['change'] == {
+        'norms': False,
+        'index_options': 'freqs',
+    }
+
+
+def test_advise_mapping():
+    properties = {
+        'unused': {'properties': {'a': {'type': 'keyword'}, 'b': {'type': 'long'}}},
+        'message': {
+            'type': 'text',
+            'norms': False,
+            'index_options': 'freqs',
+            'fields': {'keyword': {'type': 'keyword'}},
+        },
+    }
+    usage = {'message': counters(any=1, inverted_index__terms=1)}
+    sizes = {
+        'unused.a': {'total': 10},
+        'unused.b': {'total': 20},
+        'message.keyword': {'total': 5},
+    }
+    result = advise_mapping(properties, usage, sizes)
+    assert result == [
+        {
+            'field': 'unused',
+            'action': 'update',
+            'change': {'enabled': False},
+            'reasons': ['no field in this object is ever accessed'],
+            'savings': 30,
+        },
+        {
+            'field': 'message.keyword',
+            'action': 'remove',
+            'change': {},
+            'reasons': ['multi-field never accessed'],
+            'savings': 5,
+        },
+    ]
+    assert advise_mapping(properties, usage)[0]['savings'] is None
+
+
+def test_field_sizes():
+    response = {
+        'fields': {
+            'f': {
+                'total_in_bytes': 10,
+                'inverted_index': {'total_in_bytes': 4},
+                'doc_values_in_bytes': 6,
+            }
+        }
+    }
+    assert field_sizes(response)['f'] == {
+        'total': 10,
+        'inverted_index': 4,
+        'points': 0,
+        'doc_values': 6,
+        'norms': 0,
+        'term_vectors': 0,
+    }
+
+
+def test_advise_disk_usage(mock_client):
+    mock_client.indices.field_usage_stats.return_value = {
+        'index1': {'shards': [{'stats': {'fields': {'field1': {'any': 1}}}}]},
+    }
+    mock_client.indices.get_mapping.return_value = {
+        'index1': {'mappings': {'properties': {'field1': {'type': 'keyword'}}}}
+    }
+    mock_client.indices.disk_usage.return_value = {
+        'index1': {
+            'store_size_in_bytes': 100,
+            'fields': {
+                'field1': {
+                    'total_in_bytes': 30,
+                    'inverted_index': {'total_in_bytes': 10},
+                    'doc_values_in_bytes': 20,
+                }
+            },
+        }
+    }
+    field_usage = FieldUsage({}, '*', client=mock_client, access_types=True)
+    groups = advise_mappings(field_usage, disk_usage=True)
+    assert groups[0]['indices'] == ['index1']
+    assert groups[0]['recommendations'][0]['change'] == {
+        'index': False,
+        'doc_values': False,
+    }
+    assert groups[0]['savings'] == 30
+    assert groups[0]['store_size'] == 100
+    assert mock_client.indices.disk_usage.call_args.kwargs['run_expensive_tasks']
+
+
+def test_advise_command(mock_client):
+    mock_client.indices.get_mapping.return_value = {
+        'index1': {'mappings': {'properties': {'field1': {'type': 'keyword'}}}}
+    }
+    with patch('es_fieldusage.main.get_client', return_value=mock_client):
+        result = CliRunner().invoke(
+            advise, ['--as-json', 'index1'], obj={'configdict': {}}
+        )
+    assert result.exit_code == 0
+    groups = json.loads(result.output[result.output.index('[') :])
+    assert groups[0]['recommendations'][0]['field'] == 'field1'
+    assert groups[0]['savings'] is None
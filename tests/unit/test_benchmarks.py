@@ -0,0 +1,50 @@
+"""Unit tests for the synthetic benchmark fixtures and runner"""
+
+# pylint: disable=C0116
+from es_fieldusage.main import FieldUsage
+from tests.benchmarks.run import run_benchmarks
+from tests.benchmarks.synthetic import SyntheticClient, make_cluster, make_properties
+
+
+def test_make_properties():
+    properties, names = make_properties(8, 2, 0.0)
+    assert properties['obj0']['properties']['obj1']['properties']['field4'] == {
+        'type': 'keyword'
+    }
+    assert names[4] == 'obj0.obj1.field4'
+    _, names = make_properties(8, 0, 1.0)
+    assert names[:2] == ['field0', 'field0.keyword']
+
+
+def test_make_cluster_is_reproducible():
+    assert make_cluster(indices=3, seed=1) == make_cluster(indices=3, seed=1)
+    assert make_cluster(indices=3, seed=1) != make_cluster(indices=3, seed=2)
+
+
+def test_synthetic_client():
+    usage, mappings = make_cluster(
+        indices=3, shards=2, replicas=1, fields=20, multi_fields=0, accessed=1
+    )
+    assert len(usage['index-00000']['shards']) == 4
+    field_usage = FieldUsage({}, '*', client=SyntheticClient(usage, mappings))
+    assert field_usage.indices == ['index-00000', 'index-00001', 'index-00002']
+    assert field_usage.report['field_count'] == 20
+    assert not field_usage.report['unaccessed']
+
+
+def test_run_benchmarks():
+    params = {'indices': 2, 'fields': 10}
+    data = run_benchmarks(params, repeat=2)
+    assert data['params'] == params
+    assert set(data['results']) == {
+        'get',
+        'sum_index_stats',
+        'merge_results',
+        'results',
+        'report',
+        'file',
+        'file_json',
+    }
+    timing = data['results']['get']
+    assert timing['min'] <= timing['mean'] <= timing['max']
+    assert timing['repeat'] == 2
@@ -0,0 +1,43 @@
+"""Unit tests for the breakdown module."""
+
+# pylint: disable=C0116
+from es_fieldusage.helpers.breakdown import breakdown, breakdown_lines, skew
+
+SHARD_USAGE = {
+    'index1': {
+        'a': {'fields': {'f1': 6, 'f2': 2}, 'node': 'n1', 'primary': True},
+        'b': {'fields': {'f1': 0, 'f2': 0}, 'node': 'n2', 'primary': False},
+    },
+    'index2': {
+        'c': {'fields': {'f1': 3}, 'node': 'n2', 'primary': True},
+        'd': {'fields': {'f1': 3}, 'node': None, 'primary': False},
+    },
+}
+
+
+def test_skew():
+    assert skew([5, 5, 5, 5]) == 1.0
+    assert skew([8, 0, 0, 0]) == 4.0
+    assert skew([0, 0]) == 0.0
+
+
+def test_breakdown():
+    data = breakdown(SHARD_USAGE)
+    assert data['nodes'] == {'n1': 8, 'n2': 3, 'unknown': 3}
+    assert list(data['indices']) == ['index1', 'index2']
+    assert data['indices']['index1']['skew'] == 2.0
+    assert data['indices']['index1']['reads'] == 8
+    assert data['indices']['index1']['copies'][0] == {
+        'tracking_id': 'a',
+        'node': 'n1',
+        'primary': True,
+        'reads': 8,
+    }
+    assert data['indices']['index2']['skew'] == 1.0
+
+
+def test_breakdown_lines():
+    lines = list(breakdown_lines(breakdown(SHARD_USAGE), ','))
+    assert lines[0] == 'index,tracking_id,node,primary,reads,index_skew\n'
+    assert lines[1] == 'index1,a,n1,True,8,2.00\n'
+    assert len(lines) == 5
@@ -0,0 +1,62 @@
+"""Unit tests for the bulk module."""
+
+# pylint: disable=C0116,W0613
+import threading
+from unittest.mock import MagicMock, patch
+import pytest
+from es_fieldusage.helpers.bulk import LockedIterator, bulk_index, field_documents
+from es_fieldusage.helpers.store import AccessStore
+
+
+def test_locked_iterator():
+    assert list(LockedIterator(range(3))) == [0, 1, 2]
+
+
+def test_field_documents():
+    data = {
+        'index1': {'accessed': {'field1': 1}, 'unaccessed': {'field2': 0}},
+        'index2': {'accessed': {}, 'unaccessed': {'field3': 0}},
+    }
+    docs = list(field_documents(data, ['unaccessed'], 'target', 'now'))
+    assert docs == [
+        {
+            '_index': 'target',
+            '@timestamp': 'now',
+            'index': 'index1',
+            'field': {'name': 'field2', 'count': 0},
+        },
+        {
+            '_index': 'target',
+            '@timestamp': 'now',
+            'index': 'index2',
+            'field': {'name': 'field3', 'count': 0},
+        },
+    ]
+
+
+def test_field_documents_access():
+    access = AccessStore(14)
+    access['index1'] = {'field1': [1, 1] + [0] * 12}
+    data = {'index1': {'accessed': {'field1': 1}, 'access': access['index1']}}
+    doc = next(field_documents(data, ['accessed'], 'target', 'now'))
+    assert doc['field']['access']['any'] == 1
+    assert doc['field']['access']['inverted_index']['terms'] == 1
+    assert doc['field']['access']['doc_values'] == 0
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_bulk_index(workers):
+    seen = []
+    lock = threading.Lock()
+
+    def fake_streaming_bulk(client, actions, **kwargs):
+        assert kwargs['max_retries'] == 5
+        for action in actions:
+            with lock:
+                seen.append(action)
+            yield action % 10 != 0, {'index': {'status': 201}}
+
+    with patch('es_fieldusage.helpers.bulk.streaming_bulk', fake_streaming_bulk):
+        summary = bulk_index(MagicMock(), range(100), workers=workers, max_retries=5)
+    assert sorted(seen) == list(range(100))
+    assert summary == {'success': 90, 'failed': 10}
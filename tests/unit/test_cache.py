@@ -0,0 +1,32 @@
+"""Unit tests for the cache module."""
+
+# pylint: disable=C0116
+from unittest.mock import patch
+from es_fieldusage.helpers.cache import DiskCache
+
+
+def test_disk_cache(tmp_path):
+    cache = DiskCache(str(tmp_path), {'usage': 60})
+    assert cache.get('usage', 'c1', 'index*') is None
+    cache.set('usage', 'c1', 'index*', {'index1': {}})
+    assert cache.get('usage', 'c1', 'index*') == {'index1': {}}
+    assert cache.get('usage', 'c1', 'other*') is None
+    # The same key on another cluster is a different entry
+    assert cache.get('usage', 'c2', 'index*') is None
+
+
+def test_disk_cache_expired(tmp_path):
+    cache = DiskCache(str(tmp_path), {'usage': 60})
+    cache.set('usage', 'c1', 'index*', {'index1': {}})
+    with patch('es_fieldusage.helpers.cache.time.time', return_value=1e12):
+        assert cache.get('usage', 'c1', 'index*') is None
+    # A kind without a TTL is never used
+    cache.set('mapping', 'c1', 'index1', {})
+    assert cache.get('mapping', 'c1', 'index1') is None
+
+
+def test_disk_cache_validator(tmp_path):
+    cache = DiskCache(str(tmp_path), {'mapping': 60})
+    cache.set('mapping', 'c1', 'index1', {'field1': {}}, 'uuid:1')
+    assert cache.get('mapping', 'c1', 'index1', 'uuid:1') == {'field1': {}}
+    assert cache.get('mapping', 'c1', 'index1', 'uuid:2') is None
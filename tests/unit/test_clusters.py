@@ -0,0 +1,98 @@
+"""Unit tests for helpers/clusters.py"""
+
+# pylint: disable=C0116
+import json
+from unittest.mock import MagicMock, patch
+import pytest
+from click.testing import CliRunner
+from es_fieldusage.commands import clusters
+from es_fieldusage.exceptions import ConfigurationException
+from es_fieldusage.helpers.clusters import (
+    collect,
+    load_configs,
+    merge_reports,
+    parse_cluster,
+)
+
+
+def make_client(counts):
+    client = MagicMock()
+    client.indices.field_usage_stats.return_value = {
+        idx: {
+            "shards": [
+                {
+                    "stats": {
+                        "fields": {
+                            name: {"any": count} for name, count in fields.items()
+                        }
+                    }
+                }
+            ]
+        }
+        for idx, fields in counts.items()
+    }
+    client.indices.get_mapping.side_effect = lambda index, **_: {
+        idx: {"mappings": {"properties": {"a": {}, "b": {}, "c": {}}}}
+        for idx in index.split(',')
+    }
+    return client
+
+
+CLIENTS = {
+    'prod': make_client({'index1': {'a': 2}, 'index2': {'a': 1, 'b': 3}}),
+    'dr': make_client({'index1': {'a': 4}}),
+}
+
+
+def get_client(configdict):
+    if configdict['name'] == 'broken':
+        raise ConnectionError('unreachable')
+    return CLIENTS[configdict['name']]
+
+
+def test_parse_cluster():
+    assert parse_cluster('prod=/etc/prod.yml') == ('prod', '/etc/prod.yml')
+    assert parse_cluster('/etc/dr.yml') == ('dr', '/etc/dr.yml')
+    with pytest.raises(ConfigurationException):
+        parse_cluster('=/etc/prod.yml')
+
+
+def test_load_configs(tmp_path):
+    path = tmp_path / 'prod.yml'
+    path.write_text('elasticsearch:\n  client:\n    hosts: http://es:9200\n')
+    configs = load_configs([str(path), f'other={path}'])
+    assert list(configs) == ['prod', 'other']
+    assert configs['prod']['elasticsearch']['client']['hosts'] == 'http://es:9200'
+    with pytest.raises(ConfigurationException):
+        load_configs([str(path), str(path)])
+
+
+def test_collect_and_merge():
+    configs = {name: {'name': name} for name in ['prod', 'dr', 'broken']}
+    with patch('es_fieldusage.main.get_client', side_effect=get_client):
+        usages, errors = collect(configs, '*', 3)
+    assert list(usages) == ['prod', 'dr']
+    assert errors == {'broken': 'unreachable'}
+    merged = merge_reports({name: usage.report for name, usage in usages.items()})
+    assert merged['indices'] == ['prod:index1', 'prod:index2', 'dr:index1']
+    assert merged['field_count'] == 3
+    assert dict(merged['accessed']) == {'a': 7, 'b': 3}
+    assert dict(merged['unaccessed']) == {'c': 0}
+
+
+def test_clusters_command_json(tmp_path):
+    args = []
+    for name in ['prod', 'dr']:
+        path = tmp_path / f'{name}.yml'
+        path.write_text(f'name: {name}\n')
+        args.append(f'--cluster={path}')
+    with patch('es_fieldusage.main.get_client', side_effect=get_client):
+        result = CliRunner().invoke(
+            clusters, args + ['--as-json', '--access-types', '*']
+        )
+    assert result.exit_code == 0
+    data = json.loads(result.output)
+    assert data['clusters']['dr']['accessed'] == {'a': 4}
+    assert data['merged']['accessed'] == {'a': 7, 'b': 3}
+    assert data['merged']['access']['a']['any'] == 7
+    assert not data['errors']
@@ -0,0 +1,116 @@
+"""Unit tests for helpers/columnar.py"""
+
+# pylint: disable=C0116
+import gzip
+import json
+from unittest.mock import patch
+import pytest
+from click.testing import CliRunner
+from es_fieldusage.commands import file
+from es_fieldusage.exceptions import ConfigurationException, FatalException
+from es_fieldusage.helpers import columnar
+from es_fieldusage.helpers.columnar import (
+    chunked,
+    dataset_columns,
+    dataset_filename,
+    dataset_rows,
+    write_dataset,
+)
+from es_fieldusage.helpers.store import AccessStore
+
+ALL_DATA = {
+    'index1': {'accessed': {'a': 3}, 'unaccessed': {'b': 0}},
+    'index2': {'accessed': {'b': 1}, 'unaccessed': {}},
+}
+
+
+def test_dataset_rows():
+    assert list(dataset_rows(ALL_DATA, ['accessed', 'unaccessed'])) == [
+        ('index1', 'a', 3),
+        ('index1', 'b', 0),
+        ('index2', 'b', 1),
+    ]
+    assert list(dataset_rows(ALL_DATA, ['unaccessed'])) == [('index1', 'b', 0)]
+
+
+def test_dataset_rows_access():
+    width = 14
+    store = AccessStore(width)
+    store['index1'] = {'a': (3, 2) + (0,) * (width - 3) + (1,)}
+    data = {'index1': {'accessed': {'a': 3}, 'access': store['index1']}}
+    columns = dataset_columns(True)
+    assert columns[3:5] == ['inverted_index_terms', 'inverted_index_postings']
+    row = list(dataset_rows(data, ['accessed']))[0]
+    assert len(row) == len(columns)
+    assert row[:4] == ('index1', 'a', 3, 2)
+    assert row[-1] == 1
+
+
+def test_chunked():
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+
+def test_dataset_filename():
+    assert dataset_filename('usage', 'ndjson', 'gzip') == 'usage.ndjson.gz'
+    assert dataset_filename('usage', 'parquet', 'zstd') == 'usage.parquet'
+
+
+@pytest.mark.parametrize('compression', ['none', 'gzip'])
+def test_write_ndjson(tmp_path, compression):
+    filename = tmp_path / dataset_filename('usage', 'ndjson', compression)
+    rows = write_dataset(
+        str(filename),
+        ALL_DATA,
+        ['accessed', 'unaccessed'],
+        'ndjson',
+        compression=compression,
+        chunk_rows=2,
+        atomic=True,
+    )
+    assert rows == 3
+    opener = gzip.open if compression == 'gzip' else open
+    with opener(filename, 'rt', encoding='utf-8') as fdesc:
+        lines = [json.loads(line) for line in fdesc]
+    assert lines[2] == {'index': 'index2', 'field': 'b', 'count': 1}
+
+
+def test_write_dataset_invalid(tmp_path, monkeypatch):
+    with pytest.raises(ConfigurationException):
+        write_dataset(str(tmp_path / 'x'), ALL_DATA, ['accessed'], 'ndjson', 'zstd')
+    monkeypatch.setattr(columnar, 'pa', None)
+    with pytest.raises(ConfigurationException, match='requires pyarrow'):
+        write_dataset(str(tmp_path / 'x'), ALL_DATA, ['accessed'], 'parquet')
+
+
+def test_file_command_invalid(tmp_path, mock_client):
+    # Unsupported options are refused before the cluster is called
+    with patch('es_fieldusage.main.get_client', return_value=mock_client):
+        result = CliRunner().invoke(
+            file,
+            [
+                f'--filepath={tmp_path}',
+                '--output-format=ndjson',
+                '--compression=zstd',
+                'index1',
+            ],
+            obj={'configdict': {}},
+        )
+    assert isinstance(result.exception, FatalException)
+    assert not mock_client.indices.field_usage_stats.called
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+def test_write_columnar(tmp_path, fmt):
+    pyarrow = pytest.importorskip('pyarrow')
+    filename = str(tmp_path / f'usage.{fmt}')
+    write_dataset(
+        filename, ALL_DATA, ['accessed', 'unaccessed'], fmt, 'zstd', chunk_rows=2
+    )
+    if fmt == 'parquet':
+        parquet = pytest.importorskip('pyarrow.parquet')
+        table = parquet.read_table(filename)
+        assert parquet.ParquetFile(filename).num_row_groups == 2
+    else:
+        table = pyarrow.ipc.open_file(filename).read_all()
+    assert table.column_names == ['index', 'field', 'count']
+    assert table.column('count').to_pylist() == [3, 0, 1]
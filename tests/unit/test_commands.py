@@ -1,8 +1,14 @@
 """Unit tests for commands.py"""
 
 # pylint: disable=C0116
+import json
+import os
 from unittest.mock import patch
+from click.testing import CliRunner
+from es_fieldusage.helpers.store import AccessStore
 from es_fieldusage.commands import (
+    diff,
+    file,
     get_per_index,
     format_delimiter,
     header_msg,
@@ -10,6 +16,10 @@ from es_fieldusage.commands import (
     output_generator,
     printout,
     override_filepath,
+    stdout,
+    watch,
+    write_breakdown,
+    write_file,
     FILEPATH_OVERRIDE,
 )
 
@@ -101,6 +111,184 @@ def test_printout_show_counts_false(capsys):
     assert captured.out == 'field1\nfield2\n'
 
 
+def test_write_file_lines(tmp_path):
+    data = {'accessed': {'field1': 1}, 'unaccessed': {'field2': 0}}
+    filename = tmp_path / 'test.csv'
+    write_file(str(filename), data, ['accessed', 'unaccessed'], True, ':', False)
+    assert filename.read_text(encoding='utf-8') == 'field1: 1\nfield2: 0\n'
+
+
+def test_write_file_json(tmp_path):
+    data = {'accessed': {'field1': 1}, 'unaccessed': {'field2': 0}}
+    filename = tmp_path / 'test.json'
+    write_file(str(filename), data, ['unaccessed'], False, ',', True, atomic=True)
+    assert filename.read_text(encoding='utf-8') == '{\n  "field2": 0\n}\n'
+
+
+def test_write_file_access(tmp_path):
+    access = AccessStore(14)
+    access['index1'] = {'field1': list(range(1, 15))}
+    data = {
+        'accessed': {'field1': 1},
+        'unaccessed': {'field2': 0},
+        'access': access['index1'],
+    }
+    filename = tmp_path / 'test.csv'
+    write_file(str(filename), data, ['accessed', 'unaccessed'], True, ',', False)
+    lines = filename.read_text(encoding='utf-8').splitlines()
+    assert lines[0].startswith('field,any,inverted_index.terms,')
+    assert lines[1] == 'field1,' + ','.join(str(num) for num in range(1, 15))
+    assert lines[2] == 'field2,0' + ',0' * 13
+    filename = tmp_path / 'test.json'
+    write_file(str(filename), data, ['accessed'], True, ',', True)
+    result = json.loads(filename.read_text(encoding='utf-8'))
+    assert result['field1']['inverted_index']['terms'] == 2
+    assert result['field1']['knn_vectors'] == 14
+
+
+def test_write_breakdown(tmp_path):
+    data = {
+        'node_skew': 1.0,
+        'nodes': {'n1': 2},
+        'indices': {
+            'index1': {
+                'reads': 2,
+                'skew': 1.0,
+                'copies': [
+                    {'tracking_id': 'a', 'node': 'n1', 'primary': True, 'reads': 2}
+                ],
+            }
+        },
+    }
+    filename = tmp_path / 'shards.csv'
+    write_breakdown(str(filename), data, ':', False)
+    assert filename.read_text(encoding='utf-8').splitlines()[1] == (
+        'index1: a: n1: True: 2: 1.00'
+    )
+    filename = tmp_path / 'shards.json'
+    write_breakdown(str(filename), data, ':', True)
+    assert json.loads(filename.read_text(encoding='utf-8')) == data
+
+
+def test_file_command_workers(mock_field_usage, tmp_path):
+    mock_field_usage.per_index_report = {
+        f'index{num}': {'accessed': {'field1': num}, 'unaccessed': {'field2': 0}}
+        for num in range(1, 6)
+    }
+    with patch('es_fieldusage.commands.FieldUsage', return_value=mock_field_usage):
+        result = CliRunner().invoke(
+            file,
+            [
+                '--hide-report',
+                '--per-index',
+                '--show-counts',
+                f'--filepath={tmp_path}',
+                '--prefix=test',
+                '--workers=3',
+                'index*',
+            ],
+            obj={'configdict': {}},
+        )
+    assert result.exit_code == 0
+    assert 'Number of files written: 5' in result.output
+    assert (tmp_path / 'test-index4.csv').read_text(encoding='utf-8') == (
+        'field1,4\nfield2,0\n'
+    )
+
+
+def test_file_command_breakdown_name(mock_field_usage, tmp_path):
+    # An index named shards does not clash with the breakdown file
+    mock_field_usage.per_index_report = {
+        'shards': {'accessed': {'field1': 2}, 'unaccessed': {}}
+    }
+    mock_field_usage.breakdown = {'node_skew': 1.0, 'nodes': {}, 'indices': {}}
+    with patch('es_fieldusage.commands.FieldUsage', return_value=mock_field_usage):
+        result = CliRunner().invoke(
+            file,
+            [
+                '--hide-report',
+                '--per-index',
+                '--show-counts',
+                '--breakdown',
+                f'--filepath={tmp_path}',
+                '--prefix=test',
+                'shards',
+            ],
+            obj={'configdict': {}},
+        )
+    assert result.exit_code == 0
+    assert sorted(os.listdir(tmp_path)) == ['test-_shards.csv', 'test-shards.csv']
+    assert (tmp_path / 'test-shards.csv').read_text(encoding='utf-8') == ('field1,2\n')
+
+
+def test_stdout_timings(mock_client, tmp_path):
+    timings_file = tmp_path / 'timings.json'
+    with patch('es_fieldusage.main.get_client', return_value=mock_client):
+        result = CliRunner().invoke(
+            stdout,
+            ['--show-timings', f'--timings-file={timings_file}', 'index1'],
+            obj={'configdict': {}},
+        )
+    assert result.exit_code == 0
+    assert 'Phase output: ' in result.output
+    assert 'API field_usage_stats: 1 calls' in result.output
+    timings = json.loads(timings_file.read_text(encoding='utf-8'))
+    assert timings['api']['get_mapping']['calls'] == 1
+    assert 'output' in timings['phases']
+
+
+def test_watch_command(mock_client, tmp_path):
+    responses = [
+        {
+            "index1": {"shards": [{"stats": {"fields": {"field1": {"any": num}}}}]},
+            "index2": {"shards": [{"stats": {"fields": {"field1": {"any": 1}}}}]},
+        }
+        for num in (1, 1, 5)
+    ]
+    mock_client.indices.field_usage_stats.side_effect = responses
+    mock_client.indices.get_mapping.side_effect = lambda index, **_: {
+        idx: {"mappings": {"properties": {"field1": {}}}} for idx in index.split(',')
+    }
+    with patch('es_fieldusage.commands.escl.get_client', return_value=mock_client):
+        with patch('es_fieldusage.commands.time.sleep') as sleep:
+            result = CliRunner().invoke(
+                watch,
+                [
+                    '--polls=3',
+                    '--interval=60',
+                    '--sink=stdout',
+                    '--sink=file',
+                    '--per-index',
+                    f'--filepath={tmp_path}',
+                    '--prefix=test',
+                    'index*',
+                ],
+                obj={'configdict': {}},
+            )
+    assert result.exit_code == 0
+    assert sleep.call_count == 2
+    assert 'poll 1: 2 indices changed' in result.output
+    assert 'poll 2: 0 indices changed' in result.output
+    assert 'poll 3: 1 indices changed' in result.output
+    assert (tmp_path / 'test-index1.csv').read_text(encoding='utf-8') == 'field1,5\n'
+    assert (tmp_path / 'test-index2.csv').read_text(encoding='utf-8') == 'field1,1\n'
+
+
+def test_diff_command(mock_client, tmp_path):
+    snapshot_dir = tmp_path / 'snapshots'
+    with patch('es_fieldusage.main.get_client', return_value=mock_client):
+        for _ in range(3):
+            result = CliRunner().invoke(
+                diff,
+                [f'--snapshot-dir={snapshot_dir}', 'index1'],
+                obj={'configdict': {}},
+            )
+            assert result.exit_code == 0
+    # Runs in quick succession each keep their own delta file
+    deltas = [name for name in os.listdir(snapshot_dir) if name.startswith('delta-')]
+    assert len(deltas) == 2
+
+
 @patch('es_fieldusage.commands.is_docker')
 def test_override_filepath_in_docker(mock_is_docker):
     mock_is_docker.return_value = True
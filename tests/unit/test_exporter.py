@@ -0,0 +1,108 @@
+"""Unit tests for helpers/exporter.py"""
+
+# pylint: disable=C0116
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+from unittest.mock import patch
+import pytest
+from es_fieldusage.helpers.exporter import Exporter, group_lines, make_handler
+from es_fieldusage.main import FieldUsage
+
+
+def usage(counts):
+    return {
+        idx: {
+            "shards": [
+                {
+                    "stats": {
+                        "fields": {
+                            name: {"any": count} for name, count in fields.items()
+                        }
+                    }
+                }
+            ]
+        }
+        for idx, fields in counts.items()
+    }
+
+
+@pytest.fixture
+def exporter(mock_client):
+    mock_client.indices.field_usage_stats.return_value = usage(
+        {
+            'logs-1': {'a': 1, 'b': 2},
+            'logs-2': {'a': 3},
+            'metrics': {'a': 5, 'b': 1},
+        }
+    )
+    mock_client.indices.get_mapping.side_effect = lambda index, **_: {
+        idx: {"mappings": {"properties": {"a": {}, "b": {}, "c": {}}}}
+        for idx in index.split(',')
+    }
+    field_usage = FieldUsage({}, '*', client=mock_client)
+    return Exporter(field_usage, top_fields=1, rollups=['logs-*'])
+
+
+def test_group_lines():
+    lines = group_lines('idx', {'a': 5, 'b': 2, 'c': 0}, 1, 2)
+    assert lines['es_fieldusage_field_reads'] == [
+        'es_fieldusage_field_reads{index="idx",field="a"} 5\n',
+        'es_fieldusage_field_reads{index="idx",field="b"} 2\n',
+        'es_fieldusage_field_reads{index="idx",field="__other__"} 0\n',
+    ]
+    assert lines['es_fieldusage_index_reads'] == [
+        'es_fieldusage_index_reads{index="idx"} 7\n'
+    ]
+    assert lines['es_fieldusage_fields'][1] == (
+        'es_fieldusage_fields{index="idx",state="unaccessed"} 1\n'
+    )
+
+
+def test_exporter_rollups(exporter):
+    body = exporter.body.decode('utf-8')
+    assert 'es_fieldusage_field_reads{index="logs-*",field="a"} 4\n' in body
+    assert 'es_fieldusage_field_reads{index="logs-*",field="__other__"} 2\n' in body
+    assert 'es_fieldusage_indices{index="logs-*"} 2\n' in body
+    assert 'es_fieldusage_index_reads{index="metrics"} 6\n' in body
+    assert 'logs-1' not in body
+
+
+def test_exporter_refresh(exporter, mock_client):
+    mock_client.indices.field_usage_stats.return_value = usage(
+        {'logs-1': {'a': 1, 'b': 2}, 'metrics': {'a': 9}}
+    )
+    with patch.object(exporter, 'render', wraps=exporter.render) as render:
+        exporter.refresh()
+    # logs-* lost an index and metrics changed, so both are rendered again
+    assert sorted(call.args[0] for call in render.call_args_list) == [
+        'logs-*',
+        'metrics',
+    ]
+    body = exporter.body.decode('utf-8')
+    assert 'es_fieldusage_index_reads{index="metrics"} 9\n' in body
+    assert 'es_fieldusage_indices{index="logs-*"} 1\n' in body
+    with patch.object(exporter, 'render', wraps=exporter.render) as render:
+        exporter.refresh()
+    assert not render.called
+    mock_client.indices.field_usage_stats.side_effect = ConnectionError('down')
+    exporter.refresh()
+    assert exporter.errors == 1
+    assert b'es_fieldusage_refresh_errors_total 1\n' in exporter.body
+
+
+def test_handler(exporter):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(exporter))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f'http://127.0.0.1:{server.server_address[1]}'
+    try:
+        with urllib.request.urlopen(f'{url}/metrics') as response:
+            assert response.read() == exporter.body
+            assert response.headers['Content-Type'].startswith('text/plain')
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f'{url}/other')  # pylint: disable=R1732
+    finally:
+        server.shutdown()
+        server.server_close()
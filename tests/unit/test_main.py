@@ -1,6 +1,9 @@
 """Unit tests for main.py"""
 
 # pylint: disable=C0116
+from unittest.mock import patch
+from es_fieldusage.helpers.cache import DiskCache
+from es_fieldusage.main import FieldUsage
 
 
 def test_init(field_usage_instance):
@@ -18,6 +21,98 @@ def test_get_field_mappings(field_usage_instance):
     assert "field1" in mappings
 
 
+def test_get_mappings_batched(mock_client):
+    indices = ['index1', 'index2', 'index3']
+    mock_client.indices.field_usage_stats.return_value = {
+        idx: {"shards": [{"stats": {"fields": {"field1": {"any": 1}}}}]}
+        for idx in indices
+    }
+    mock_client.indices.get_mapping.return_value = {
+        idx: {"mappings": {"properties": {"field1": {}}}} for idx in indices
+    }
+    with patch("es_fieldusage.main.get_client", return_value=mock_client):
+        field_usage = FieldUsage(configdict={}, search_pattern="index*")
+    results = field_usage.results_by_index
+    assert sorted(results.keys()) == indices
+    mock_client.indices.get_mapping.assert_called_once_with(
+        index='index1,index2,index3'
+    )
+    # Already fetched mappings are not requested again
+    assert "field1" in field_usage.get_field_mappings("index2")
+    assert mock_client.indices.get_mapping.call_count == 1
+
+
+def test_results_by_index_concurrent(mock_client):
+    indices = [f'index{num}' for num in range(20)]
+    mock_client.indices.field_usage_stats.return_value = {
+        idx: {"shards": [{"stats": {"fields": {"field1": {"any": num}}}}]}
+        for num, idx in enumerate(indices)
+    }
+    mock_client.indices.get_mapping.side_effect = lambda index: {
+        idx: {"mappings": {"properties": {"field1": {}}}} for idx in index.split(',')
+    }
+    with patch("es_fieldusage.main.get_client", return_value=mock_client):
+        with patch("es_fieldusage.main.MAX_INDEX_CHARS", 20):
+            field_usage = FieldUsage(configdict={}, search_pattern="index*", workers=4)
+            results = field_usage.results_by_index
+    assert list(results.keys()) == indices
+    assert results['index7'] == {'field1': 7}
+    assert mock_client.indices.get_mapping.call_count > 1
+
+
+def test_get_batched(mock_client):
+    indices = ['index1', 'index2', 'index3']
+    mock_client.cat.indices.return_value = [{'index': idx} for idx in indices]
+    mock_client.indices.field_usage_stats.side_effect = lambda index, **_: {
+        idx: {"shards": [{"stats": {"fields": {"field1": {"any": 1}}}}]}
+        for idx in index.split(',')
+    }
+    with patch("es_fieldusage.main.get_client", return_value=mock_client):
+        field_usage = FieldUsage(configdict={}, search_pattern="index*", batch_size=2)
+    assert field_usage.indices == indices
+    calls = mock_client.indices.field_usage_stats.call_args_list
+    assert [call.kwargs['index'] for call in calls] == ['index1,index2', 'index3']
+
+
+def test_results_by_index_lazy(mock_client):
+    indices = ['index1', 'index2', 'index3']
+    mock_client.indices.field_usage_stats.return_value = {
+        idx: {"shards": [{"stats": {"fields": {"field1": {"any": 1}}}}]}
+        for idx in indices
+    }
+    mock_client.indices.get_mapping.return_value = {
+        idx: {"mappings": {"properties": {"field1": {}, "field2": {}}}}
+        for idx in indices
+    }
+    with patch("es_fieldusage.main.get_client", return_value=mock_client):
+        field_usage = FieldUsage(configdict={}, search_pattern="index*", lru_size=1)
+    with patch.object(field_usage, 'result', wraps=field_usage.result) as result:
+        assert dict(field_usage.results.items()) == {'field1': 3, 'field2': 0}
+        report = field_usage.per_index_report
+        assert report['index2']['accessed'] == {'field1': 1}
+        assert result.call_count == 4
+
+
+def test_identical_mappings_share_cache(mock_client):
+    indices = ['index1', 'index2']
+    mock_client.indices.field_usage_stats.return_value = {
+        idx: {"shards": [{"stats": {"fields": {"field1": {"any": 1}}}}]}
+        for idx in indices
+    }
+    mock_client.indices.get_mapping.return_value = {
+        idx: {"mappings": {"properties": {"field1": {}, "field2": {}}}}
+        for idx in indices
+    }
+    with patch("es_fieldusage.main.get_client", return_value=mock_client):
+        field_usage = FieldUsage(configdict={}, search_pattern="index*")
+    field_usage.get_mappings(indices)
+    assert len(field_usage.leaf_cache) == 1
+    assert field_usage.get_leaf_fields('index1') is field_usage.get_leaf_fields(
+        'index2'
+    )
+    assert field_usage.get_leaf_fields('index1') == ('field1', 'field2')
+
+
 def test_populate_values(field_usage_instance):
     data = {}
     result = field_usage_instance.populate_values("index1", data)
@@ -34,6 +129,24 @@ def test_merge_results(field_usage_instance):
     assert result["field1"] == 10
 
 
+def test_merge_results_dotted_fields(field_usage_instance):
+    field_usage_instance.usage_stats["index1"] = {"obj.sub": 3, "name.keyword": 2}
+    field_usage_instance.cache_mapping(
+        "index1",
+        {
+            "obj": {"properties": {"sub": {}, "other": {}}},
+            "name": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+        },
+    )
+    result = field_usage_instance.merge_results("index1")
+    assert list(result.items()) == [
+        ("obj.sub", 3),
+        ("obj.other", 0),
+        ("name", 0),
+        ("name.keyword", 2),
+    ]
+
+
 def test_per_index_report(field_usage_instance):
     report = field_usage_instance.per_index_report
     assert "index1" in report
@@ -67,9 +180,155 @@ def test_indices(field_usage_instance):
     assert field_usage_instance.indices == "index1"
 
 
+def test_get_filter_path(field_usage_instance, mock_client):
+    kwargs = mock_client.indices.field_usage_stats.call_args.kwargs
+    assert '*.shards.stats.fields.*.any' in kwargs['filter_path']
+
+
+def test_sum_index_stats_filtered_shards(field_usage_instance):
+    field_usage = {
+        "index1": {
+            "shards": [
+                {"tracking_id": "abc"},
+                {"stats": {"fields": {"field1": {"any": 2}, "_id": {"any": 4}}}},
+                {"stats": {"fields": {"field1": {"any": 3}, "field2": {}}}},
+            ]
+        }
+    }
+    result = field_usage_instance.sum_index_stats(field_usage, "index1")
+    assert result == {"field1": 5, "field2": 0}
+
+
+def test_keep_shards(mock_client):
+    mock_client.indices.field_usage_stats.return_value = {
+        "index1": {
+            "shards": [
+                {
+                    "tracking_id": "a",
+                    "routing": {"node": "n1", "primary": True},
+                    "stats": {"fields": {"field1": {"any": 2}}},
+                },
+                {"tracking_id": "b", "stats": {"fields": {"field1": {"any": 3}}}},
+            ]
+        }
+    }
+    with patch("es_fieldusage.main.get_client", return_value=mock_client):
+        field_usage = FieldUsage(configdict={}, search_pattern="*", keep_shards=True)
+    assert field_usage.usage_stats["index1"]["field1"] == 5
+    assert field_usage.shard_usage == {
+        "index1": {
+            "a": {"fields": {"field1": 2}, "node": "n1", "primary": True},
+            "b": {"fields": {"field1": 3}, "node": None, "primary": None},
+        }
+    }
+    breakdown = field_usage.report['breakdown']
+    assert breakdown['nodes'] == {'unknown': 3, 'n1': 2}
+    assert breakdown['indices']['index1']['skew'] == 1.2
+
+
+def test_cache(mock_client, tmp_path):
+    mock_client.cluster.state.return_value = {
+        "metadata": {
+            "indices": {
+                "index1": {"mapping_version": 1, "settings": {"index": {"uuid": "x"}}}
+            }
+        }
+    }
+    mock_client.info.return_value = {"cluster_uuid": "cluster1"}
+    cache = DiskCache(str(tmp_path), {'usage': 60, 'mapping': 60})
+    for _ in range(2):
+        with patch("es_fieldusage.main.get_client", return_value=mock_client):
+            field_usage = FieldUsage(configdict={}, search_pattern="*", cache=cache)
+        assert field_usage.results_by_index["index1"] == {"field1": 10}
+    assert mock_client.indices.field_usage_stats.call_count == 1
+    assert mock_client.indices.get_mapping.call_count == 1
+    # A changed mapping version means usage and mapping are fetched again
+    mock_client.cluster.state.return_value["metadata"]["indices"]["index1"][
+        "mapping_version"
+    ] = 2
+    with patch("es_fieldusage.main.get_client", return_value=mock_client):
+        field_usage = FieldUsage(configdict={}, search_pattern="*", cache=cache)
+    _ = field_usage.results_by_index
+    assert mock_client.indices.field_usage_stats.call_count == 2
+    assert mock_client.indices.get_mapping.call_count == 2
+    # Nothing cached for one cluster is used for another
+    mock_client.info.return_value = {"cluster_uuid": "cluster2"}
+    with patch("es_fieldusage.main.get_client", return_value=mock_client):
+        field_usage = FieldUsage(configdict={}, search_pattern="*", cache=cache)
+    _ = field_usage.results_by_index
+    assert mock_client.indices.field_usage_stats.call_count == 3
+    assert mock_client.indices.get_mapping.call_count == 3
+
+
+def test_cluster_identity(field_usage_instance):
+    field_usage_instance.client.info.side_effect = RuntimeError('unavailable')
+    configdict = {"elasticsearch": {"client": {"hosts": ["https://es2:9200"]}}}
+    assert field_usage_instance.cluster_identity(configdict) == "hosts:https://es2:9200"
+    field_usage_instance.client.info.side_effect = None
+    field_usage_instance.client.info.return_value = {"cluster_uuid": "abc"}
+    assert field_usage_instance.cluster_identity(configdict) == "uuid:abc"
+
+
 def test_sum_index_stats(field_usage_instance):
     field_usage = {
         "index1": {"shards": [{"stats": {"fields": {"field1": {"any": 5}}}}]}
     }
     result = field_usage_instance.sum_index_stats(field_usage, "index1")
     assert result["field1"] == 5
+
+
+def test_access_types(mock_client):
+    stats = {
+        'any': 3,
+        'inverted_index': {'terms': 2, 'postings': 1},
+        'doc_values': 1,
+        'knn_vectors': 0,
+    }
+    mock_client.indices.field_usage_stats.return_value = {
+        "index1": {
+            "shards": [
+                {"stats": {"fields": {"field1": stats, "_id": stats}}},
+                {"stats": {"fields": {"field1": stats}}},
+            ]
+        },
+    }
+    field_usage = FieldUsage({}, '*', client=mock_client, access_types=True)
+    kwargs = mock_client.indices.field_usage_stats.call_args.kwargs
+    assert '*.shards.stats.fields' in kwargs['filter_path']
+    assert field_usage.report['accessed'] == {'field1': 6}
+    expected = (6, 4, 2, 0, 0, 0, 0, 0, 0, 2, 0, 0, 0, 0)
+    assert field_usage.access_results['field1'] == expected
+    assert field_usage.report['access']['field1'] == expected
+    assert field_usage.per_index_report['index1']['access']['field1'] == expected
+    assert '_id' not in field_usage.access_results
+
+
+def test_access_types_off(field_usage_instance):
+    assert field_usage_instance.access_results is None
+    assert 'access' not in field_usage_instance.report
+
+
+def test_refresh(mock_client):
+    mock_client.indices.field_usage_stats.return_value = {
+        idx: {"shards": [{"stats": {"fields": {"field1": {"any": 1}}}}]}
+        for idx in ['index1', 'index2', 'index3']
+    }
+    mock_client.indices.get_mapping.side_effect = lambda index, **_: {
+        idx: {"mappings": {"properties": {"field1": {}, "field2": {}}}}
+        for idx in index.split(',')
+    }
+    field_usage = FieldUsage({}, '*', client=mock_client)
+    assert field_usage.results_by_index['index2'] == {'field1': 1, 'field2': 0}
+    mock_client.indices.field_usage_stats.return_value = {
+        "index1": {"shards": [{"stats": {"fields": {"field1": {"any": 1}}}}]},
+        "index2": {"shards": [{"stats": {"fields": {"field2": {"any": 4}}}}]},
+        "index4": {"shards": [{"stats": {"fields": {"field1": {"any": 2}}}}]},
+    }
+    mock_client.indices.get_mapping.reset_mock()
+    assert field_usage.refresh() == ['index2', 'index4']
+    assert mock_client.indices.get_mapping.call_args.kwargs['index'] == (
+        'index2,index4'
+    )
+    assert sorted(field_usage.results_by_index) == ['index1', 'index2', 'index4']
+    assert field_usage.results_by_index['index2'] == {'field1': 0, 'field2': 4}
+    assert field_usage.report['accessed'] == {'field1': 3, 'field2': 4}
@@ -0,0 +1,58 @@
+"""Unit tests for the metrics module"""
+
+# pylint: disable=C0116
+import json
+from unittest.mock import MagicMock
+from es_fieldusage.helpers.metrics import Metrics, peak_rss, response_size
+from es_fieldusage.main import FieldUsage
+
+
+def test_response_size():
+    body = {'index1': {'shards': []}}
+    assert response_size(body) is None
+    response = MagicMock(body=body)
+    response.meta.headers = {'content-length': '1234'}
+    assert response_size(response) == 1234
+    response.meta.headers = {}
+    assert response_size(response) is None
+
+
+def test_phases_and_api_calls():
+    metrics = Metrics()
+    for _ in range(2):
+        with metrics.phase('collect'):
+            pass
+    response = MagicMock(body={'a': 1})
+    response.meta.headers = {'content-length': '100'}
+    metrics.api_call('get_mapping', response, 0.5)
+    metrics.api_call('get_mapping', response, 0.25)
+    # A response without a Content-Length makes the total unknown
+    metrics.api_call('cat.indices', response, 0.125)
+    metrics.api_call('cat.indices', {'b': 2}, 0.125)
+    summary = metrics.summary()
+    assert list(summary['phases']) == ['collect']
+    assert summary['api']['get_mapping'] == {
+        'calls': 2,
+        'bytes': 200,
+        'seconds': 0.75,
+    }
+    assert summary['api']['cat.indices']['bytes'] is None
+    assert summary['total_seconds'] >= summary['phases']['collect']
+    assert summary['peak_rss_bytes'] == peak_rss()
+    json.dumps(summary)
+
+
+def test_field_usage_metrics(mock_client):
+    metrics = Metrics()
+    field_usage = FieldUsage({}, '*', client=mock_client, metrics=metrics)
+    _ = field_usage.report
+    summary = metrics.summary()
+    assert list(summary['phases']) == [
+        'collect',
+        'mappings',
+        'merge',
+        'aggregate',
+        'report',
+    ]
+    assert summary['api']['field_usage_stats']['calls'] == 1
+    assert summary['api']['get_mapping']['calls'] == 1
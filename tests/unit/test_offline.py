@@ -0,0 +1,133 @@
+"""Unit tests for the offline module."""
+
+# pylint: disable=C0116
+from unittest.mock import patch
+import pytest
+from click.testing import CliRunner
+from es_fieldusage.commands import advise, capture, index, stdout
+from es_fieldusage.exceptions import FatalException, ResultNotExpected
+from es_fieldusage.helpers.offline import (
+    OfflineClient,
+    load_dump,
+    match_indices,
+    save_dump,
+)
+from es_fieldusage.main import FieldUsage
+
+
+def test_match_indices():
+    indices = ['logs-1', 'logs-2', 'metrics-1']
+    assert match_indices('*', indices) == indices
+    assert match_indices('_all', indices) == indices
+    assert match_indices('logs-*', indices) == ['logs-1', 'logs-2']
+    assert match_indices('metrics-1,logs-2', indices) == ['metrics-1', 'logs-2']
+    assert match_indices('*,-logs-*', indices) == ['metrics-1']
+
+
+@pytest.mark.parametrize("suffix", ['json', 'json.gz', 'json.bz2', 'json.xz'])
+def test_dump_roundtrip(tmp_path, suffix):
+    filename = str(tmp_path / f'dump.{suffix}')
+    save_dump(filename, {'index1': {'shards': []}})
+    assert load_dump(filename) == {'index1': {'shards': []}}
+
+
+def test_offline_client(tmp_path, mock_client):
+    usage_file = str(tmp_path / 'usage.json')
+    mappings_file = str(tmp_path / 'mappings.json.gz')
+    save_dump(usage_file, mock_client.indices.field_usage_stats.return_value)
+    save_dump(mappings_file, mock_client.indices.get_mapping.return_value)
+    client = OfflineClient(usage_file, mappings_file)
+    with pytest.raises(ResultNotExpected):
+        client.cluster.state()
+    field_usage = FieldUsage(configdict={}, search_pattern='index*', client=client)
+    assert field_usage.indices == 'index1'
+    assert field_usage.results == {'field1': 10}
+    field_usage = FieldUsage(configdict={}, search_pattern='other*', client=client)
+    assert not field_usage.indices
+
+
+def test_capture_then_report(tmp_path, mock_client):
+    usage_file = str(tmp_path / 'usage.json.gz')
+    mappings_file = str(tmp_path / 'mappings.json.gz')
+    runner = CliRunner()
+    with patch('es_client.helpers.config.get_client', return_value=mock_client):
+        result = runner.invoke(
+            capture,
+            [f'--usage-file={usage_file}', f'--mappings-file={mappings_file}', '*'],
+            obj={'configdict': {}},
+        )
+    assert result.exit_code == 0
+    assert 'Indices captured: 1' in result.output
+    assert '_shards' not in load_dump(usage_file)
+    result = runner.invoke(
+        stdout,
+        [
+            '--show-accessed',
+            '--show-counts',
+            f'--usage-file={usage_file}',
+            f'--mappings-file={mappings_file}',
+            '*',
+        ],
+        obj={'configdict': {}},
+    )
+    assert result.exit_code == 0
+    assert 'field1,10' in result.output
+
+
+def test_offline_files_required_together(tmp_path):
+    usage_file = str(tmp_path / 'usage.json')
+    save_dump(usage_file, {})
+    result = CliRunner().invoke(
+        stdout, [f"--usage-file={usage_file}", "*"], obj={'configdict': {}}
+    )
+    assert result.exit_code != 0
+    assert 'must be used together' in result.output
+
+
+def test_capture_error(tmp_path, mock_client):
+    mock_client.indices.field_usage_stats.side_effect = RuntimeError('unavailable')
+    with patch('es_client.helpers.config.get_client', return_value=mock_client):
+        result = CliRunner().invoke(
+            capture,
+            [f'--usage-file={tmp_path / "usage.json"}', '*'],
+            obj={'configdict': {}},
+        )
+    assert isinstance(result.exception, FatalException)
+    assert not list(tmp_path.iterdir())
+
+
+def test_index_offline(tmp_path, mock_client):
+    usage_file = str(tmp_path / 'usage.json')
+    mappings_file = str(tmp_path / 'mappings.json')
+    save_dump(usage_file, mock_client.indices.field_usage_stats.return_value)
+    save_dump(mappings_file, mock_client.indices.get_mapping.return_value)
+    summary = {'success': 1, 'failed': 0}
+    with patch('es_client.helpers.config.get_client', return_value=mock_client):
+        with patch('es_fieldusage.commands.bulk_index', return_value=summary) as bulk:
+            result = CliRunner().invoke(
+                index,
+                [f'--usage-file={usage_file}', f'--mappings-file={mappings_file}', '*'],
+                obj={'configdict': {}},
+            )
+    assert result.exit_code == 0
+    # Documents are indexed with a connection to the cluster, not the files
+    assert bulk.call_args.args[0] is mock_client
+
+
+def test_advise_disk_usage_offline(tmp_path):
+    usage_file = str(tmp_path / 'usage.json')
+    mappings_file = str(tmp_path / 'mappings.json')
+    save_dump(usage_file, {})
+    save_dump(mappings_file, {})
+    result = CliRunner().invoke(
+        advise,
+        [
+            '--disk-usage',
+            f'--usage-file={usage_file}',
+            f'--mappings-file={mappings_file}',
+            '*',
+        ],
+        obj={'configdict': {}},
+    )
+    assert result.exit_code != 0
+    assert '--disk-usage cannot be used' in result.output
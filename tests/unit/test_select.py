@@ -0,0 +1,85 @@
+"""Unit tests for helpers/select.py"""
+
+# pylint: disable=C0116
+from unittest.mock import patch
+from click.testing import CliRunner
+from es_fieldusage.commands import stdout
+from es_fieldusage.helpers.select import SelectView, select_counts, select_sections
+
+COUNTS = {'a': 9, 'b': 4, 'c': 4, 'd': 1, 'e': 0, 'f': 0}
+DATA = {
+    'accessed': {'a': 9, 'b': 4, 'c': 4, 'd': 1},
+    'unaccessed': {'e': 0, 'f': 0},
+    'access': 'counters',
+}
+
+
+def test_select_counts_top_bottom():
+    assert select_counts(COUNTS.items(), top=2) == {'a': 9, 'b': 4}
+    assert list(select_counts(COUNTS.items(), top=3)) == ['a', 'b', 'c']
+    assert list(select_counts(COUNTS.items(), bottom=3)) == ['d', 'e', 'f']
+    assert select_counts(COUNTS.items(), top=100) == COUNTS
+    # Equal counts keep their order, as they are not sorted again
+    ties = {'z': 4, 'y': 4, 'x': 0}
+    assert list(select_counts(ties.items(), top=1)) == ['z']
+    assert list(select_counts(ties.items(), bottom=2)) == ['y', 'x']
+
+
+def test_select_counts_range():
+    assert select_counts(COUNTS.items(), min_count=1, max_count=4) == {
+        'b': 4,
+        'c': 4,
+        'd': 1,
+    }
+    assert select_counts(COUNTS.items(), min_count=1, bottom=1) == {'d': 1}
+    assert select_counts(iter(COUNTS.items())) == COUNTS
+
+
+def test_select_sections():
+    selection = {'top': None, 'bottom': 3, 'min_count': None, 'max_count': None}
+    result = select_sections(DATA, ['accessed', 'unaccessed'], selection)
+    assert result['accessed'] == {'d': 1}
+    assert result['unaccessed'] == {'e': 0, 'f': 0}
+    assert result['access'] == 'counters'
+    result = select_sections(DATA, ['accessed'], selection)
+    assert list(result['accessed']) == ['b', 'c', 'd']
+    assert not result['unaccessed']
+    selection['bottom'] = None
+    assert select_sections(DATA, ['accessed'], selection) is DATA
+
+
+def test_select_view():
+    selection = {'top': 1, 'bottom': None, 'min_count': None, 'max_count': None}
+    view = SelectView({'index1': DATA}, ['accessed'], selection)
+    assert list(view) == ['index1']
+    assert view['index1']['accessed'] == {'a': 9}
+
+
+def test_stdout_top(mock_client):
+    mock_client.indices.field_usage_stats.return_value = {
+        "index1": {
+            "shards": [
+                {
+                    "stats": {
+                        "fields": {
+                            name: {"any": count} for name, count in COUNTS.items()
+                        }
+                    }
+                }
+            ]
+        }
+    }
+    mock_client.indices.get_mapping.return_value = {
+        "index1": {"mappings": {"properties": {name: {} for name in COUNTS}}}
+    }
+    args = ['--hide-report', '--hide-headers', '--show-accessed', '--show-counts']
+    with patch('es_fieldusage.main.get_client', return_value=mock_client):
+        result = CliRunner().invoke(
+            stdout, args + ['--top=2', 'index1'], obj={'configdict': {}}
+        )
+        assert result.exit_code == 0
+        assert result.output.split() == ['a,9', 'b,4']
+        result = CliRunner().invoke(
+            stdout, args + ['--top=2', '--bottom=2', 'index1'], obj={'configdict': {}}
+        )
+        assert result.exit_code == 2
@@ -0,0 +1,49 @@
+"""Unit tests for the snapshot module."""
+
+# pylint: disable=C0116
+from es_fieldusage.helpers.snapshot import (
+    SnapshotStore,
+    diff_snapshots,
+    make_snapshot,
+)
+
+
+def shards(**copies):
+    return {tracking_id: {'fields': fields} for tracking_id, fields in copies.items()}
+
+
+def test_diff_snapshots():
+    previous = make_snapshot(
+        'index*',
+        {
+            'index1': shards(a={'field1': 5, 'field2': 1}, b={'field1': 3}),
+            'gone': shards(c={'field1': 1}),
+        },
+        'then',
+    )
+    current = make_snapshot(
+        'index*',
+        {
+            # Copy b relocated and is now copy d, which started from zero
+            'index1': shards(a={'field1': 7, 'field2': 1}, d={'field1': 2}),
+            'index2': shards(e={'field3': 4, 'field4': 0}),
+        },
+        'now',
+    )
+    assert diff_snapshots(previous, current) == {
+        'index1': {'field1': 4},
+        'index2': {'field3': 4},
+    }
+
+
+def test_snapshot_store(tmp_path):
+    store = SnapshotStore(str(tmp_path / 'snapshots'))
+    assert store.latest() is None
+    first = make_snapshot('index*', {'index1': shards(a={'field1': 1})}, 'T1')
+    store.save(first)
+    assert store.latest() == first
+    assert not store.delta_files()
+    second = make_snapshot('index*', {'index1': shards(a={'field1': 2})}, 'T2')
+    store.save(second, {'indices': diff_snapshots(first, second)})
+    assert store.latest() == second
+    assert store.delta_files() == ['delta-T2.json.gz']
@@ -0,0 +1,166 @@
+"""Unit tests for the store module."""
+
+# pylint: disable=C0116
+from unittest.mock import patch
+import pytest
+from es_fieldusage.helpers import store as st
+from es_fieldusage.helpers.store import (
+    AccessStore,
+    CountsView,
+    FieldTable,
+    LazyStore,
+    SplitView,
+    UsageStore,
+    counters_to_dict,
+    to_arrays,
+)
+
+
+def test_field_table_intern():
+    fields = FieldTable()
+    assert fields.intern('field1') == 0
+    assert fields.intern('field2') == 1
+    assert fields.intern('field1') == 0
+    assert len(fields) == 2
+    assert fields.names == ['field1', 'field2']
+
+
+def test_counts_view():
+    fields = FieldTable()
+    view = CountsView(fields, *to_arrays(fields, [('b', 2), ('a', 1)]))
+    assert list(view) == ['b', 'a']
+    assert list(view.items()) == [('b', 2), ('a', 1)]
+    assert view['a'] == 1
+    assert 'c' not in view
+    assert len(view) == 2
+    assert view == {'a': 1, 'b': 2}
+    with pytest.raises(KeyError):
+        _ = view['c']
+
+
+def test_counts_view_split():
+    fields = FieldTable()
+    view = CountsView(fields, *to_arrays(fields, [('a', 5), ('b', 1), ('c', 0)]))
+    accessed, unaccessed = view.split()
+    assert dict(accessed.items()) == {'a': 5, 'b': 1}
+    assert dict(unaccessed.items()) == {'c': 0}
+    assert 'c' not in accessed
+
+
+def test_usage_store_shares_names():
+    store = UsageStore()
+    store['index1'] = {'field1': 1, 'field2': 0}
+    store['index2'] = {'field2': 3, 'field1': 4}
+    assert list(store) == ['index1', 'index2']
+    assert store['index2'] == {'field1': 4, 'field2': 3}
+    assert list(store['index2']) == ['field2', 'field1']
+    assert len(store.fields) == 2
+    del store['index1']
+    assert 'index1' not in store
+    assert len(store) == 1
+
+
+@pytest.mark.parametrize("backend", ["python", "numpy"])
+def test_usage_store_totals(backend):
+    if backend == "numpy":
+        numpy = pytest.importorskip("numpy")
+    else:
+        numpy = None
+    store = UsageStore()
+    store['index1'] = {'b': 1, 'c': 0, 'a': 2}
+    store['index2'] = {'a': 1, 'd': 3, 'b': 2}
+    store['index3'] = {}
+    with patch.object(st, 'np', numpy):
+        totals = store.totals()
+    # Ties are ordered by name
+    assert list(totals.items()) == [('a', 3), ('b', 3), ('d', 3), ('c', 0)]
+
+
+def test_usage_store_totals_empty():
+    assert not list(UsageStore().totals().items())
+
+
+@pytest.mark.parametrize("backend", ["python", "numpy"])
+def test_access_store_totals(backend):
+    if backend == "numpy":
+        numpy = pytest.importorskip("numpy")
+    else:
+        numpy = None
+    store = AccessStore(3)
+    store['index1'] = {'b': [1, 0, 1], 'a': [2, 2, 0]}
+    store['index2'] = {'a': [1, 0, 1], 'c': [0, 0, 0]}
+    store['index3'] = {}
+    assert store['index1']['a'] == (2, 2, 0)
+    with patch.object(st, 'np', numpy):
+        totals = store.totals()
+    assert dict(totals) == {'b': (1, 0, 1), 'a': (3, 2, 1), 'c': (0, 0, 0)}
+    assert totals.counters_for('d') == (0, 0, 0)
+
+
+def test_counters_to_dict():
+    names = ['any', 'inverted_index.terms', 'inverted_index.postings', 'norms']
+    assert counters_to_dict([4, 3, 2, 1], names) == {
+        'any': 4,
+        'inverted_index': {'terms': 3, 'postings': 2},
+        'norms': 1,
+    }
+
+
+def test_lazy_store_lru():
+    fields = FieldTable()
+    computed = []
+
+    def compute(index):
+        computed.append(index)
+        return to_arrays(fields, [(f'{index}-field', len(computed))])
+
+    store = LazyStore(fields, ['index1', 'index2', 'index3'], compute, 2)
+    assert list(store) == ['index1', 'index2', 'index3']
+    assert not computed
+    assert store['index1'] == {'index1-field': 1}
+    assert store['index2'] == {'index2-field': 2}
+    assert store['index1'] == {'index1-field': 1}
+    assert computed == ['index1', 'index2']
+    # index2 is now the least recently used, so it is evicted
+    _ = store['index3']
+    _ = store['index2']
+    assert computed == ['index1', 'index2', 'index3', 'index2']
+    assert 'index4' not in store
+    with pytest.raises(KeyError):
+        _ = store['index4']
+
+
+@pytest.mark.parametrize("backend", ["python", "numpy"])
+def test_lazy_store_totals(backend):
+    if backend == "numpy":
+        numpy = pytest.importorskip("numpy")
+    else:
+        numpy = None
+    fields = FieldTable()
+
+    def compute(index):
+        # Each index adds field names not yet in the table
+        return to_arrays(fields, [('a', 1), (f'{index}-field', 0)])
+
+    store = LazyStore(fields, ['index1', 'index2'], compute, 1)
+    with patch.object(st, 'np', numpy):
+        totals = store.totals()
+    assert list(totals.items()) == [('a', 2), ('index1-field', 0), ('index2-field', 0)]
+
+
+def test_split_view():
+    store = UsageStore()
+    store['index1'] = {'field1': 2, 'field2': 0}
+    view = SplitView(store)
+    assert list(view) == ['index1']
+    assert view['index1']['accessed'] == {'field1': 2}
+    assert view['index1']['unaccessed'] == {'field2': 0}
+
+
+def test_split_view_access():
+    store = UsageStore()
+    store['index1'] = {'field1': 2}
+    access = AccessStore(2, store.fields)
+    access['index1'] = {'field1': [2, 1]}
+    view = SplitView(store, access)
+    assert view['index1']['access']['field1'] == (2, 1)
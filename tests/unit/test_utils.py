@@ -3,11 +3,14 @@
 # pylint: disable=C0116
 import pytest
 from es_fieldusage.helpers.utils import (
-    convert_mapping,
-    detuple,
-    get_value_from_path,
-    iterate_paths,
+    chunk_indices,
+    concurrent_map,
+    flatten_mapping,
+    format_bytes,
+    mapping_hash,
+    output_advice,
     output_report,
+    output_timings,
     override_settings,
     passthrough,
     sort_by_name,
@@ -17,31 +20,73 @@ from es_fieldusage.helpers.utils import (
 from es_fieldusage.exceptions import ConfigurationException
 
 
-def test_convert_mapping():
+def test_chunk_indices():
+    indices = ['index1', 'index2', 'index3']
+    # 'index1,index2' is 13 characters, so the third index goes in a new chunk
+    assert list(chunk_indices(indices, 13)) == [['index1', 'index2'], ['index3']]
+    assert list(chunk_indices(indices, 100)) == [indices]
+    assert list(chunk_indices(['a-very-long-index'], 5)) == [['a-very-long-index']]
+    assert not list(chunk_indices([], 10))
+    assert list(chunk_indices(indices, 100, 2)) == [['index1', 'index2'], ['index3']]
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_concurrent_map(workers):
+    items = list(range(10))
+    assert concurrent_map(lambda x: x * 2, items, workers) == [x * 2 for x in items]
+
+
+def test_flatten_mapping():
     data = {
-        "field1": {"properties": {"subfield1": {}}},
+        "field1": {"properties": {"subfield1": {}, "subfield2": {"type": "long"}}},
         "field2": {"type": "text"},
     }
-    expected = {"field1": {"subfield1": 0}, "field2": 0}
-    assert convert_mapping(data) == expected
+    assert flatten_mapping(data) == ["field1.subfield1", "field1.subfield2", "field2"]
 
 
-def test_detuple():
-    assert detuple([(1, 2)]) == [1, 2]
-    assert detuple([1]) == [1]
+def test_mapping_hash():
+    data = {"field1": {"type": "keyword"}, "field2": {"type": "long"}}
+    assert mapping_hash(data) == mapping_hash(dict(data))
+    assert mapping_hash(data) != mapping_hash({"field1": {"type": "text"}})
 
 
-def test_get_value_from_path():
-    data = {"a": {"b": {"c": 42}}}
-    path = ["a", "b", "c"]
-    assert get_value_from_path(data, path) == 42
+def test_format_bytes():
+    assert format_bytes(512) == '512.0 B'
+    assert format_bytes(1536) == '1.5 KiB'
+    assert format_bytes(3 * 1024**3) == '3.0 GiB'
 
 
-def test_iterate_paths():
-    data = {"a": {"b": {"c": 42}}, "d": 1}
-    paths = list(iterate_paths(data))
-    expected = [["a", "b", "c"], ["d"]]
-    assert paths == expected
+def test_output_advice(capsys):
+    groups = [
+        {
+            'indices': ['index1'],
+            'recommendations': [
+                {
+                    'field': 'field1',
+                    'action': 'update',
+                    'change': {'doc_values': False},
+                    'reasons': ['never aggregated'],
+                    'savings': 2048,
+                },
+                {
+                    'field': 'field2.keyword',
+                    'action': 'remove',
+                    'change': {},
+                    'reasons': ['multi-field never accessed'],
+                    'savings': 1024,
+                },
+            ],
+            'store_size': 1048576,
+            'savings': 3072,
+        }
+    ]
+    output_advice('test_pattern', groups)
+    captured = capsys.readouterr()
+    assert 'field1: {"doc_values": false} (never aggregated) saves 2.0 KiB' in (
+        captured.out
+    )
+    assert 'field2.keyword: remove multi-field' in captured.out
+    assert 'Estimated Savings: 3.0 KiB of 1.0 MiB' in captured.out
 
 
 def test_output_report(capsys):
@@ -61,6 +106,72 @@ def test_output_report(capsys):
     assert "Unaccessed Fields: 1" in captured.out
 
 
+def test_output_report_access(capsys):
+    report = {
+        "indices": "index1",
+        "field_count": 2,
+        "accessed": {"field1": 1},
+        "unaccessed": {"field2": 0},
+        "access": {"field1": (1,) + (0,) * 8 + (1,) + (0,) * 4, "field2": (0,) * 14},
+    }
+    output_report("test_pattern", report)
+    captured = capsys.readouterr()
+    assert "doc_values: 1" in captured.out
+    assert "norms: 0" in captured.out
+
+
+def test_output_report_breakdown(capsys):
+    report = {
+        "indices": "index1",
+        "field_count": 1,
+        "accessed": {"field1": 4},
+        "unaccessed": {},
+        "breakdown": {
+            "node_skew": 1.5,
+            "nodes": {"n1": 3, "n2": 1},
+            "indices": {
+                "index1": {
+                    "reads": 4,
+                    "skew": 1.5,
+                    "copies": [
+                        {"tracking_id": "a", "node": "n1", "primary": True, "reads": 3},
+                        {
+                            "tracking_id": "b",
+                            "node": "n2",
+                            "primary": False,
+                            "reads": 1,
+                        },
+                    ],
+                }
+            },
+        },
+    }
+    output_report("test_pattern", report)
+    captured = capsys.readouterr()
+    assert "Node Read Skew: 1.50" in captured.out
+    assert "n1: 3 reads" in captured.out
+    assert "index1: skew 1.50, busiest copy on node n1" in captured.out
+
+
+def test_output_timings(capsys):
+    timings = {
+        'total_seconds': 1.5,
+        'phases': {'collect': 0.25},
+        'api': {
+            'get_mapping': {'calls': 2, 'bytes': 100, 'seconds': 0.125},
+            'cat.indices': {'calls': 1, 'bytes': None, 'seconds': 0.25},
+        },
+        'peak_rss_bytes': 2097152,
+    }
+    output_timings(timings)
+    captured = capsys.readouterr()
+    assert "Total Time: 1.500s" in captured.out
+    assert "Phase collect: 0.250s" in captured.out
+    assert "API get_mapping: 2 calls, 100 bytes, 0.125s" in captured.out
+    assert "API cat.indices: 1 calls, unknown size, 0.250s" in captured.out
+    assert "Peak RSS: 2.0 MiB" in captured.out
+
+
 def test_override_settings():
     data = {"key1": "value1", "key2": "value2"}
     new_data = {"key1": "new_value1"}
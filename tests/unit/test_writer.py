@@ -0,0 +1,59 @@
+"""Unit tests for the writer module."""
+
+# pylint: disable=C0116
+import json
+import os
+import pytest
+from es_fieldusage.helpers.writer import UMASK, json_chunks, open_output
+
+
+@pytest.mark.parametrize("atomic", [False, True])
+def test_open_output(tmp_path, atomic):
+    filename = tmp_path / 'output.txt'
+    filename.write_text('old data\n', encoding='utf-8')
+    with open_output(str(filename), atomic=atomic) as fdesc:
+        fdesc.write('new data\n')
+    assert filename.read_text(encoding='utf-8') == 'new data\n'
+    assert os.listdir(tmp_path) == ['output.txt']
+
+
+def test_open_output_atomic_mode(tmp_path):
+    filename = tmp_path / 'output.txt'
+    with open_output(str(filename), atomic=True) as fdesc:
+        fdesc.write('new data\n')
+    # A new file gets the same mode a plain open would have given it
+    assert os.stat(filename).st_mode & 0o777 == 0o666 & ~UMASK
+    os.chmod(filename, 0o640)
+    with open_output(str(filename), atomic=True) as fdesc:
+        fdesc.write('newer data\n')
+    # An existing file keeps its mode
+    assert os.stat(filename).st_mode & 0o777 == 0o640
+
+
+def test_open_output_atomic_failure(tmp_path):
+    filename = tmp_path / 'output.txt'
+    filename.write_text('old data\n', encoding='utf-8')
+    with pytest.raises(RuntimeError):
+        with open_output(str(filename), atomic=True) as fdesc:
+            fdesc.write('partial')
+            raise RuntimeError('failed')
+    # The original file is untouched and the temporary file is removed
+    assert filename.read_text(encoding='utf-8') == 'old data\n'
+    assert os.listdir(tmp_path) == ['output.txt']
+
+
+@pytest.mark.parametrize(
+    "sections",
+    [
+        [{'field1': 2, 'field2': 1}, {'field3': 0}],
+        [{'index1': {'field1': {'any': 2, 'query': 1}}}, {'index2': {}}],
+        [{}, {'field3': 0}],
+        [{}],
+        [],
+    ],
+)
+def test_json_chunks(sections):
+    expected = {}
+    for section in sections:
+        expected.update(section)
+    assert ''.join(json_chunks(sections)) == json.dumps(expected, indent=2) + '\n'